@@ -0,0 +1,86 @@
+// 生成代码的绘制性能：在模拟TFT上绘制几组典型字符串，统计点数、调用次数和估算传输量，
+// 并测主机上每次绘制的耗时，结果以 JSON 输出到 stdout
+// 由 run_benchmarks.py 编译，BENCH_HEADER / BENCH_FONT 指定要测的库，例如
+//   -DBENCH_HEADER='"GB2312_16_Bench.h"' -DBENCH_FONT=Bench16
+#include <stdio.h>
+#include <chrono>
+#include "mock_tft.h"
+#include BENCH_HEADER
+
+// 每个用例测 ROUNDS 轮，每轮至少跑 ROUND_SECONDS 秒，取最快一轮的平均耗时（排除机器负载抖动）
+static const int ROUNDS = 5;
+static const double ROUND_SECONDS = 0.02;
+
+enum Kind { STRING, WRAP, CENTER_WRAP };
+
+struct Case {
+    const char* name;
+    Kind kind;
+    const char* text;
+};
+
+static const Case CASES[] = {
+    {"ascii", STRING, "Hello ESP32 0123456789"},
+    {"label", STRING, "当前温度25度"},
+    {"sentence", STRING, "春眠不觉晓处处闻啼鸟"},
+    {"wrap", WRAP, "夜来风雨声花落知多少。床前明月光，疑是地上霜。举头望明月，低头思故乡。"},
+    {"center_wrap", CENTER_WRAP, "白日依山尽，黄河入海流。欲穷千里目，更上一层楼。"},
+};
+
+static void draw(const Case& c) {
+    switch(c.kind) {
+    case STRING:
+        BENCH_FONT.drawString(0, 0, c.text, 0xFFFF);
+        break;
+    case WRAP:
+        BENCH_FONT.drawStringWrap(0, 0, c.text, 0xFFFF, MockTFT::WIDTH);
+        break;
+    case CENTER_WRAP:
+        BENCH_FONT.drawStringCenterWrap(0, c.text, 0xFFFF, MockTFT::WIDTH / 2, MockTFT::WIDTH);
+        break;
+    }
+}
+
+int main() {
+    static MockTFT tft;
+    BENCH_FONT.setTFT(&tft);
+    if(!BENCH_FONT.begin()) {
+        fprintf(stderr, "begin() 失败\n");
+        return 1;
+    }
+
+    const int n = sizeof(CASES) / sizeof(CASES[0]);
+    printf("{\n");
+    for(int i = 0; i < n; i++) {
+        const Case& c = CASES[i];
+
+        // 计数只取第一次绘制
+        tft.clear();
+        draw(c);
+        uint32_t pixels = tft.litPixels();
+        uint32_t pixelCalls = tft.pixelCalls, hlineCalls = tft.hlineCalls;
+        uint32_t pushCalls = tft.pushCalls, charCalls = tft.charCalls, busBytes = tft.busBytes;
+
+        typedef std::chrono::steady_clock Clock;
+        double best = 0;
+        for(int round = 0; round < ROUNDS; round++) {
+            Clock::time_point start = Clock::now();
+            double elapsed = 0;
+            long iters = 0;
+            while(elapsed < ROUND_SECONDS) {
+                for(int k = 0; k < 16; k++) draw(c);
+                iters += 16;
+                elapsed = std::chrono::duration<double>(Clock::now() - start).count();
+            }
+            double ns = elapsed * 1e9 / iters;
+            if(round == 0 || ns < best) best = ns;
+        }
+
+        printf("  \"%s\": {\"pixels\": %u, \"drawPixel\": %u, \"drawFastHLine\": %u, "
+               "\"pushImage\": %u, \"drawChar\": %u, \"bus_bytes\": %u, \"ns_per_draw\": %.0f}%s\n",
+               c.name, pixels, pixelCalls, hlineCalls, pushCalls, charCalls, busBytes,
+               best, i + 1 < n ? "," : "");
+    }
+    printf("}\n");
+    return 0;
+}
@@ -0,0 +1,254 @@
+"""
+性能基准：生成速度（Python）和生成代码的绘制开销（主机端C++）
+
+Python 部分：每个字号在单独的子进程里不带缓存完整生成（--repeat 次取最快），记录字数/秒、峰值内存(RSS)和输出文件大小
+C++ 部分：用 g++ 把生成的库和 bench_draw.cpp 编译到模拟TFT上，统计每个字符串的点数、调用次数、估算传输量和耗时
+
+用法:
+  python bench/run_benchmarks.py                  运行并与 bench/baseline.json 对比
+  python bench/run_benchmarks.py --save           运行并把结果存为新的基准
+  python bench/run_benchmarks.py --sizes 12,16 --no-draw -o result.json
+
+基准里的耗时和机器有关，换机器后先 --save 一次；点数、调用次数、文件大小与机器无关，任何变化都会列出。
+有指标变差时退出码为1，可直接放进CI。
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+HOST_DIR = os.path.join(ROOT_DIR, 'host')
+sys.path.insert(0, ROOT_DIR)
+
+from generate_font import FontGenerator, peak_rss_kb, resolve_codepoints
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+LIB_NAME = 'Bench'
+
+# 指标 -> (方向, 是否计时类)：'higher' 越大越好，'lower' 越小越好，None 任何变化都算变差（点阵变了）；
+# 计时类指标按 --tolerance 容差判断，其余精确比较
+METRICS = {
+    'glyphs_per_sec': ('higher', True),
+    'peak_rss_kb': ('lower', True),
+    'output_bytes': ('lower', False),
+    'pixels': (None, False),
+    'drawPixel': ('lower', False),
+    'drawFastHLine': ('lower', False),
+    'pushImage': ('lower', False),
+    'drawChar': ('lower', False),
+    'bus_bytes': ('lower', False),
+    'ns_per_draw': ('lower', True),
+}
+
+def lib_dir(workdir, size):
+    return os.path.join(workdir, f'GB2312_{size}_{LIB_NAME}')
+
+def dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+def measure_generate(ttf, size, charset, engine, jobs, render, workdir):
+    """在当前进程里生成一个字号（由子进程调用，峰值内存才是这个字号自己的）"""
+    codepoints = resolve_codepoints(charset)
+    gen = FontGenerator()
+    out_dir = lib_dir(workdir, size)
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        ok = gen.generate(ttf, size, LIB_NAME, out_dir, engine=engine, jobs=jobs,
+                          codepoints=codepoints, render=render)
+        seconds = time.perf_counter() - start
+    if not ok:
+        return None
+    return {
+        'glyphs': len(codepoints),
+        'seconds': round(seconds, 3),
+        'glyphs_per_sec': round(len(codepoints) / seconds, 1),
+        'peak_rss_kb': peak_rss_kb(),
+        'output_bytes': dir_bytes(out_dir),
+    }
+
+def run_python(args, size, workdir):
+    """每次生成都在新的子进程里，取最快的一次"""
+    cmd = [sys.executable, os.path.abspath(__file__), '--one', str(size), '--workdir', workdir,
+           '--ttf', args.ttf, '--charset', args.charset, '--engine', args.engine,
+           '--jobs', str(args.jobs), '--render', args.render]
+    best = None
+    for _ in range(args.repeat):
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, text=True)
+        if proc.returncode != 0:
+            print(f"❌ {size}号生成失败")
+            return None
+        stats = json.loads(proc.stdout)
+        if best is None or stats['seconds'] < best['seconds']:
+            best = stats
+    return best
+
+def run_draw(size, workdir):
+    """编译 bench_draw.cpp 并运行，返回每个字符串的统计"""
+    src = os.path.join(lib_dir(workdir, size), 'src')
+    lib = os.path.basename(lib_dir(workdir, size))
+    exe = os.path.join(workdir, f'bench_draw_{size}')
+    cmd = ['g++', '-std=c++11', '-O2', '-I', HOST_DIR, '-I', src,
+           f'-DBENCH_HEADER="{lib}.h"', f'-DBENCH_FONT={LIB_NAME}{size}',
+           os.path.join(BENCH_DIR, 'bench_draw.cpp'), os.path.join(src, f'{lib}.cpp'), '-o', exe]
+    try:
+        subprocess.run(cmd, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"❌ {size}号编译失败: {e}")
+        return None
+    proc = subprocess.run([exe], stdout=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        print(f"❌ {size}号绘制测试退出码 {proc.returncode}")
+        return None
+    return json.loads(proc.stdout)
+
+def run_all(args):
+    import PIL
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+
+    result = {
+        'meta': {
+            'ttf': os.path.basename(args.ttf),
+            'charset': args.charset,
+            'engine': args.engine,
+            'jobs': args.jobs,
+            'render': args.render,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'numpy': numpy_version,
+            'machine': platform.machine(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'generate': {},
+        'draw': {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            stats = run_python(args, size, workdir)
+            if stats is None:
+                continue
+            result['generate'][str(size)] = stats
+            rss = f"{stats['peak_rss_kb'] / 1024:.0f}MB" if stats['peak_rss_kb'] else '-'
+            print(f"  {size:2d}号  {stats['glyphs_per_sec']:9.1f} 字/秒  {stats['seconds']:7.2f}秒  "
+                  f"峰值内存 {rss:>6}  输出 {stats['output_bytes'] / 1024:8.1f}KB")
+
+            if args.draw:
+                cases = run_draw(size, workdir)
+                if cases is None:
+                    continue
+                result['draw'][str(size)] = cases
+                for name, c in cases.items():
+                    print(f"        {name:12s} 点 {c['pixels']:6d}  drawPixel {c['drawPixel']:6d}  "
+                          f"drawFastHLine {c['drawFastHLine']:5d}  pushImage {c['pushImage']:3d}  drawChar {c['drawChar']:3d}  "
+                          f"传输 {c['bus_bytes']:7d}字节  {c['ns_per_draw'] / 1000:8.1f}微秒")
+    return result
+
+def compare(result, baseline, tolerance):
+    """逐项对比，返回变差的指标数；计时类超出容差才算变差，计数类任何变化都列出"""
+    regressions = 0
+    for section in ('generate', 'draw'):
+        for size, current in result[section].items():
+            old = baseline.get(section, {}).get(size)
+            if old is None:
+                continue
+            # generate 下是一层指标，draw 下每个字符串一层
+            groups = {'': current} if section == 'generate' else current
+            old_groups = {'': old} if section == 'generate' else old
+            for group, metrics in groups.items():
+                for key, value in metrics.items():
+                    if key not in METRICS or value is None:
+                        continue
+                    prev = old_groups.get(group, {}).get(key)
+                    if prev is None or prev == value:
+                        continue
+                    direction, timed = METRICS[key]
+                    change = (value - prev) / prev if prev else float('inf')
+                    if direction is None:
+                        worse = True
+                    else:
+                        worse = change < 0 if direction == 'higher' else change > 0
+                    if timed and abs(change) <= tolerance:
+                        continue
+                    label = f"{section} {size}号 {group + ' ' if group else ''}{key}"
+                    mark = '变化' if direction is None else '变差' if worse else '变好'
+                    print(f"  {'❌' if worse else '✅'} {label}: {prev} -> {value} ({change:+.1%}) {mark}")
+                    regressions += worse
+    return regressions
+
+def main():
+    gen = FontGenerator()
+    parser = argparse.ArgumentParser(description='字库生成器性能基准')
+    parser.add_argument('--ttf', default=os.path.join(ROOT_DIR, 'FangSong.ttf'), help='字体文件（默认仓库自带的仿宋）')
+    parser.add_argument('--sizes', help='逗号分隔的字号，默认 font_configs 里的全部字号')
+    parser.add_argument('--charset', default='gb2312', help='字符集，默认 gb2312')
+    parser.add_argument('--engine', default='auto', choices=['auto', 'numpy', 'reference'])
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='并行渲染进程数')
+    parser.add_argument('--render', default='span', choices=['pixel', 'span', 'blit'], help='生成代码的绘制方式')
+    parser.add_argument('--repeat', type=int, default=3, help='每个字号生成几次取最快，默认3')
+    parser.add_argument('--no-draw', dest='draw', action='store_false', help='不编译运行主机端绘制测试')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基准文件，默认 bench/baseline.json')
+    parser.add_argument('--save', action='store_true', help='把本次结果写入基准文件')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='计时类指标允许的波动，默认0.3（30%%）')
+    parser.add_argument('-o', '--output', help='本次结果另存为JSON')
+    parser.add_argument('--one', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 子进程：只生成一个字号，结果JSON写到stdout
+    if args.one:
+        stats = measure_generate(args.ttf, args.one, args.charset, args.engine, args.jobs,
+                                 args.render, args.workdir)
+        if stats is None:
+            sys.exit(1)
+        print(json.dumps(stats))
+        return
+
+    args.sizes = [int(s) for s in args.sizes.split(',')] if args.sizes else sorted(gen.font_configs)
+    unknown = [s for s in args.sizes if s not in gen.font_configs]
+    if unknown:
+        print(f"❌ 不支持的字号: {unknown}")
+        sys.exit(1)
+
+    print(f"基准测试: {os.path.basename(args.ttf)}  字符集 {args.charset}  引擎 {args.engine}  绘制方式 {args.render}")
+    result = run_all(args)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"✅ 已保存基准: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("没有基准文件，加 --save 保存本次结果作为基准")
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\n与基准对比（{baseline['meta'].get('date', '?')}，计时容差 {args.tolerance:.0%}）:")
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print(f"❌ {regressions} 项指标变差")
+        sys.exit(1)
+    print("✅ 没有变差的指标")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,1044 @@
 from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import collections
+import contextlib
+import hashlib
+import io
+import json
+import mmap
 import os
+import queue
+import re
+import struct
 import sys
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # 没装numpy时退回逐像素参考实现
+    np = None
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不统计峰值内存
+    resource = None
+
+# 默认码位范围（CJK统一汉字基本区）
+UNICODE_START = 0x4E00
+UNICODE_END = 0x9FA5
+
+# 每批向量化渲染的字数
+RENDER_BATCH = 1024
+
+# 渲染与写出之间的队列长度（批）：渲染最多领先写出这么多批，内存占用与字数无关
+PIPELINE_QUEUE = 4
+
+# 生成器版本：居中规则或点阵格式改变时加1，旧的字形缓存自动失效
+GENERATOR_VERSION = 1
+
+# 字形缓存文件头: 魔数, 格式版本, 字号, 每字字节数, 字数
+CACHE_MAGIC = b'CFGC'
+CACHE_HEADER = struct.Struct('<4sHHII')
+
+# 工作进程内的生成器，字体按 (ttf路径, 字号) 缓存在其中跨任务复用
+_worker_gen = None
+
+def _render_chunk(task):
+    """进程池任务：渲染一段码位，返回点阵字节；profile 时同时返回本块各阶段耗时"""
+    global _worker_gen
+    ttf_path, size, engine, codepoints, profile = task
+    if _worker_gen is None:
+        _worker_gen = FontGenerator()
+    if not profile:
+        _worker_gen.metrics = None
+        font = _worker_gen.load_font(ttf_path, size)
+        return _worker_gen.render_glyphs(font, codepoints, size, engine)
+    
+    _worker_gen.metrics = BuildMetrics()
+    _worker_gen.metrics.begin(None, size, len(codepoints))
+    font = _worker_gen.load_font(ttf_path, size)
+    data = _worker_gen.render_glyphs(font, codepoints, size, engine)
+    return data, _worker_gen.metrics.current['stages']
+
+# 外部二进制字库文件头（小端）:
+# 魔数, 格式版本, 头长度, 字号, 每行字节数, 行数, 标志, 字数, 首码位, 末码位, 码位表偏移, 字模偏移
+BIN_MAGIC = b'CFNT'
+BIN_VERSION = 1
+BIN_HEADER = struct.Struct('<4sHHHHHHIIIII')
+BIN_FLAG_INDEX = 0x0001  # 有码位表（码位不连续）
+
+# 压缩字模偏移表：每 64 个字一个 uint32 基址，每个字一个 uint16 相对偏移
+COMPRESS_BLOCK = 64
+
+# 紧凑存储（--tight）时一并收录的 ASCII 可见字符 0x20-0x7E，按字体自身宽度排版
+ASCII_FIRST = 0x20
+ASCII_LAST = 0x7E
+
+# 内置字符集
+CHARSETS = {
+    'all': '0x4E00-0x9FA5 全部 20902 个汉字（默认）',
+    'gb2312': 'GB2312 一级+二级汉字，6763 字',
+    'gb2312-1': 'GB2312 一级汉字（常用字），3755 字',
+    'gb2312-2': 'GB2312 二级汉字，3008 字',
+    'gbk': 'GBK 全部汉字，20923 字',
+}
+
+# 扫描项目源码时读取的文件类型，其中 C/C++ 源码先去掉注释
+SCAN_EXTENSIONS = ('.c', '.cc', '.cpp', '.h', '.hpp', '.ino', '.txt', '.json')
+C_EXTENSIONS = ('.c', '.cc', '.cpp', '.h', '.hpp', '.ino')
+
+# drawStringWrap / drawStringCenterWrap 最多画的行数（预渲染的静态文本按同样的上限排版）
+MAX_LINES = 50
+
+# 静态文本的排版方式，下标即生成代码里 _STATIC_KEY 表的排版方式编号
+STATIC_MODES = ('string', 'wrap', 'center', 'center_wrap')
+
+# 可预渲染的调用: 方法名 -> (排版方式, 实参个数, 文本实参下标, maxWidth 实参下标, lineHeight 实参下标)
+STATIC_CALLS = {
+    'drawString': ('string', (4,), 2, None, None),
+    'drawStringWrap': ('wrap', (5, 6), 2, 4, 5),
+    'drawStringCenter': ('center', (4,), 1, None, None),
+    'drawStringCenterWrap': ('center_wrap', (5, 6), 1, 4, 5),
+}
+
+def is_hanzi(unicode):
+    """是否为可放进字库的汉字码位（CJK统一汉字、扩展A、兼容汉字）"""
+    return (0x4E00 <= unicode <= 0x9FFF or 0x3400 <= unicode <= 0x4DBF
+            or 0xF900 <= unicode <= 0xFAFF)
+
+def _decode_double_byte(codec, rows, cells):
+    out = []
+    for hi in rows:
+        for lo in cells:
+            try:
+                char = bytes([hi, lo]).decode(codec)
+            except UnicodeDecodeError:
+                continue
+            if len(char) == 1 and is_hanzi(ord(char)):
+                out.append(ord(char))
+    return out
+
+def charset_codepoints(name):
+    """按名字返回内置字符集的码位（升序）"""
+    if name == 'all':
+        return list(range(UNICODE_START, UNICODE_END + 1))
+    if name == 'gb2312-1':
+        # 16~55区，按拼音排序
+        return sorted(_decode_double_byte('gb2312', range(0xB0, 0xD8), range(0xA1, 0xFF)))
+    if name == 'gb2312-2':
+        # 56~87区，按部首排序
+        return sorted(_decode_double_byte('gb2312', range(0xD8, 0xF8), range(0xA1, 0xFF)))
+    if name == 'gb2312':
+        return sorted(charset_codepoints('gb2312-1') + charset_codepoints('gb2312-2'))
+    if name == 'gbk':
+        cells = [lo for lo in range(0x40, 0xFF) if lo != 0x7F]
+        return sorted(set(_decode_double_byte('gbk', range(0x81, 0xFF), cells)))
+    raise ValueError(f"未知字符集: {name}，可选: {', '.join(CHARSETS)}")
+
+def text_codepoints(text):
+    """文本中出现的汉字码位"""
+    return {ord(c) for c in text if is_hanzi(ord(c))}
+
+def iter_sources(src_dir):
+    """项目源码文件路径，跳过 .pio/.git 等目录和本工具生成的 GB2312_* 库文件"""
+    for root, dirs, files in os.walk(src_dir):
+        dirs[:] = [d for d in dirs if d not in ('.pio', '.git', '.font_cache', '.vscode')]
+        for name in files:
+            if name.endswith(SCAN_EXTENSIONS) and not name.startswith('GB2312_'):
+                yield os.path.join(root, name)
+
+# C/C++ 的注释，以及要原样跳过的字符串、字符字面量（其中的 // 和 /* 不是注释）
+_C_TOKEN_RE = re.compile(r'//[^\n]*|/\*.*?(?:\*/|\Z)|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.S)
+
+def strip_c_comments(text):
+    """去掉 C/C++ 源码里的 // 和 /* */ 注释（块注释换成一个空格），字符串和字符字面量原样保留"""
+    def replace(match):
+        token = match.group(0)
+        if token.startswith('//'):
+            return ''
+        if token.startswith('/*'):
+            return ' '
+        return token
+    return _C_TOKEN_RE.sub(replace, text)
+
+def read_source(path):
+    """读取一个源码文件，C/C++ 源码去掉注释（注释里的字固件不会画）"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        text = f.read()
+    return strip_c_comments(text) if path.endswith(C_EXTENSIONS) else text
+
+def scan_project(src_dir, static_objects=(), static_ascii=False):
+    """
+    扫描项目源码，收集实际用到的汉字
+    
+    跳过 .pio/.git 等目录和本工具生成的 GB2312_* 库文件，C/C++ 源码去掉注释，
+    避免把字库和注释当成“用到的字”。
+    static_objects: 这些字库对象上可预渲染的 drawString* 调用（见 find_static_calls）
+                    会编译成静态位图，其中的字不计入；static_ascii 为 False 时含 ASCII 的文本照常计入
+    """
+    found = set()
+    for path in iter_sources(src_dir):
+        text = read_source(path)
+        if static_objects:
+            # 去掉会被预渲染的调用，剩下的才是运行时要查字库的字
+            kept = []
+            pos = 0
+            for _, start, end, entry in find_static_calls(text, static_objects):
+                if static_ascii or not any(ord(c) < 0x80 for c in entry['text']):
+                    kept.append(text[pos:start])
+                    pos = end
+            kept.append(text[pos:])
+            text = ''.join(kept)
+        found |= text_codepoints(text)
+    return found
+
+def resolve_codepoints(charset=None, charset_file=None, scan_dir=None, static_objects=(),
+                       static_ascii=False):
+    """
+    合并所选字符来源，返回升序码位表
+    
+    charset: 内置字符集名（见 CHARSETS）
+    charset_file: 自定义字表文件，文件里出现的所有汉字
+    scan_dir: 扫描该目录下源码里出现的汉字
+    三者都不指定时为默认的 0x4E00-0x9FA5 全集。
+    static_objects/static_ascii: 传给 scan_project，只出现在静态文本里的字不收录
+    """
+    if not (charset or charset_file or scan_dir):
+        charset = 'all'
+    codepoints = set()
+    if charset:
+        codepoints.update(charset_codepoints(charset))
+    if charset_file:
+        with open(charset_file, 'r', encoding='utf-8') as f:
+            codepoints |= text_codepoints(f.read())
+    if scan_dir:
+        codepoints |= scan_project(scan_dir, static_objects, static_ascii)
+    return sorted(codepoints)
+
+def _call_args(text, pos):
+    """从左括号后的 pos 开始按顶层逗号切分实参，返回 (实参列表, 右括号后的位置)，括号不配对时返回 None"""
+    args = []
+    depth = 0
+    start = pos
+    i = pos
+    while i < len(text):
+        c = text[i]
+        if c in '"\'':
+            # 跳过字符串/字符字面量，里面的逗号和括号不算
+            i += 1
+            while i < len(text) and text[i] != c:
+                i += 2 if text[i] == '\\' else 1
+        elif c in '([{':
+            depth += 1
+        elif c in ')]}':
+            if depth == 0:
+                args.append(text[start:i].strip())
+                return args, i + 1
+            depth -= 1
+        elif c == ',' and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+        i += 1
+    return None
+
+def _c_string(arg):
+    """单个 C 字符串字面量的内容；不是字面量，或有引号和反斜杠以外的转义时返回 None"""
+    m = re.fullmatch(r'"((?:[^"\\\n]|\\.)*)"', arg)
+    if not m or re.search(r'\\[^\\"\']', m.group(1)):
+        return None
+    return re.sub(r'\\(.)', r'\1', m.group(1))
+
+def find_static_calls(text, objects):
+    """
+    在源码里找 objects 这些字库对象上文本和排版参数都是字面量的 drawString* 调用
+    
+    如 FangSong16.drawStringCenterWrap(80, "长按返回", TFT_WHITE, 120, 100, 20)，
+    坐标和颜色可以是变量。返回 [(对象名, 起始位置, 结束位置, 静态文本), ...]，
+    静态文本的格式同 load_static_file。
+    """
+    if not objects:
+        return []
+    pattern = re.compile(r'\b(%s)\s*\.\s*(%s)\s*\(' % ('|'.join(map(re.escape, objects)),
+                                                      '|'.join(STATIC_CALLS)))
+    calls = []
+    for m in pattern.finditer(text):
+        parsed = _call_args(text, m.end())
+        if parsed is None:
+            continue
+        args, end = parsed
+        mode, counts, text_arg, width_arg, line_arg = STATIC_CALLS[m.group(2)]
+        if len(args) not in counts:
+            continue
+        value = _c_string(args[text_arg])
+        if not value:
+            continue
+        numbers = [args[i] if i is not None and i < len(args) else '0' for i in (width_arg, line_arg)]
+        if not all(n.isdigit() for n in numbers):
+            continue
+        calls.append((m.group(1), m.start(), end, {
+            'name': None, 'text': value, 'mode': mode,
+            'width': int(numbers[0]), 'line': int(numbers[1]),
+        }))
+    return calls
+
+def scan_static_strings(src_dir, obj_name):
+    """扫描项目源码里 obj_name 对象上可预渲染的调用（注释掉的不算），返回静态文本列表"""
+    entries = []
+    for path in iter_sources(src_dir):
+        entries += [entry for _, _, _, entry in find_static_calls(read_source(path), [obj_name])]
+    return entries
+
+def load_static_file(path, obj_name):
+    """
+    读取静态文本表，返回属于 obj_name 对象的静态文本列表
+    
+    每行 名字 = 文本，名字后可加括号写排版参数：wrap=最大宽度、line=行高、center，
+    对应 drawStringWrap / drawStringCenter / drawStringCenterWrap 的排版；
+    [FangSong16] 这样的小节之后的条目只属于该对象，小节之前的属于所有对象；# 开头为注释。
+    返回 [{'name', 'text', 'mode', 'width', 'line'}, ...]，格式错误时抛出 ValueError。
+    """
+    entries = []
+    section = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            m = re.fullmatch(r'\[(\w+)\]', line)
+            if m:
+                section = m.group(1)
+                continue
+            m = re.fullmatch(r'([A-Za-z_]\w*)\s*(?:\(([^)]*)\))?\s*=\s*(.+)', line)
+            if not m:
+                raise ValueError(f"{path}:{lineno}: 格式应为 名字 = 文本 或 名字(center, wrap=100) = 文本")
+            options = {}
+            for option in filter(None, (o.strip() for o in (m.group(2) or '').split(','))):
+                key, _, value = option.partition('=')
+                key, value = key.strip(), value.strip()
+                if key == 'center' and not value:
+                    options['center'] = True
+                elif key in ('wrap', 'line') and value.isdigit():
+                    options[key] = int(value)
+                else:
+                    raise ValueError(f"{path}:{lineno}: 未知排版参数 {option}，可选 center, wrap=N, line=N")
+            if section is not None and section != obj_name:
+                continue
+            if 'wrap' in options:
+                mode = 'center_wrap' if options.get('center') else 'wrap'
+            else:
+                mode = 'center' if options.get('center') else 'string'
+            entries.append({
+                'name': m.group(1), 'text': m.group(3), 'mode': mode,
+                'width': options.get('wrap', 0), 'line': options.get('line', 0),
+            })
+    return entries
+
+def fnv1a(data):
+    """32位 FNV-1a 哈希，与生成代码里 findStatic 的算法一致"""
+    h = 0x811C9DC5
+    for b in data:
+        h = ((h ^ b) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+def layout_static(text, mode, max_width, line_height, size, ascii_width):
+    """
+    按生成代码里 drawString* 的规则排版，返回 [(x, y, 码位), ...]
+    
+    ASCII 宽度取 ascii_width(码位)，三字节 UTF-8 的字宽为字号，其余字符跳过；
+    居中的排版 x 相对 centerX，每行按 centerX - 行宽/2 对齐。
+    换行的排版与固件一样最多 MAX_LINES 行，超出的部分不画。
+    """
+    wrap = mode in ('wrap', 'center_wrap')
+    lines = [[]]
+    widths = [0]
+    for char in text:
+        unicode = ord(char)
+        if unicode < 0x80:
+            width = ascii_width(unicode)
+        elif 0x800 <= unicode <= 0xFFFF:
+            width = size
+        else:
+            continue
+        # 像素有余数直接舍去，把当前字换到下一行
+        if wrap and widths[-1] + width > max_width and widths[-1] > 0:
+            if len(lines) >= MAX_LINES:
+                break
+            lines.append([])
+            widths.append(0)
+        lines[-1].append((widths[-1], unicode))
+        widths[-1] += width
+    placed = []
+    for n, (line, width) in enumerate(zip(lines, widths)):
+        left = -(width // 2) if mode in ('center', 'center_wrap') else 0
+        placed += [(left + x, n * line_height, unicode) for x, unicode in line]
+    return placed
+
+# 压缩结果按点阵内容记住（--watch 重新生成时没变的字不再压缩），超过上限时清空
+_packed_memo = {}
+PACKED_MEMO_LIMIT = 1 << 16
+
+def compress_glyph(glyph, bytes_per_row, height):
+    """
+    压缩一个字模：行差分 + 两级半字节掩码
+    
+    每行先与上一行异或（第一行与全0行），竖笔画连续的行异或后大多为0。
+    输出 = 行掩码（每行1位，该行异或结果非0时置1，按字节补齐）
+         + 位流：对每个非0行的 bytes_per_row*2 个半字节依次写1位标志，
+           标志为1（半字节非0）时紧跟该半字节的4位；高位在前，末尾按字节补齐。
+    """
+    key = (bytes(glyph), bytes_per_row, height)
+    packed = _packed_memo.get(key)
+    if packed is not None:
+        return packed
+    mask_bytes = (height + 7) // 8
+    row_mask = bytearray(mask_bytes)
+    acc = 0
+    nbits = 0
+    prev = bytes(bytes_per_row)
+    for row in range(height):
+        cur = glyph[row * bytes_per_row:(row + 1) * bytes_per_row]
+        diff = bytes(a ^ b for a, b in zip(cur, prev))
+        prev = cur
+        if not any(diff):
+            continue
+        row_mask[row >> 3] |= 0x80 >> (row & 7)
+        for byte_val in diff:
+            for nibble in (byte_val >> 4, byte_val & 0x0F):
+                if nibble:
+                    acc = (acc << 5) | 0x10 | nibble
+                    nbits += 5
+                else:
+                    acc <<= 1
+                    nbits += 1
+    pad = -nbits % 8
+    stream = (acc << pad).to_bytes((nbits + pad) // 8, 'big') if nbits else b''
+    packed = bytes(row_mask) + stream
+    if len(_packed_memo) >= PACKED_MEMO_LIMIT:
+        _packed_memo.clear()
+    _packed_memo[key] = packed
+    return packed
+
+def decompress_glyph(data, bytes_per_row, height):
+    """compress_glyph 的逆过程，与生成的 C++ decodeGlyph 逻辑一致"""
+    mask_bytes = (height + 7) // 8
+    pos = mask_bytes
+    acc = 0
+    bits = 0
+    
+    def read_bits(n):
+        nonlocal pos, acc, bits
+        while bits < n:
+            acc = ((acc << 8) | data[pos]) & 0xFFFFFFFF
+            pos += 1
+            bits += 8
+        bits -= n
+        return (acc >> bits) & ((1 << n) - 1)
+    
+    out = bytearray(bytes_per_row * height)
+    prev = bytes(bytes_per_row)
+    for row in range(height):
+        cur = bytearray(prev)
+        if data[row >> 3] & (0x80 >> (row & 7)):
+            for n in range(bytes_per_row * 2):
+                if read_bits(1):
+                    cur[n >> 1] ^= read_bits(4) << (0 if n & 1 else 4)
+        out[row * bytes_per_row:(row + 1) * bytes_per_row] = cur
+        prev = cur
+    return bytes(out)
+
+def pack_rows(rows, w):
+    """w 位宽的各行首尾相接成连续位流（行间不补齐，高位在前），末尾补0到整字节"""
+    acc = 0
+    for v in rows:
+        acc = (acc << w) | v
+    nbits = w * len(rows)
+    pad = -nbits % 8
+    return (acc << pad).to_bytes((nbits + pad) // 8, 'big')
+
+def unpack_rows(data, w, h):
+    """pack_rows 的逆过程，返回 h 个 w 位的行"""
+    if not w or not h:
+        return []
+    acc = int.from_bytes(data, 'big') >> (len(data) * 8 - w * h)
+    mask = (1 << w) - 1
+    return [(acc >> (w * (h - 1 - r))) & mask for r in range(h)]
+
+def crop_glyph(glyph, size, bytes_per_row, height):
+    """
+    把整格点阵裁剪到墨迹框，返回 (x, y, w, h, 点阵字节)
+    
+    x/y 为墨迹框在格子里的偏移；裁剪后的 w*h 个点按 pack_rows 存成连续位流，
+    空白字返回 w=h=0 和空字节串。
+    """
+    rows = [int.from_bytes(glyph[r * bytes_per_row:(r + 1) * bytes_per_row], 'big')
+            for r in range(height)]
+    return crop_rows(rows, size)
+
+def crop_rows(rows, size):
+    """每行 size 位（第0列在最高位）的点阵裁剪到墨迹框，返回值同 crop_glyph"""
+    ink = [r for r, v in enumerate(rows) if v]
+    if not ink:
+        return 0, 0, 0, 0, b''
+    merged = 0
+    for v in rows:
+        merged |= v
+    # 第 col 列对应 bit (size-1-col)
+    x = size - merged.bit_length()
+    w = merged.bit_length() - ((merged & -merged).bit_length() - 1)
+    y = ink[0]
+    h = ink[-1] - ink[0] + 1
+    shift = size - x - w
+    mask = (1 << w) - 1
+    return x, y, w, h, pack_rows([(v >> shift) & mask for v in rows[y:y + h]], w)
+
+def c_hex(data):
+    """字节串一次性格式化为 C 数组元素 '0xAB,0xCD,'"""
+    if not data:
+        return ''
+    return '0x' + data.hex(',').upper().replace(',', ',0x') + ','
+
+def c_string(text):
+    """文本转成 C 字符串字面量（UTF-8 原样写出，引号、反斜杠、问号和控制字符转义）"""
+    out = []
+    for char in text:
+        if char in '\\"?':
+            out.append('\\' + char)
+        elif ord(char) < 0x20 or ord(char) == 0x7F:
+            out.append(f'\\{ord(char):03o}')
+        else:
+            out.append(char)
+    return '"' + ''.join(out) + '"'
+
+_hash_memo = {}
+
+def file_hash(path):
+    """字体文件内容的 sha256，同一文件（大小和修改时间不变）只计算一次"""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    digest = _hash_memo.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        _hash_memo[key] = digest
+    return digest
+
+def _parse_cmap4(data, offset):
+    seg_count = struct.unpack_from('>H', data, offset + 6)[0] // 2
+    ends = struct.unpack_from(f'>{seg_count}H', data, offset + 14)
+    starts = struct.unpack_from(f'>{seg_count}H', data, offset + 16 + 2 * seg_count)
+    deltas = struct.unpack_from(f'>{seg_count}h', data, offset + 16 + 4 * seg_count)
+    range_pos = offset + 16 + 6 * seg_count
+    range_offsets = struct.unpack_from(f'>{seg_count}H', data, range_pos)
+    covered = set()
+    for i in range(seg_count):
+        for unicode in range(starts[i], min(ends[i], 0xFFFE) + 1):
+            if range_offsets[i] == 0:
+                glyph_id = (unicode + deltas[i]) & 0xFFFF
+            else:
+                pos = range_pos + 2 * i + range_offsets[i] + 2 * (unicode - starts[i])
+                glyph_id = struct.unpack_from('>H', data, pos)[0]
+                if glyph_id:
+                    glyph_id = (glyph_id + deltas[i]) & 0xFFFF
+            if glyph_id:
+                covered.add(unicode)
+    return covered
+
+def _parse_cmap12(data, offset):
+    count = struct.unpack_from('>I', data, offset + 12)[0]
+    covered = set()
+    for i in range(count):
+        start, end, glyph_id = struct.unpack_from('>III', data, offset + 16 + 12 * i)
+        # 映射到 glyph 0（.notdef）的不算收录
+        covered.update(range(start + (glyph_id == 0), end + 1))
+    return covered
+
+_cmap_memo = {}
+
+def font_codepoints(ttf_path):
+    """
+    读取字体 cmap 表，返回字体实际收录的码位集合（映射到 .notdef 的不算）
+    
+    支持 TTF/OTF 和 TTC（取第一个字体，与 ImageFont.truetype 默认一致），
+    Unicode 子表格式 4 和 12；没有可用子表或解析失败时返回 None（视为全部收录）。
+    """
+    st = os.stat(ttf_path)
+    key = (os.path.abspath(ttf_path), st.st_size, st.st_mtime_ns)
+    if key in _cmap_memo:
+        return _cmap_memo[key]
+    with open(ttf_path, 'rb') as f:
+        data = f.read()
+    covered = None
+    try:
+        offset = 0
+        if data[:4] == b'ttcf':
+            offset = struct.unpack_from('>I', data, 12)[0]
+        num_tables = struct.unpack_from('>H', data, offset + 4)[0]
+        cmap = None
+        for i in range(num_tables):
+            tag, _, table_offset, _ = struct.unpack_from('>4sIII', data, offset + 12 + 16 * i)
+            if tag == b'cmap':
+                cmap = table_offset
+        if cmap is not None:
+            subtables = {}
+            for i in range(struct.unpack_from('>H', data, cmap + 2)[0]):
+                platform, encoding, sub = struct.unpack_from('>HHI', data, cmap + 4 + 8 * i)
+                fmt = struct.unpack_from('>H', data, cmap + sub)[0]
+                subtables.setdefault((platform, encoding, fmt), cmap + sub)
+            # 优先完整 Unicode 子表（格式12），其次 BMP（格式4）
+            for (platform, encoding, fmt), sub in sorted(subtables.items(),
+                                                         key=lambda item: -item[0][2]):
+                if platform == 0 or (platform == 3 and encoding in (1, 10)):
+                    if fmt == 12:
+                        covered = _parse_cmap12(data, sub)
+                        break
+                    if fmt == 4:
+                        covered = _parse_cmap4(data, sub)
+                        break
+    except struct.error:
+        covered = None
+    _cmap_memo[key] = covered
+    return covered
+
+class GlyphCache:
+    """
+    磁盘字形缓存
+    
+    每个 (字体文件hash, 字号, 生成器版本) 对应一个紧凑的二进制文件：
+    文件头 + 升序码位表(uint32) + 点阵数据，可直接 mmap 读取。
+    缓存目录总大小超过 max_bytes 时，按最近使用时间淘汰最旧的文件。
+    """
+    
+    def __init__(self, cache_dir='.font_cache', max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+    
+    def path_for(self, ttf_path, size):
+        return os.path.join(self.cache_dir,
+                            f"{file_hash(ttf_path)[:24]}_{size}_v{GENERATOR_VERSION}.bin")
+    
+    def load(self, ttf_path, size, bytes_per_char):
+        """读取缓存，返回 {码位: 点阵字节}；没有缓存或文件损坏时返回空字典"""
+        path = self.path_for(ttf_path, size)
+        if not os.path.exists(path):
+            return {}
+        glyphs = {}
+        with open(path, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # 空文件
+                return {}
+            with mm:
+                if len(mm) < CACHE_HEADER.size:
+                    return {}
+                magic, fmt, cached_size, cached_bpc, count = CACHE_HEADER.unpack_from(mm, 0)
+                expected = CACHE_HEADER.size + count * (4 + bytes_per_char)
+                if (magic != CACHE_MAGIC or fmt != GENERATOR_VERSION or cached_size != size
+                        or cached_bpc != bytes_per_char or len(mm) != expected):
+                    return {}
+                codepoints = struct.unpack_from(f'<{count}I', mm, CACHE_HEADER.size)
+                data = mm[CACHE_HEADER.size + 4 * count:]
+        for i, unicode in enumerate(codepoints):
+            glyphs[unicode] = data[i * bytes_per_char:(i + 1) * bytes_per_char]
+        # 更新修改时间，作为淘汰时的最近使用时间
+        os.utime(path)
+        return glyphs
+    
+    def store(self, ttf_path, size, bytes_per_char, glyphs):
+        """写入（覆盖）缓存文件，然后按大小上限淘汰旧文件"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(ttf_path, size)
+        codepoints = sorted(glyphs)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, GENERATOR_VERSION, size,
+                                      bytes_per_char, len(codepoints)))
+            f.write(struct.pack(f'<{len(codepoints)}I', *codepoints))
+            f.write(b''.join(glyphs[u] for u in codepoints))
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+    
+    def evict(self, keep=None):
+        """缓存目录超过大小上限时，从最久未使用的文件开始删除"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(e[1] for e in entries)
+        for mtime, fsize, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+            os.remove(path)
+            total -= fsize
+
+class MemoryGlyphCache:
+    """
+    内存字形缓存（--watch 常驻进程用），接口同 GlyphCache
+    
+    每个 (字体文件, 字号) 在内存里保留一份 {码位: 点阵字节}，字体内容变了（hash 不同）自动作废；
+    disk 为 GlyphCache 时内存里没有的先从磁盘读，新渲染的字同时写回磁盘。
+    """
+    
+    def __init__(self, disk=None):
+        self.disk = disk
+        self._glyphs = {}
+    
+    def load(self, ttf_path, size, bytes_per_char):
+        key = (os.path.abspath(ttf_path), size)
+        version = (file_hash(ttf_path), bytes_per_char)
+        entry = self._glyphs.get(key)
+        if entry is None or entry[0] != version:
+            glyphs = self.disk.load(ttf_path, size, bytes_per_char) if self.disk is not None else {}
+            entry = (version, glyphs)
+            self._glyphs[key] = entry
+        return entry[1]
+    
+    def store(self, ttf_path, size, bytes_per_char, glyphs):
+        key = (os.path.abspath(ttf_path), size)
+        self._glyphs[key] = ((file_hash(ttf_path), bytes_per_char), glyphs)
+        if self.disk is not None:
+            self.disk.store(ttf_path, size, bytes_per_char, glyphs)
+
+def peak_rss_kb():
+    """进程峰值内存（KB），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位是KB，macOS 是字节
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+class BuildMetrics:
+    """
+    构建耗时统计（--profile / --metrics）
+    
+    每次 generate 对应 builds 里的一项：各阶段耗时、渲染吞吐随时间的变化、峰值内存。
+    阶段按顺序打点（lap），两次打点之间的时间记到后一个阶段上，其中取渲染结果的时间
+    单独记为 render；render.bbox / render.rasterize / render.pack 是渲染内部的细分，
+    多进程时为各工作进程的CPU时间之和。
+    verbose: 每次构建结束时打印阶段耗时表
+    profiler: 可选的 cProfile.Profile，只在取渲染结果时启用
+    """
+    
+    def __init__(self, verbose=False, profiler=None):
+        self.builds = []
+        self.current = None
+        self.verbose = verbose
+        self.profiler = profiler
+        self._start = 0.0
+        self._mark = 0.0
+        self._inner = 0.0
+    
+    def begin(self, lib_name, size, glyphs):
+        self.current = {'lib': lib_name, 'size': size, 'glyphs': glyphs,
+                        'stages': {}, 'throughput': []}
+        self.builds.append(self.current)
+        self._start = self._mark = time.perf_counter()
+        self._inner = 0.0
+    
+    def add(self, stage, seconds):
+        stages = self.current['stages']
+        stages[stage] = stages.get(stage, 0.0) + seconds
+    
+    def lap(self, stage):
+        """上次打点到现在的时间（扣除其间取渲染结果的时间）记到 stage"""
+        now = time.perf_counter()
+        self.add(stage, now - self._mark - self._inner)
+        self._mark = now
+        self._inner = 0.0
+    
+    def timed_batches(self, rendered):
+        """包装 (batch, data) 迭代器：取每一批的时间记到 render，并记录累计字数随时间的变化"""
+        it = iter(rendered)
+        done = 0
+        while True:
+            start = time.perf_counter()
+            if self.profiler is not None:
+                self.profiler.enable()
+            try:
+                batch, data = next(it)
+            except StopIteration:
+                return
+            finally:
+                if self.profiler is not None:
+                    self.profiler.disable()
+                elapsed = time.perf_counter() - start
+                self.add('render', elapsed)
+                self._inner += elapsed
+            done += len(batch)
+            self.current['throughput'].append(
+                [round(time.perf_counter() - self._start, 4), done])
+            yield batch, data
+    
+    def end(self, ok=True):
+        """结束当前构建；失败的构建（ok=False）记下到失败为止的耗时，吞吐记为0"""
+        seconds = time.perf_counter() - self._start
+        build = self.current
+        build['ok'] = ok
+        build['seconds'] = seconds
+        build['glyphs_per_sec'] = build['glyphs'] / seconds if ok and seconds > 0 else 0
+        build['peak_rss_kb'] = peak_rss_kb()
+    
+    def report(self, build=None):
+        """打印一次构建的阶段耗时表"""
+        build = build or self.current
+        rss = build.get('peak_rss_kb')
+        elapsed = build.get('seconds', 0.0)
+        status = '  未完成' if 'seconds' not in build else '' if build['ok'] else '  失败'
+        print(f"\n耗时统计: {build['lib']}  {build['glyphs']} 字  {elapsed:.2f} 秒  "
+              f"{build.get('glyphs_per_sec', 0):.0f} 字/秒" + (f"  峰值内存 {rss / 1024:.0f} MB" if rss else '')
+              + status)
+        # 顶层阶段按占总时间的比例；细分阶段（render.xxx）跟在父阶段后面，按占细分合计的比例
+        stages = build.get('stages', {})
+        for stage, seconds in stages.items():
+            if '.' in stage:
+                continue
+            share = 100 * seconds / elapsed if elapsed > 0 else 0
+            print(f"  {stage:<20} {seconds:8.3f} s  {share:5.1f}%")
+            parts = {k: v for k, v in stages.items() if k.startswith(stage + '.')}
+            total = sum(parts.values())
+            for part, part_seconds in parts.items():
+                share = 100 * part_seconds / total if total > 0 else 0
+                print(f"    {part:<18} {part_seconds:8.3f} s  {share:5.1f}%")
+        
+        # 吞吐：每约十分之一进度取一个点
+        samples = build.get('throughput', [])
+        if len(samples) > 1:
+            step = max(1, len(samples) // 10)
+            points = samples[step - 1::step]
+            if points[-1] is not samples[-1]:
+                points.append(samples[-1])
+            print('  吞吐: ' + '  '.join(f"{t:.2f}s:{n}" for t, n in points))
+    
+    def to_dict(self):
+        builds = []
+        for build in self.builds:
+            # 没有 end 的构建（中途出错）没有总耗时，记为 null
+            out = dict(build)
+            out['ok'] = build.get('ok', False)
+            out['seconds'] = round(build['seconds'], 4) if 'seconds' in build else None
+            out['glyphs_per_sec'] = round(build.get('glyphs_per_sec', 0), 1)
+            out['stages'] = {k: round(v, 4) for k, v in build.get('stages', {}).items()}
+            builds.append(out)
+        return {'generator_version': GENERATOR_VERSION, 'builds': builds}
+    
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+def open_output(target, mode='w'):
+    """target 是路径时以 1MB 缓冲区打开（文本按 utf-8），已打开的文件原样交给 with，用完不关闭"""
+    if hasattr(target, 'write'):
+        return contextlib.nullcontext(target)
+    if 'b' in mode:
+        return open(target, mode, buffering=1 << 20)
+    return open(target, mode, encoding='utf-8', buffering=1 << 20)
+
+class DirectoryOutput:
+    """库文件写到目录里（generate 的默认输出），路径都相对于库目录"""
+    
+    def __init__(self, root):
+        self.root = root
+    
+    def path(self, name):
+        return os.path.join(self.root, name)
+    
+    def open(self, name, mode='w'):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open_output(path, mode)
+    
+    def remove(self, name):
+        """删掉之前生成、这次不再需要的文件（留着会被编译进固件）"""
+        path = self.path(name)
+        if os.path.exists(path):
+            os.remove(path)
+    
+    def size(self, name):
+        return os.path.getsize(self.path(name))
+
+class MemoryOutput:
+    """
+    库文件留在内存里：files 为 {相对路径: 文件内容(bytes)}，文本按 utf-8 编码
+    
+    用于只要生成结果、不写磁盘的场合（测试、服务端直接返回）；save() 再把有变化的文件写到目录里。
+    """
+    
+    def __init__(self, root='<memory>'):
+        self.root = root
+        self.files = {}
+        # 以文本方式写出的文件（save 时按文本写，换行符随平台）和生成时删除的文件
+        self.text = set()
+        self.removed = set()
+    
+    def path(self, name):
+        return f'{self.root}/{name}' if name else self.root
+    
+    def open(self, name, mode='w'):
+        files = self.files
+        
+        class Text(io.StringIO):
+            def close(self):
+                if not self.closed:
+                    files[name] = self.getvalue().encode('utf-8')
+                super().close()
+        
+        class Binary(io.BytesIO):
+            def close(self):
+                if not self.closed:
+                    files[name] = self.getvalue()
+                super().close()
+        
+        self.removed.discard(name)
+        if 'b' in mode:
+            self.text.discard(name)
+            return Binary()
+        self.text.add(name)
+        return Text()
+    
+    def remove(self, name):
+        self.files.pop(name, None)
+        self.removed.add(name)
+    
+    def size(self, name):
+        return len(self.files[name])
+    
+    def save(self, root):
+        """
+        写到目录 root 下，内容没变的文件不重写（修改时间不变，固件项目不会重新编译它）
+        
+        删除生成时 remove 掉的文件；返回实际写出或删除的相对路径。
+        """
+        changed = []
+        for name, data in self.files.items():
+            path = os.path.join(root, name)
+            text = name in self.text
+            try:
+                with open(path, 'r', encoding='utf-8') if text else open(path, 'rb') as f:
+                    if f.read() == (data.decode('utf-8') if text else data):
+                        continue
+            except (OSError, UnicodeDecodeError):
+                pass
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open_output(path, 'w' if text else 'wb') as f:
+                f.write(data.decode('utf-8') if text else data)
+            changed.append(name)
+        for name in sorted(self.removed):
+            path = os.path.join(root, name)
+            if os.path.exists(path):
+                os.remove(path)
+                changed.append(name)
+        return changed
+
+def prefetch(iterable, maxsize=PIPELINE_QUEUE):
+    """
+    在后台线程里提前取 iterable 的元素，经有界队列交给调用方
+    
+    渲染（numpy / PIL 大部分时间不持有 GIL）和格式化写出因此同时进行；队列满时后台线程等待，
+    最多领先 maxsize 个元素。后台线程里的异常在调用方取到该位置时重新抛出；
+    调用方提前结束迭代时后台线程随之退出。第一次取元素时才启动线程。
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item, error=None):
+        # 调用方不再取时放弃，免得后台线程卡在满队列上
+        while not stop.is_set():
+            try:
+                items.put((item, error), timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(done, e)
+            return
+        put(done)
+    
+    worker = threading.Thread(target=produce, name='prefetch', daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+class RenderWindow:
+    """
+    进程池前的有界提交窗口：渲染块按加入顺序排队，同时在途（已提交未取走）的不超过 limit 个
+    
+    取走一块再补交一块，已渲染未写出的字模不会在内存里越积越多。批量模式下所有任务的块排在
+    同一个窗口里，按任务顺序取：写前一个库快结束时，窗口已经在渲染下一个任务的块。
+    取结果可以在 prefetch 的后台线程里进行；第一轮提交（工作进程随之启动）由调用方调 fill 完成。
+    """
+    
+    def __init__(self, pool, limit):
+        self.pool = pool
+        self.limit = max(1, limit)
+        self.waiting = collections.deque()
+        self.submitted = collections.deque()
+        self._lock = threading.Lock()
+    
+    def add(self, tasks):
+        """排入一组 _render_chunk 任务，返回对应的槽位（按顺序交给 take）"""
+        slots = [[task, None] for task in tasks]
+        with self._lock:
+            self.waiting.extend(slots)
+        return slots
+    
+    def fill(self):
+        with self._lock:
+            self._fill()
+    
+    def _fill(self):
+        while self.waiting and len(self.submitted) < self.limit:
+            self._submit_next()
+    
+    def _submit_next(self):
+        slot = self.waiting.popleft()
+        slot[1] = self.pool.submit(_render_chunk, slot[0])
+        self.submitted.append(slot)
+    
+    def take(self, slot):
+        """等该槽位的块渲染完，返回其 future，并补交排在后面的块"""
+        with self._lock:
+            # 排在前面却没被取走的块（所属任务失败、没有读完）不再需要
+            if slot[1] is None:
+                while self.submitted:
+                    self.submitted.popleft()[1].cancel()
+                while self.waiting[0] is not slot:
+                    self.waiting.popleft()
+                self._submit_next()
+            while self.submitted[0] is not slot:
+                self.submitted.popleft()[1].cancel()
+        slot[1].result()
+        with self._lock:
+            self.submitted.popleft()
+            self._fill()
+        return slot[1]
 
 class FontGenerator:
     def __init__(self):
@@ -18,8 +1056,1024 @@ class FontGenerator:
             36: (5, 36),   # 36x36: 每行5字节，36行
             40: (5, 40),   # 40x40: 每行5字节，40行
         }
+        # 已解析的字体：(ttf路径, 字号) -> (文件修改时间, FreeTypeFont)
+        self._fonts = {}
+        # BuildMetrics 耗时统计，None 表示不统计
+        self.metrics = None
     
-    def generate(self, ttf_path, size, font_name, output_dir=None):
+    def _lap(self, stage):
+        if self.metrics is not None:
+            self.metrics.lap(stage)
+    
+    def load_font(self, ttf_path, size):
+        """加载字体，同一 (ttf路径, 字号) 只解析一次；字体文件改过（--watch 时）重新解析"""
+        key = (os.path.abspath(ttf_path), size)
+        mtime = os.stat(ttf_path).st_mtime_ns
+        loaded = self._fonts.get(key)
+        if loaded is None or loaded[0] != mtime:
+            loaded = (mtime, ImageFont.truetype(ttf_path, size))
+            self._fonts[key] = loaded
+        return loaded[1]
+    
+    def render_ascii(self, font, size):
+        """
+        按字体自身的度量渲染 ASCII 可见字符，返回 [(x, y, w, h, 步进, 点阵字节), ...]
+        
+        与汉字的逐字居中不同，ASCII 按基线排列：字体的上升+下降高度在格子里垂直居中，
+        x/y 为墨迹框相对笔位置（格子左上角）的偏移，可以为负；点阵格式同 crop_glyph。
+        """
+        ascent, descent = font.getmetrics()
+        dy = (size - ascent - descent) // 2
+        # 画布留足边距，负的左边距和下伸部分不会被裁掉
+        margin = size
+        img = Image.new('1', (size * 3, size * 3), 0)
+        draw = ImageDraw.Draw(img)
+        glyphs = []
+        for unicode in range(ASCII_FIRST, ASCII_LAST + 1):
+            char = chr(unicode)
+            draw.rectangle((0, 0, size * 3 - 1, size * 3 - 1), fill=0)
+            draw.text((margin, margin), char, font=font, fill=1)
+            advance = int(round(font.getlength(char)))
+            box = img.getbbox()
+            if box is None:
+                glyphs.append((0, 0, 0, 0, advance, b''))
+                continue
+            # mode '1' 的 tobytes 每行补齐到整字节、高位在前，去掉补齐位后转成连续位流
+            w, h = box[2] - box[0], box[3] - box[1]
+            row_bytes = (w + 7) // 8
+            raw = img.crop(box).tobytes()
+            rows = [int.from_bytes(raw[r * row_bytes:(r + 1) * row_bytes], 'big') >> (row_bytes * 8 - w)
+                    for r in range(h)]
+            glyphs.append((box[0] - margin, box[1] - margin + dy, w, h, advance, pack_rows(rows, w)))
+        return glyphs
+    
+    def covered_codepoints(self, ttf_path, codepoints):
+        """去掉字体 cmap 里没有的码位；读不出 cmap 时原样返回"""
+        covered = font_codepoints(ttf_path)
+        if covered is None:
+            return list(codepoints)
+        return [u for u in codepoints if u in covered]
+    
+    def render_glyph_reference(self, font, unicode, size):
+        """
+        逐像素参考实现（原始算法），返回一个字的点阵字节
+        
+        每行按 bytes_per_row 个字节大端存放，第0列是最高有效位，
+        不足整字节时高位补0。向量化实现的输出必须与此完全一致。
+        """
+        bytes_per_row, height = self.font_configs[size]
+        char = chr(unicode)
+        metrics = self.metrics
+        if metrics is not None:
+            t0 = time.perf_counter()
+        
+        # 创建图像
+        img = Image.new('1', (size, size), 0)
+        draw = ImageDraw.Draw(img)
+        
+        # 居中绘制
+        bbox = draw.textbbox((0, 0), char, font=font)
+        w = bbox[2] - bbox[0]
+        h = bbox[3] - bbox[1]
+        x = (size - w) // 2
+        y = (size - h) // 2 - 1
+        if metrics is not None:
+            t1 = time.perf_counter()
+        
+        draw.text((x, y), char, font=font, fill=1)
+        if metrics is not None:
+            t2 = time.perf_counter()
+        
+        out = bytearray()
+        for row in range(height):
+            row_val = 0
+            for col in range(size):
+                if img.getpixel((col, row)):
+                    row_val |= (1 << (size - 1 - col))
+            
+            # 按字节写入
+            for b in range(bytes_per_row):
+                out.append((row_val >> ((bytes_per_row - 1 - b) * 8)) & 0xFF)
+        
+        if metrics is not None:
+            metrics.add('render.bbox', t1 - t0)
+            metrics.add('render.rasterize', t2 - t1)
+            metrics.add('render.pack', time.perf_counter() - t2)
+        return bytes(out)
+    
+    def render_glyphs_numpy(self, font, codepoints, size):
+        """
+        向量化实现：一批字各渲染一次，整批用 np.packbits 打包
+        
+        复用同一张画布，每个字只做一次 draw.text 和一次数组转换，
+        不再逐像素调用 getpixel。返回所有字的点阵字节依次拼接。
+        """
+        bytes_per_row, height = self.font_configs[size]
+        img = Image.new('1', (size, size), 0)
+        draw = ImageDraw.Draw(img)
+        
+        # 左侧补0列，使打包后与参考实现的高位补0一致
+        pad = bytes_per_row * 8 - size
+        bits = np.zeros((len(codepoints), height, bytes_per_row * 8), dtype=bool)
+        
+        # 统计耗时时分别累计 测量bbox / 绘制 / 取点阵打包 三段
+        metrics = self.metrics
+        t_bbox = t_raster = t_pack = 0.0
+        
+        for i, unicode in enumerate(codepoints):
+            char = chr(unicode)
+            if metrics is not None:
+                t0 = time.perf_counter()
+            draw.rectangle((0, 0, size - 1, size - 1), fill=0)
+            
+            # 居中绘制（与参考实现相同的规则）
+            bbox = draw.textbbox((0, 0), char, font=font)
+            w = bbox[2] - bbox[0]
+            h = bbox[3] - bbox[1]
+            x = (size - w) // 2
+            y = (size - h) // 2 - 1
+            if metrics is not None:
+                t1 = time.perf_counter()
+            
+            draw.text((x, y), char, font=font, fill=1)
+            if metrics is not None:
+                t2 = time.perf_counter()
+            bits[i, :, pad:] = np.asarray(img)[:height]
+            if metrics is not None:
+                t3 = time.perf_counter()
+                t_bbox += t1 - t0
+                t_raster += t2 - t1
+                t_pack += t3 - t2
+        
+        if metrics is None:
+            return np.packbits(bits, axis=-1).tobytes()
+        t0 = time.perf_counter()
+        data = np.packbits(bits, axis=-1).tobytes()
+        metrics.add('render.bbox', t_bbox)
+        metrics.add('render.rasterize', t_raster)
+        metrics.add('render.pack', t_pack + time.perf_counter() - t0)
+        return data
+    
+    def render_glyphs(self, font, codepoints, size, engine='auto'):
+        """
+        渲染一批字，返回点阵字节依次拼接
+        
+        engine: 'numpy' 向量化实现，'reference' 逐像素参考实现，
+                'auto' 有numpy时用向量化实现
+        """
+        if engine == 'auto':
+            engine = 'numpy' if np is not None else 'reference'
+        if engine == 'numpy':
+            if np is None:
+                raise RuntimeError("numpy 未安装，请执行: pip install numpy")
+            return self.render_glyphs_numpy(font, codepoints, size)
+        if engine == 'reference':
+            return b''.join(self.render_glyph_reference(font, u, size) for u in codepoints)
+        raise ValueError(f"未知渲染引擎: {engine}")
+    
+    def iter_rendered(self, ttf_path, codepoints, size, engine='auto', jobs=1, pool=None,
+                      window=None):
+        """
+        按码位顺序逐批返回 (batch, data) 的迭代器
+        
+        jobs > 1 时把码位切块交给进程池，每个工作进程自己加载字体；
+        结果按提交顺序取回，保证与单进程输出完全一致。块经 RenderWindow 提交，
+        同时在途的不超过 2*jobs 个，已渲染未写出的字模不会在内存里越积越多。
+        进程池在调用时就建好并提交第一轮块（工作进程随之启动），之后的迭代可以交给 prefetch
+        的后台线程，不会在非主线程里 fork。
+        传入 pool 时用该进程池且不负责关闭；传入 window 时把块排进这个共用窗口，由调用方 fill
+        （批量模式下多个任务共用一个窗口，下一个任务的渲染与本任务的写出重叠）。
+        """
+        if window is not None:
+            slots = window.add(self._chunk_tasks(ttf_path, codepoints, size, engine, jobs))
+            return self._iter_window(window, slots)
+        if jobs <= 1 or not codepoints:
+            return self._iter_serial(ttf_path, codepoints, size, engine)
+        
+        owned = pool is None
+        if owned:
+            pool = ProcessPoolExecutor(max_workers=jobs)
+        window = RenderWindow(pool, 2 * jobs)
+        slots = window.add(self._chunk_tasks(ttf_path, codepoints, size, engine, jobs))
+        window.fill()
+        return self._iter_window(window, slots, owned)
+    
+    def _iter_serial(self, ttf_path, codepoints, size, engine):
+        font = self.load_font(ttf_path, size)
+        for batch_start in range(0, len(codepoints), RENDER_BATCH):
+            batch = codepoints[batch_start:batch_start + RENDER_BATCH]
+            yield batch, self.render_glyphs(font, batch, size, engine)
+    
+    def _iter_window(self, window, slots, owned=False):
+        # 自己建的进程池在迭代结束或提前关闭时关掉
+        try:
+            for slot in slots:
+                yield self._take(slot[0][3], window.take(slot))
+        finally:
+            if owned:
+                window.pool.shutdown(cancel_futures=True)
+    
+    def _take(self, batch, future):
+        data = future.result()
+        if self.metrics is not None:
+            data, = self._collect_worker_stages([data])
+        return batch, data
+    
+    def iter_glyph_batches(self, ttf_path, codepoints, size, engine='auto', jobs=1, pool=None,
+                           cache=None, window=None):
+        """
+        与 iter_rendered 相同，但先查磁盘缓存，只渲染缓存里没有的码位
+        
+        缓存查询和进程池提交在调用时立即完成；迭代结束后把新渲染的字写回缓存。
+        """
+        if cache is None:
+            return self.iter_rendered(ttf_path, codepoints, size, engine, jobs, pool, window)
+        
+        bytes_per_row, height = self.font_configs[size]
+        bytes_per_char = bytes_per_row * height
+        cached = cache.load(ttf_path, size, bytes_per_char)
+        missing = [u for u in codepoints if u not in cached]
+        print(f"  缓存命中: {len(codepoints) - len(missing)}/{len(codepoints)}，需渲染: {len(missing)}")
+        rendered = self.iter_rendered(ttf_path, missing, size, engine, jobs, pool, window)
+        return self._merge_cached(ttf_path, codepoints, size, cached, rendered, cache)
+    
+    def _merge_cached(self, ttf_path, codepoints, size, cached, rendered, cache):
+        bytes_per_row, height = self.font_configs[size]
+        bytes_per_char = bytes_per_row * height
+        
+        def rendered_glyphs():
+            for batch, data in rendered:
+                for i, unicode in enumerate(batch):
+                    yield data[i * bytes_per_char:(i + 1) * bytes_per_char]
+        
+        fresh = rendered_glyphs()
+        added = 0
+        for batch_start in range(0, len(codepoints), RENDER_BATCH):
+            batch = codepoints[batch_start:batch_start + RENDER_BATCH]
+            out = []
+            for unicode in batch:
+                glyph = cached.get(unicode)
+                if glyph is None:
+                    glyph = next(fresh)
+                    cached[unicode] = glyph
+                    added += 1
+                out.append(glyph)
+            yield batch, b''.join(out)
+        
+        if added:
+            cache.store(ttf_path, size, bytes_per_char, cached)
+    
+    def _chunks(self, codepoints, jobs):
+        # 每个进程至少分到约4块，避免最后几块拖尾
+        chunk = max(1, min(RENDER_BATCH, -(-len(codepoints) // (max(jobs, 1) * 4))))
+        return [codepoints[i:i + chunk] for i in range(0, len(codepoints), chunk)]
+    
+    def _chunk_tasks(self, ttf_path, codepoints, size, engine, jobs):
+        profile = self.metrics is not None
+        return [(ttf_path, size, engine, batch, profile) for batch in self._chunks(codepoints, jobs)]
+    
+    def _collect_worker_stages(self, results):
+        """取回工作进程的结果时，把其中的阶段耗时累加到当前构建"""
+        for data, stages in results:
+            for stage, seconds in stages.items():
+                self.metrics.add(stage, seconds)
+            yield data
+    
+    def write_font_c(self, font_c, lib_name, ttf_path, size, codepoints, rendered, sparse,
+                     compress=False, comments=True, dense=False, dedup=True):
+        """
+        写 <lib>_font.c：字模数组（+ 不连续时的码位表）和相关宏
+        
+        font_c 是路径或已打开的文本文件；每批一次格式化成十六进制文本，经 1MB 缓冲区写出。
+        dedup=True 时先收齐所有字模并按内容去重，去重省下的字节多于映射表时，相同点阵只存一份，
+        另写 _GLYPH[] 表（码位序号 -> 字模序号），drawChinese 经它查字模；
+        dedup=False 时边渲染边写出，不在内存里攒字模。
+        compress=True 时字模按 compress_glyph 压缩，每字一行，另附偏移表；
+        comments=False 不写每个字的 // U+XXXX 注释；dense=True 每个字只占一行。
+        默认参数且没有重复字模时，输出与逐字节写出的原始格式完全一致。
+        返回统计字典: raw 原始字节, stored 实际字节（含各种表）, unique 不同字模数（不去重时为 None）,
+                      dedup 是否启用去重, saved 去重省下的字节（不含映射表）,
+                      decode_bits 压缩时解码读取的总位数
+        """
+        bytes_per_row, height = self.font_configs[size]
+        bytes_per_char = bytes_per_row * height
+        unicode_start = codepoints[0]
+        unicode_end = codepoints[-1]
+        
+        def progress(batches):
+            done = 0
+            for batch, data in batches:
+                done += len(batch)
+                if done // 1000 > (done - len(batch)) // 1000:
+                    print(f"  进度: {done // 1000 * 1000}/{len(codepoints)}")
+                yield batch, data
+        
+        glyph_map = None
+        saved = 0
+        if dedup:
+            # 收齐字模，相同点阵分到同一个字模序号（dict 保持首次出现的顺序）
+            slots = {}
+            glyph_map = []
+            for batch, data in progress(rendered):
+                for i in range(len(batch)):
+                    glyph = data[i * bytes_per_char:(i + 1) * bytes_per_char]
+                    glyph_map.append(slots.setdefault(glyph, len(slots)))
+            glyphs = list(slots)
+            packed = [compress_glyph(g, bytes_per_row, height) for g in glyphs] if compress else None
+            
+            # 每个重复的字省下一份字模（压缩时还有一个偏移），映射表每字2字节
+            first_code = []
+            for unicode, slot in zip(codepoints, glyph_map):
+                if slot == len(first_code):
+                    first_code.append(unicode)
+                else:
+                    saved += len(packed[slot]) + 2 if compress else bytes_per_char
+            dedup = saved > 2 * len(codepoints)
+            
+            # 实际写出的字模（字模序号）和注释里标注的码位
+            if dedup:
+                order = range(len(glyphs))
+                labels = first_code
+            else:
+                order = glyph_map
+                labels = codepoints
+            chunks = ((labels[i:i + RENDER_BATCH],
+                       [glyphs[slot] for slot in order[i:i + RENDER_BATCH]],
+                       [packed[slot] for slot in order[i:i + RENDER_BATCH]] if compress else None)
+                      for i in range(0, len(order), RENDER_BATCH))
+        else:
+            # 不去重：渲染好一批就写一批
+            def stream():
+                for batch, data in progress(rendered):
+                    batch_glyphs = [data[i * bytes_per_char:(i + 1) * bytes_per_char] for i in range(len(batch))]
+                    yield (batch, batch_glyphs,
+                           [compress_glyph(g, bytes_per_row, height) for g in batch_glyphs] if compress else None)
+            chunks = stream()
+        
+        mask_bytes = (height + 7) // 8
+        decode_bits = 0
+        written = 0
+        with open_output(font_c) as f:
+            f.write(f'// {lib_name} Font ({size}x{size})\n')
+            f.write(f'// Generated from: {os.path.basename(ttf_path)}\n')
+            f.write('#include <Arduino.h>\n\n')
+            f.write(f'const uint8_t {lib_name.upper()}_FONT[] = {{\n')
+            
+            offsets = []
+            compressed_size = 0
+            
+            # 每行字符数（每字节 '0xAB,' 5个字符）和每个字的行数
+            line_width = 5 * (bytes_per_char if dense else bytes_per_row)
+            lines_per_glyph = 1 if dense or compress else height
+            
+            for batch_labels, batch_glyphs, batch_packed in chunks:
+                written += len(batch_glyphs)
+                if compress:
+                    lines = []
+                    for data in batch_packed:
+                        offsets.append(compressed_size)
+                        compressed_size += len(data)
+                        decode_bits += 8 * (len(data) - mask_bytes)
+                        lines.append(c_hex(data))
+                else:
+                    # 整批一次转十六进制，再按固定宽度切成行
+                    text = c_hex(b''.join(batch_glyphs))
+                    lines = [text[i:i + line_width] for i in range(0, len(text), line_width)]
+                
+                if comments:
+                    for i, unicode in enumerate(batch_labels):
+                        lines[i * lines_per_glyph] += f' // U+{unicode:04X} {chr(unicode)}'
+                f.write('\n'.join(lines))
+                f.write('\n')
+            
+            f.write('};\n\n')
+            
+            table_size = 0
+            if compress:
+                # 偏移表：字模 i 的起始位置 = BLOCKS[i / 64] + OFFSETS[i]
+                f.write(f'const uint32_t {lib_name.upper()}_BLOCKS[] = {{\n')
+                blocks = offsets[::COMPRESS_BLOCK]
+                for i in range(0, len(blocks), 8):
+                    f.write(''.join(f'{v},' for v in blocks[i:i + 8]) + '\n')
+                f.write('};\n\n')
+                f.write(f'const uint16_t {lib_name.upper()}_OFFSETS[] = {{\n')
+                rel = [v - blocks[i // COMPRESS_BLOCK] for i, v in enumerate(offsets)]
+                for i in range(0, len(rel), 16):
+                    f.write(''.join(f'{v},' for v in rel[i:i + 16]) + '\n')
+                f.write('};\n\n')
+                table_size = 4 * len(blocks) + 2 * len(offsets)
+            
+            if dedup:
+                # 码位序号 -> 字模序号，重复的点阵指向同一个字模
+                f.write(f'const uint16_t {lib_name.upper()}_GLYPH[] = {{\n')
+                for i in range(0, len(glyph_map), 16):
+                    f.write(''.join(f'{v},' for v in glyph_map[i:i + 16]) + '\n')
+                f.write('};\n\n')
+                f.write(f'#define FONT_{lib_name.upper()}_GLYPHS {len(glyphs)}\n')
+                table_size += 2 * len(glyph_map)
+            
+            if sparse:
+                # 升序码位表，下标即码位序号
+                f.write(f'const uint16_t {lib_name.upper()}_INDEX[] = {{\n')
+                for i in range(0, len(codepoints), 16):
+                    f.write(''.join(f'0x{u:04X},' for u in codepoints[i:i + 16]) + '\n')
+                f.write('};\n\n')
+                f.write(f'#define FONT_{lib_name.upper()}_COUNT {len(codepoints)}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_START 0x{unicode_start:04X}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_END 0x{unicode_end:04X}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_SIZE {size}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_BYTES_PER_CHAR {bytes_per_char}\n')
+        
+        glyph_bytes = compressed_size if compress else bytes_per_char * written
+        if compress and dedup:
+            # 解码量按每个码位算，重复的字各解一次
+            decode_bits = sum(8 * (len(packed[slot]) - mask_bytes) for slot in glyph_map)
+        return {
+            'raw': bytes_per_char * len(codepoints),
+            'stored': glyph_bytes + table_size,
+            'unique': len(glyphs) if glyph_map is not None else None,
+            'dedup': dedup,
+            'saved': saved,
+            'decode_bits': decode_bits,
+        }
+    
+    def write_font_tight(self, font_c, lib_name, ttf_path, size, codepoints, rendered, sparse,
+                         ascii_glyphs, comments=True):
+        """
+        紧凑存储（--tight）：每个字只存墨迹框内的点阵，另附度量表
+        
+        字形序号 0..94 是 ASCII（render_ascii），之后按码位顺序是汉字（crop_glyph）。
+        _FONT[] 裁剪后的点阵（每字 (w*h+7)/8 字节）；_METRICS[] 每个字形4字节 x, y, w, h（int8）；
+        _BLOCKS[] 每 64 个字形的起始位置，块内字形的位置由前面各字的 w*h 累加得到，
+        省掉逐字的偏移表；_ADVANCE[] ASCII 步进宽度，汉字步进固定为字号（与整格存储时的排版一致）。
+        返回统计字典: raw 整格存储字节, stored 实际字节（含各种表）,
+                      pixels 绘制时扫描的点数, full_pixels 整格时扫描的点数
+        """
+        bytes_per_row, height = self.font_configs[size]
+        bytes_per_char = bytes_per_row * height
+        
+        blocks = []
+        metrics = []
+        stored = 0
+        pixels = 0
+        
+        with open_output(font_c) as f:
+            f.write(f'// {lib_name} Font ({size}x{size}, tight)\n')
+            f.write(f'// Generated from: {os.path.basename(ttf_path)}\n')
+            f.write('#include <Arduino.h>\n\n')
+            f.write(f'const uint8_t {lib_name.upper()}_FONT[] = {{\n')
+            
+            def write_glyph(unicode, x, y, w, h, data):
+                nonlocal stored, pixels
+                if len(metrics) % COMPRESS_BLOCK == 0:
+                    blocks.append(stored)
+                metrics.append((x, y, w, h))
+                stored += len(data)
+                pixels += w * h
+                line = c_hex(data)
+                if comments:
+                    # 行尾的反斜杠会把下一行接进注释里，空格和反斜杠写名字
+                    name = {0x20: '空格', 0x5C: '反斜杠'}.get(unicode, chr(unicode))
+                    line += f' // U+{unicode:04X} {name}'
+                f.write(line + '\n')
+            
+            for unicode, (x, y, w, h, advance, data) in zip(range(ASCII_FIRST, ASCII_LAST + 1),
+                                                          ascii_glyphs):
+                write_glyph(unicode, x, y, w, h, data)
+            
+            generated = 0
+            for batch, data in rendered:
+                for i, unicode in enumerate(batch):
+                    glyph = data[i * bytes_per_char:(i + 1) * bytes_per_char]
+                    write_glyph(unicode, *crop_glyph(glyph, size, bytes_per_row, height))
+                if (generated + len(batch)) // 1000 > generated // 1000:
+                    print(f"  进度: {(generated + len(batch)) // 1000 * 1000}/{len(codepoints)}")
+                generated += len(batch)
+            f.write('};\n\n')
+            
+            # 每 64 个字形一个起始位置
+            f.write(f'const uint32_t {lib_name.upper()}_BLOCKS[] = {{\n')
+            for i in range(0, len(blocks), 8):
+                f.write(''.join(f'{v},' for v in blocks[i:i + 8]) + '\n')
+            f.write('};\n\n')
+            
+            # 度量表：x, y, w, h
+            f.write(f'const int8_t {lib_name.upper()}_METRICS[] = {{\n')
+            for i in range(0, len(metrics), 8):
+                f.write(''.join(f'{x},{y},{w},{h},' for x, y, w, h in metrics[i:i + 8]) + '\n')
+            f.write('};\n\n')
+            f.write(f'const uint8_t {lib_name.upper()}_ADVANCE[] = {{\n')
+            advances = [g[4] for g in ascii_glyphs]
+            for i in range(0, len(advances), 16):
+                f.write(''.join(f'{v},' for v in advances[i:i + 16]) + '\n')
+            f.write('};\n\n')
+            
+            if sparse:
+                # 升序码位表，下标即码位序号
+                f.write(f'const uint16_t {lib_name.upper()}_INDEX[] = {{\n')
+                for i in range(0, len(codepoints), 16):
+                    f.write(''.join(f'0x{u:04X},' for u in codepoints[i:i + 16]) + '\n')
+                f.write('};\n\n')
+                f.write(f'#define FONT_{lib_name.upper()}_COUNT {len(codepoints)}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_ASCII {len(ascii_glyphs)}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_START 0x{codepoints[0]:04X}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_END 0x{codepoints[-1]:04X}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_SIZE {size}\n')
+            f.write(f'#define FONT_{lib_name.upper()}_BYTES_PER_CHAR {bytes_per_char}\n')
+        
+        table_size = 4 * len(blocks) + 4 * len(metrics) + len(advances)
+        return {
+            'raw': bytes_per_char * len(codepoints),
+            'stored': stored + table_size,
+            'pixels': pixels,
+            'full_pixels': size * size * len(codepoints) + 6 * 8 * len(ascii_glyphs),
+        }
+    
+    def write_font_bin(self, bin_file, size, codepoints, rendered, sparse):
+        """
+        写外部二进制字库文件：文件头 + 码位表(uint16，仅不连续时) + 字模
+        
+        bin_file 是路径或已打开的二进制文件；整批字模直接写入大缓冲区的文件，不逐字节格式化。
+        """
+        bytes_per_row, height = self.font_configs[size]
+        index_offset = BIN_HEADER.size if sparse else 0
+        glyph_offset = BIN_HEADER.size + (2 * len(codepoints) if sparse else 0)
+        generated = 0
+        with open_output(bin_file, 'wb') as f:
+            f.write(BIN_HEADER.pack(BIN_MAGIC, BIN_VERSION, BIN_HEADER.size, size,
+                                    bytes_per_row, height, BIN_FLAG_INDEX if sparse else 0,
+                                    len(codepoints), codepoints[0], codepoints[-1],
+                                    index_offset, glyph_offset))
+            if sparse:
+                f.write(struct.pack(f'<{len(codepoints)}H', *codepoints))
+            for batch, data in rendered:
+                f.write(data)
+                if (generated + len(batch)) // 1000 > generated // 1000:
+                    print(f"  进度: {generated + len(batch)}/{len(codepoints)}")
+                generated += len(batch)
+    
+    def write_font_png(self, png_file, size, codepoints, rendered, columns=64):
+        """
+        写字模总览图：1位调色板 PNG，每行 columns 个字按码位顺序排列，墨迹为黑色
+        
+        png_file 是路径或已打开的二进制文件。每凑齐一行字就压缩写出一个 IDAT 块，
+        不需要 numpy，也不在内存里攒整张图。
+        """
+        bytes_per_row, height = self.font_configs[size]
+        bytes_per_char = bytes_per_row * height
+        columns = max(1, min(columns, len(codepoints)))
+        width = columns * size
+        line_bytes = (width + 7) // 8
+        pad = 8 * line_bytes - width
+        bands = -(-len(codepoints) // columns)
+        compressor = zlib.compressobj(6)
+        
+        def chunk(f, kind, data):
+            f.write(struct.pack('>I', len(data)) + kind + data)
+            f.write(struct.pack('>I', zlib.crc32(kind + data)))
+        
+        def write_band(f, band):
+            # 整格点阵每行右对齐（第 col 列在 bit size-1-col），直接按字拼成一条扫描线
+            band += [bytes(bytes_per_char)] * (columns - len(band))
+            lines = []
+            for r in range(height):
+                acc = 0
+                for glyph in band:
+                    acc = (acc << size) | int.from_bytes(glyph[r * bytes_per_row:(r + 1) * bytes_per_row], 'big')
+                lines.append(b'\x00' + (acc << pad).to_bytes(line_bytes, 'big'))
+            data = compressor.compress(b''.join(lines))
+            if data:
+                chunk(f, b'IDAT', data)
+        
+        with open_output(png_file, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n')
+            chunk(f, b'IHDR', struct.pack('>IIBBBBB', width, bands * height, 1, 3, 0, 0, 0))
+            chunk(f, b'PLTE', b'\xff\xff\xff\x00\x00\x00')
+            band = []
+            for batch, data in rendered:
+                for i in range(len(batch)):
+                    band.append(data[i * bytes_per_char:(i + 1) * bytes_per_char])
+                    if len(band) == columns:
+                        write_band(f, band)
+                        band = []
+            if band:
+                write_band(f, band)
+            chunk(f, b'IDAT', compressor.flush())
+            chunk(f, b'IEND', b'')
+    
+    def _write_bin_reader(self, f, lib_name):
+        """'bin' 模式：在 cpp 里生成字库文件读取和 LRU 字形缓存"""
+        f.write('static uint32_t readLE32(const uint8_t* p) {\n')
+        f.write('    return (uint32_t)p[0] | ((uint32_t)p[1] << 8) | ((uint32_t)p[2] << 16) | ((uint32_t)p[3] << 24);\n')
+        f.write('}\n\n')
+        
+        # loadHeader：校验文件头
+        f.write(f'bool {lib_name}::loadHeader() {{\n')
+        f.write(f'    uint8_t h[{BIN_HEADER.size}];\n')
+        f.write('    if(!_readAt(_file, 0, h, sizeof(h))) return false;\n')
+        f.write("    if(h[0] != 'C' || h[1] != 'F' || h[2] != 'N' || h[3] != 'T') return false;\n")
+        f.write(f'    if((h[4] | (h[5] << 8)) != {BIN_VERSION}) return false;\n')
+        f.write('    if((h[8] | (h[9] << 8)) != FONT_SIZE || (h[10] | (h[11] << 8)) != BYTES_PER_ROW) return false;\n')
+        f.write('    _count = readLE32(h + 16);\n')
+        f.write('    _first = readLE32(h + 20);\n')
+        f.write('    _last = readLE32(h + 24);\n')
+        f.write('    _indexOffset = readLE32(h + 28);\n')
+        f.write('    _glyphOffset = readLE32(h + 32);\n')
+        f.write('    \n')
+        f.write('    // 清空字形缓存\n')
+        f.write('    for(int i = 0; i < CACHE_SLOTS; i++) _cacheTick[i] = 0;\n')
+        f.write('    _tick = 0;\n')
+        f.write('    return true;\n')
+        f.write('}\n\n')
+        
+        # findGlyph：码位 -> 字模序号
+        f.write(f'int32_t {lib_name}::findGlyph(uint32_t unicode) {{\n')
+        f.write('    if(unicode < _first || unicode > _last) return -1;\n')
+        f.write('    if(_indexOffset == 0) return (int32_t)(unicode - _first);\n')
+        f.write('    \n')
+        f.write('    // 在文件里的升序码位表中二分查找\n')
+        f.write('    int32_t lo = 0;\n')
+        f.write('    int32_t hi = (int32_t)_count - 1;\n')
+        f.write('    while(lo <= hi) {\n')
+        f.write('        int32_t mid = (lo + hi) >> 1;\n')
+        f.write('        uint8_t b[2];\n')
+        f.write('        if(!_readAt(_file, _indexOffset + (uint32_t)mid * 2, b, 2)) return -1;\n')
+        f.write('        uint16_t code = b[0] | (b[1] << 8);\n')
+        f.write('        if(code == unicode) return mid;\n')
+        f.write('        if(code < unicode) lo = mid + 1; else hi = mid - 1;\n')
+        f.write('    }\n')
+        f.write('    return -1;\n')
+        f.write('}\n\n')
+        
+        # getGlyph：先查 LRU 缓存，未命中再从文件读取并替换最久未用的槽
+        f.write(f'const uint8_t* {lib_name}::getGlyph(uint32_t unicode) {{\n')
+        f.write('    if(!_file) return nullptr;\n')
+        f.write('    _tick++;\n')
+        f.write('    int victim = 0;\n')
+        f.write('    for(int i = 0; i < CACHE_SLOTS; i++) {\n')
+        f.write('        if(_cacheTick[i] && _cacheCode[i] == unicode) {\n')
+        f.write('            _cacheTick[i] = _tick;\n')
+        f.write('            _cacheHits++;\n')
+        f.write('            return _cacheData[i];\n')
+        f.write('        }\n')
+        f.write('        if(_cacheTick[i] < _cacheTick[victim]) victim = i;\n')
+        f.write('    }\n')
+        f.write('    _cacheMisses++;\n')
+        f.write('    \n')
+        f.write('    int32_t index = findGlyph(unicode);\n')
+        f.write('    if(index < 0) return nullptr;\n')
+        f.write('    if(!_readAt(_file, _glyphOffset + (uint32_t)index * BYTES_PER_CHAR, _cacheData[victim], BYTES_PER_CHAR)) {\n')
+        f.write('        _cacheTick[victim] = 0;\n')
+        f.write('        return nullptr;\n')
+        f.write('    }\n')
+        f.write('    _cacheCode[victim] = unicode;\n')
+        f.write('    _cacheTick[victim] = _tick;\n')
+        f.write('    return _cacheData[victim];\n')
+        f.write('}\n\n')
+    
+    def _write_decoder(self, f, lib_name):
+        """压缩模式：在 cpp 里生成 decodeGlyph，逻辑与 decompress_glyph 一致"""
+        f.write(f'void {lib_name}::decodeGlyph(uint32_t index, uint8_t* out) {{\n')
+        f.write(f'    const uint8_t* p = &{lib_name.upper()}_FONT[{lib_name.upper()}_BLOCKS[index / {COMPRESS_BLOCK}] + {lib_name.upper()}_OFFSETS[index]];\n')
+        f.write('    const uint8_t* rowMask = p;\n')
+        f.write('    p += (FONT_SIZE + 7) / 8;\n')
+        f.write('    \n')
+        f.write('    // 位流读取，高位在前\n')
+        f.write('    uint32_t acc = 0;\n')
+        f.write('    int bits = 0;\n')
+        f.write('    auto readBits = [&](int n) -> uint8_t {\n')
+        f.write('        while(bits < n) {\n')
+        f.write('            acc = (acc << 8) | *p++;\n')
+        f.write('            bits += 8;\n')
+        f.write('        }\n')
+        f.write('        bits -= n;\n')
+        f.write('        return (acc >> bits) & ((1 << n) - 1);\n')
+        f.write('    };\n')
+        f.write('    \n')
+        f.write('    // 每行 = 上一行 ^ 差分，差分为0的行不存\n')
+        f.write('    for(int row = 0; row < FONT_SIZE; row++) {\n')
+        f.write('        uint8_t* cur = out + row * BYTES_PER_ROW;\n')
+        f.write('        for(int b = 0; b < BYTES_PER_ROW; b++) cur[b] = row ? cur[b - BYTES_PER_ROW] : 0;\n')
+        f.write('        if(rowMask[row >> 3] & (0x80 >> (row & 7))) {\n')
+        f.write('            for(int n = 0; n < BYTES_PER_ROW * 2; n++) {\n')
+        f.write('                if(readBits(1)) cur[n >> 1] ^= readBits(4) << ((n & 1) ? 0 : 4);\n')
+        f.write('            }\n')
+        f.write('        }\n')
+        f.write('    }\n')
+        f.write('}\n\n')
+    
+    def _write_tight_glyph(self, f, lib_name, size, render):
+        """紧凑存储：在 cpp 里生成 drawGlyph 和 ASCII 的宽度/绘制函数"""
+        upper = lib_name.upper()
+        f.write('#define BIT_AT(n) (p[(n) >> 3] & (0x80 >> ((n) & 7)))\n\n')
+        f.write(f'void {lib_name}::drawGlyph(int x, int y, uint32_t slot, uint16_t color) {{\n')
+        f.write('    // 块起始位置 + 块内前面各字形的字节数\n')
+        f.write(f'    uint32_t offset = {upper}_BLOCKS[slot / {COMPRESS_BLOCK}];\n')
+        f.write(f'    for(uint32_t i = slot - slot % {COMPRESS_BLOCK}; i < slot; i++) {{\n')
+        f.write(f'        offset += ({upper}_METRICS[i * 4 + 2] * {upper}_METRICS[i * 4 + 3] + 7) >> 3;\n')
+        f.write('    }\n')
+        f.write(f'    const uint8_t* p = &{upper}_FONT[offset];\n')
+        f.write(f'    const int8_t* m = &{upper}_METRICS[slot * 4];\n')
+        f.write('    int gx = m[0], gy = m[1], w = m[2], h = m[3];\n')
+        if render == 'blit':
+            f.write('    \n')
+            f.write('    // 整个字格（步进宽 x 字号高）填背景色，墨迹框内的点再填前景色\n')
+            f.write(f'    int cellW = slot < FONT_{upper}_ASCII ? {upper}_ADVANCE[slot] : FONT_SIZE;\n')
+            f.write('    if(cellW > FONT_SIZE) cellW = FONT_SIZE;\n')
+            f.write('    if(cellW <= 0) return;\n')
+            f.write('    for(int i = 0; i < cellW * FONT_SIZE; i++) _blitBuf[i] = _bg;\n')
+        f.write('    \n')
+        f.write('    // 点阵是 w*h 位的连续位流，第 n 个点在 p[n/8] 的第 7-n%8 位\n')
+        f.write('    uint32_t bit = 0;\n')
+        f.write('    for(int row = 0; row < h; row++, bit += w) {\n')
+        if render == 'span':
+            f.write('        // 同一行连续的点合并成一条水平线\n')
+            f.write('        int col = 0;\n')
+            f.write('        while(col < w) {\n')
+            f.write('            if(!BIT_AT(bit + col)) { col++; continue; }\n')
+            f.write('            int start = col;\n')
+            f.write('            while(col < w && BIT_AT(bit + col)) col++;\n')
+            f.write('            _drawFastHLine(_tft, x + gx + start, y + gy + row, col - start, color);\n')
+            f.write('        }\n')
+        elif render == 'blit':
+            f.write('        int cy = gy + row;\n')
+            f.write('        if(cy < 0 || cy >= FONT_SIZE) continue;\n')
+            f.write('        for(int col = 0; col < w; col++) {\n')
+            f.write('            int cx = gx + col;\n')
+            f.write('            if(cx >= 0 && cx < cellW && BIT_AT(bit + col)) {\n')
+            f.write('                _blitBuf[cy * cellW + cx] = color;\n')
+            f.write('            }\n')
+            f.write('        }\n')
+        else:
+            f.write('        for(int col = 0; col < w; col++) {\n')
+            f.write('            if(BIT_AT(bit + col)) {\n')
+            f.write('                _drawPixel(_tft, x + gx + col, y + gy + row, color);\n')
+            f.write('            }\n')
+            f.write('        }\n')
+        f.write('    }\n')
+        if render == 'blit':
+            f.write('    _pushImage(_tft, x, y, cellW, FONT_SIZE, _blitBuf);\n')
+        f.write('}\n')
+        f.write('#undef BIT_AT\n\n')
+        
+        f.write(f'int {lib_name}::asciiWidth(uint8_t c) {{\n')
+        f.write(f'    if(c < 0x{ASCII_FIRST:02X} || c > 0x{ASCII_LAST:02X}) return 0;\n')
+        f.write(f'    return {upper}_ADVANCE[c - 0x{ASCII_FIRST:02X}];\n')
+        f.write('}\n\n')
+        f.write(f'void {lib_name}::drawAscii(int x, int y, uint8_t c, uint16_t color) {{\n')
+        f.write(f'    if(!_tft || c < 0x{ASCII_FIRST:02X} || c > 0x{ASCII_LAST:02X}) return;\n')
+        f.write(f'    drawGlyph(x, y, c - 0x{ASCII_FIRST:02X}, color);\n')
+        f.write('}\n\n')
+    
+    def render_static(self, ttf_path, size, entries, engine='auto', ascii_glyphs=None, cells=False):
+        """
+        把静态文本按最终排版渲染成位图，返回 [(dx, dy, w, h, 点阵字节, 字格段), ...]
+        
+        汉字等三字节字符与字库用同样的渲染（字体里没有的字留空），ASCII 用 render_ascii 的字形和步进，
+        ascii_glyphs 为 None 时跳过 ASCII。dx/dy 为墨迹框相对 drawStatic 的 x/y 的偏移，
+        点阵按 pack_rows 存成连续位流，整条文本没有点时 w=h=0；字格段为空列表。
+        cells=True（blit 模式）时与逐字 blit 一样以字格为单位：框为各字格（步进宽 x 字号高）的外框，
+        墨迹裁到字格内，后画的字格盖掉前面的；字格段为同一行相连字格合成的 (x, y, w, h)，
+        相对框的左上角，drawStatic 逐段推送，背景只画在字格里。
+        """
+        bytes_per_row, height = self.font_configs[size]
+        bytes_per_char = bytes_per_row * height
+        covered = font_codepoints(ttf_path)
+        wide = sorted({ord(c) for entry in entries for c in entry['text']
+                       if 0x800 <= ord(c) <= 0xFFFF and (covered is None or ord(c) in covered)})
+        data = self.render_glyphs(self.load_font(ttf_path, size), wide, size, engine) if wide else b''
+        
+        # 码位 -> (x, y, w, h, 各行点阵)，行的第0列在最高位
+        glyphs = {}
+        for i, unicode in enumerate(wide):
+            glyph = data[i * bytes_per_char:(i + 1) * bytes_per_char]
+            glyphs[unicode] = (0, 0, size, height,
+                               [int.from_bytes(glyph[r * bytes_per_row:(r + 1) * bytes_per_row], 'big')
+                                for r in range(height)])
+        if ascii_glyphs:
+            for unicode, (x, y, w, h, _, bits) in zip(range(ASCII_FIRST, ASCII_LAST + 1), ascii_glyphs):
+                glyphs[unicode] = (x, y, w, h, unpack_rows(bits, w, h))
+        
+        def ascii_width(unicode):
+            if not ascii_glyphs or not ASCII_FIRST <= unicode <= ASCII_LAST:
+                return 0
+            return ascii_glyphs[unicode - ASCII_FIRST][4]
+        
+        bitmaps = []
+        for entry in entries:
+            placed = layout_static(entry['text'], entry['mode'], entry['width'], entry['line'],
+                                   size, ascii_width)
+            if cells:
+                bitmaps.append(self._static_cells(placed, glyphs, size, ascii_width))
+                continue
+            pieces = []
+            for x, y, unicode in placed:
+                glyph = glyphs.get(unicode)
+                if glyph and glyph[2] and glyph[3]:
+                    pieces.append((x + glyph[0], y + glyph[1]) + glyph[2:])
+            if not pieces:
+                bitmaps.append((0, 0, 0, 0, b'', []))
+                continue
+            # 所有字拼到一张画布上再裁剪到墨迹框
+            left = min(p[0] for p in pieces)
+            top = min(p[1] for p in pieces)
+            width = max(p[0] + p[2] for p in pieces) - left
+            rows = [0] * (max(p[1] + p[3] for p in pieces) - top)
+            for x, y, w, _, glyph_rows in pieces:
+                shift = width - (x - left) - w
+                for r, v in enumerate(glyph_rows):
+                    rows[y - top + r] |= v << shift
+            x, y, w, h, bits = crop_rows(rows, width)
+            bitmaps.append((left + x, top + y, w, h, bits, []))
+        return bitmaps
+    
+    def _static_cells(self, placed, glyphs, size, ascii_width):
+        """render_static 的 blit 版本：一条静态文本的字格框、点阵和字格段"""
+        # 字格：(x, y, 宽, 墨迹)，宽与 drawGlyph 一致：ASCII 为步进宽（不超过字号），汉字为字号
+        cells = []
+        for x, y, unicode in placed:
+            glyph = glyphs.get(unicode)
+            if glyph is None:
+                continue
+            cell_w = min(ascii_width(unicode), size) if unicode <= ASCII_LAST else size
+            if cell_w > 0:
+                cells.append((x, y, cell_w, glyph))
+        if not cells:
+            return (0, 0, 0, 0, b'', [])
+        left = min(x for x, _, _, _ in cells)
+        top = min(y for _, y, _, _ in cells)
+        width = max(x + w for x, _, w, _ in cells) - left
+        rows = [0] * (max(y for _, y, _, _ in cells) + size - top)
+        runs = []
+        for x, y, cell_w, (gx, gy, w, h, glyph_rows) in cells:
+            # 后画的字格整格覆盖前面的，再画上裁到字格内的墨迹
+            shift = width - (x - left) - cell_w
+            cell_mask = ((1 << cell_w) - 1) << shift
+            for r in range(size):
+                rows[y - top + r] &= ~cell_mask
+            for r, v in enumerate(glyph_rows):
+                cy = gy + r
+                if 0 <= cy < size:
+                    # 墨迹第 c 列落在字格第 gx+c 列，字格第 col 列对应 bit (cell_w-1-col)
+                    offset = cell_w - gx - w
+                    v = v << offset if offset >= 0 else v >> -offset
+                    rows[y - top + cy] |= (v & ((1 << cell_w) - 1)) << shift
+            run = runs[-1] if runs else None
+            if run and run[1] == y - top and run[0] + run[2] == x - left:
+                run[2] += cell_w
+            else:
+                runs.append([x - left, y - top, cell_w, size])
+        return (left, top, width, len(rows), pack_rows(rows, width), [tuple(r) for r in runs])
+    
+    def write_static_c(self, static_c, lib_name, entries, bitmaps, comments=True, runs=False):
+        """
+        写出静态文本表 _static.c，静态文本按哈希排序，下标即 drawStatic 的 id
+        
+        _STATIC[] 各条位图依次拼接；_STATIC_OFFSET[] 每条的起始位置；_STATIC_BOX[] 每条 dx, dy, w, h；
+        _STATIC_HASH[] 文本的 FNV-1a 哈希（升序，findStatic 二分查找）；_STATIC_KEY[] 排版方式、
+        maxWidth、lineHeight；_STATIC_TEXT[] 原文，用于确认哈希命中。
+        runs=True（blit 模式）时另写 _STATIC_RUNS[] 各条的字格段 x, y, w, h（相对框），
+        _STATIC_RUN_START[] 每条第一个字格段的序号（末尾多一项）。
+        返回 (按 id 排列的静态文本, 位图总字节数)。
+        """
+        upper = lib_name.upper()
+        order = sorted(range(len(entries)), key=lambda i: (fnv1a(entries[i]['text'].encode('utf-8')), i))
+        entries = [entries[i] for i in order]
+        bitmaps = [bitmaps[i] for i in order]
+        
+        with open_output(static_c) as f:
+            f.write(f'// {lib_name} 静态文本（预渲染位图）\n')
+            f.write('#include <Arduino.h>\n\n')
+            f.write(f'const uint8_t {upper}_STATIC[] = {{\n')
+            offsets = []
+            stored = 0
+            for entry, (_, _, _, _, bits, _) in zip(entries, bitmaps):
+                offsets.append(stored)
+                stored += len(bits)
+                if comments:
+                    # 行尾的反斜杠会把下一行接进注释里
+                    f.write(f"// {'/'.join(entry['names']) or '-'} {entry['text']}".rstrip('\\') + '\n')
+                if bits:
+                    f.write(c_hex(bits) + '\n')
+            if not stored:
+                f.write('0x00,\n')
+            f.write('};\n\n')
+            
+            f.write(f'const uint32_t {upper}_STATIC_OFFSET[] = {{\n')
+            for i in range(0, len(offsets), 8):
+                f.write(''.join(f'{v},' for v in offsets[i:i + 8]) + '\n')
+            f.write('};\n\n')
+            f.write(f'const int16_t {upper}_STATIC_BOX[] = {{\n')
+            for dx, dy, w, h, _, _ in bitmaps:
+                f.write(f'{dx},{dy},{w},{h},\n')
+            f.write('};\n\n')
+            if runs:
+                f.write(f'const int16_t {upper}_STATIC_RUNS[] = {{\n')
+                starts = [0]
+                for bitmap in bitmaps:
+                    if bitmap[5]:
+                        f.write(''.join(f'{x},{y},{w},{h},' for x, y, w, h in bitmap[5]) + '\n')
+                    starts.append(starts[-1] + len(bitmap[5]))
+                if not starts[-1]:
+                    f.write('0,0,0,0,\n')
+                f.write('};\n\n')
+                f.write(f'const uint16_t {upper}_STATIC_RUN_START[] = {{\n')
+                for i in range(0, len(starts), 16):
+                    f.write(''.join(f'{v},' for v in starts[i:i + 16]) + '\n')
+                f.write('};\n\n')
+            f.write(f'const uint32_t {upper}_STATIC_HASH[] = {{\n')
+            for entry in entries:
+                f.write(f"0x{fnv1a(entry['text'].encode('utf-8')):08X},\n")
+            f.write('};\n\n')
+            f.write(f'const int16_t {upper}_STATIC_KEY[] = {{\n')
+            for entry in entries:
+                f.write(f"{STATIC_MODES.index(entry['mode'])},{entry['width']},{entry['line']},\n")
+            f.write('};\n\n')
+            f.write(f'const char* const {upper}_STATIC_TEXT[] = {{\n')
+            for entry in entries:
+                f.write(c_string(entry['text']) + ',\n')
+            f.write('};\n\n')
+            f.write(f'#define {upper}_STATIC_COUNT {len(entries)}\n')
+        return entries, stored
+    
+    def _write_static_draw(self, f, lib_name, render):
+        """在 cpp 里生成 drawStatic 和按文本查找静态文本的 findStatic"""
+        upper = lib_name.upper()
+        f.write('#define BIT_AT(n) (p[(n) >> 3] & (0x80 >> ((n) & 7)))\n\n')
+        f.write(f'void {lib_name}::drawStatic(int id, int x, int y, uint16_t color) {{\n')
+        f.write(f'    if(!_tft || id < 0 || id >= {upper}_STATIC_COUNT) return;\n')
+        f.write(f'    const int16_t* b = &{upper}_STATIC_BOX[id * 4];\n')
+        f.write(f'    const uint8_t* p = &{upper}_STATIC[{upper}_STATIC_OFFSET[id]];\n')
+        f.write('    int w = b[2], h = b[3];\n' if render != 'blit' else '    int w = b[2];\n')
+        f.write('    if(w <= 0) return;\n')
+        f.write('    x += b[0];\n')
+        f.write('    y += b[1];\n')
+        f.write('    \n')
+        f.write('    // 位图是 w*h 位的连续位流，已按最终的换行和居中排好\n')
+        if render == 'blit':
+            f.write('    // 与逐字 blit 一样只在字格里画背景：逐个字格段（同一行相连的字格）推送，\n')
+            f.write('    // 每段按缓冲区大小分条，小于缓冲区的一次推完\n')
+            f.write(f'    for(int r = {upper}_STATIC_RUN_START[id]; r < {upper}_STATIC_RUN_START[id + 1]; r++) {{\n')
+            f.write(f'        const int16_t* s = &{upper}_STATIC_RUNS[r * 4];\n')
+            f.write('        int rw = s[2], rh = s[3];\n')
+            f.write('        int band = (int)(sizeof(_blitBuf) / sizeof(_blitBuf[0])) / rw;\n')
+            f.write('        for(int top = 0; top < rh; top += band) {\n')
+            f.write('            int rows = rh - top < band ? rh - top : band;\n')
+            f.write('            uint16_t* out = _blitBuf;\n')
+            f.write('            for(int row = 0; row < rows; row++) {\n')
+            f.write('                uint32_t bit = (uint32_t)(s[1] + top + row) * w + s[0];\n')
+            f.write('                for(int col = 0; col < rw; col++, bit++) {\n')
+            f.write('                    *out++ = BIT_AT(bit) ? color : _bg;\n')
+            f.write('                }\n')
+            f.write('            }\n')
+            f.write('            _pushImage(_tft, x + s[0], y + s[1] + top, rw, rows, _blitBuf);\n')
+            f.write('        }\n')
+            f.write('    }\n')
+        else:
+            f.write('    uint32_t bit = 0;\n')
+            f.write('    for(int row = 0; row < h; row++, bit += w) {\n')
+            if render == 'span':
+                f.write('        int col = 0;\n')
+                f.write('        while(col < w) {\n')
+                f.write('            if(!BIT_AT(bit + col)) { col++; continue; }\n')
+                f.write('            int start = col;\n')
+                f.write('            while(col < w && BIT_AT(bit + col)) col++;\n')
+                f.write('            _drawFastHLine(_tft, x + start, y + row, col - start, color);\n')
+                f.write('        }\n')
+            else:
+                f.write('        for(int col = 0; col < w; col++) {\n')
+                f.write('            if(BIT_AT(bit + col)) {\n')
+                f.write('                _drawPixel(_tft, x + col, y + row, color);\n')
+                f.write('            }\n')
+                f.write('        }\n')
+            f.write('    }\n')
+        f.write('}\n')
+        f.write('#undef BIT_AT\n\n')
+        
+        f.write(f'int {lib_name}::findStatic(const char* str, uint8_t mode, int maxWidth, int lineHeight) {{\n')
+        f.write('    // FNV-1a 哈希，在升序哈希表里二分查找，再比对排版参数和原文\n')
+        f.write('    uint32_t hash = 0x811C9DC5;\n')
+        f.write('    for(const char* s = str; *s; s++) {\n')
+        f.write('        hash = (hash ^ (uint8_t)*s) * 0x01000193;\n')
+        f.write('    }\n')
+        f.write('    int lo = 0;\n')
+        f.write(f'    int hi = {upper}_STATIC_COUNT;\n')
+        f.write('    while(lo < hi) {\n')
+        f.write('        int mid = (lo + hi) >> 1;\n')
+        f.write(f'        if({upper}_STATIC_HASH[mid] < hash) lo = mid + 1; else hi = mid;\n')
+        f.write('    }\n')
+        f.write(f'    for(int i = lo; i < {upper}_STATIC_COUNT && {upper}_STATIC_HASH[i] == hash; i++) {{\n')
+        f.write(f'        const int16_t* k = &{upper}_STATIC_KEY[i * 3];\n')
+        f.write('        if(k[0] == mode && k[1] == maxWidth && k[2] == lineHeight &&\n')
+        f.write(f'           strcmp({upper}_STATIC_TEXT[i], str) == 0) return i;\n')
+        f.write('    }\n')
+        f.write('    return -1;\n')
+        f.write('}\n\n')
+    
+    def generate(self, ttf_path, size, font_name, output_dir=None, engine='auto', jobs=1,
+                 rendered=None, cache=None, codepoints=None, output_format='array', lru_slots=32,
+                 compress=False, render='span', comments=True, dense=False, skip_missing=True,
+                 dedup=True, tight=False, static_file=None, static_scan=None, output=None, pool=None):
         """
         生成字库库文件
         
@@ -27,12 +2081,62 @@ class FontGenerator:
         size: 字号 (8, 10, 12, 14, 16, 20, 24, 28, 32, 36, 40)
         font_name: 字体名称拼音 (FangSong, KaiTi, HeiTi, YaHei...)
         output_dir: 输出目录，默认 lib/GB2312_{size}_{font_name}/
+        engine: 点阵渲染引擎，'auto' / 'numpy' / 'reference'
+        jobs: 并行渲染进程数，1=单进程，0=CPU核数
+        rendered: 已提交的渲染结果迭代器（批量模式内部使用）
+        cache: GlyphCache 磁盘字形缓存，None 表示不使用缓存
+        codepoints: 要收录的码位（升序），默认 0x4E00-0x9FA5 全集；
+                    不连续时额外生成码位表，drawChinese 用二分查找定位
+        output_format: 'array' 字库编译进固件（const 数组）；
+                       'bin' 生成外部二进制字库文件，放到 LittleFS/SPIFFS 分区，运行时按需读取
+        lru_slots: 'bin' 模式下内存里缓存的字数（LRU）
+        compress: 'array' 模式下压缩字模（行差分+半字节掩码），drawChinese 解码到栈上缓冲区
+        render: drawChinese 的绘制方式
+                'pixel' 每个点一次 drawPixel（最慢，但只要求 TFT 有 drawPixel）
+                'span'  同一行连续的点合并成一次 drawFastHLine（默认）
+                'blit'  整个字展开到16位缓冲区，一次 pushImage 推送（带背景色，不透明）
+        comments: _font.c 里是否写每个字的 // U+XXXX 注释
+        dense: _font.c 里每个字只占一行（文件更小，编译更快）
+        skip_missing: 按字体 cmap 跳过字体没有收录的码位（否则这些字都画成 .notdef 方框）
+        dedup: 'array' 模式下相同点阵只存一份，经 _GLYPH[] 映射表查找（省不下空间时自动不启用）
+        tight: 'array' 模式下只存每个字墨迹框内的点阵和度量（偏移、宽高），绘制时只扫描墨迹框；
+               同时从字体收录 ASCII，按字体自身宽度排版（比例字宽）
+        static_file: 静态文本表（见 load_static_file），每条按最终排版预渲染成一张位图，
+                     生成 drawStatic(id, x, y, color) 和 enum StaticText 里的名字
+        static_scan: 扫描该目录下源码里本对象上文本和排版参数都是字面量的 drawString* 调用，同样预渲染；
+                     drawString* 遇到预渲染过的文本（排版参数也相同）时直接绘制位图，不再逐字查字库排版。
+                     静态文本里的 ASCII 需要 tight（用字体里的字形），否则该条跳过
+        output: 库文件写到哪里，默认 DirectoryOutput(output_dir)；MemoryOutput() 全部留在内存里，不碰磁盘
+        pool: jobs > 1 时渲染用的进程池，由调用方关闭（常驻构建多次生成共用一个）；默认每次生成新建一个
+        
+        字模从渲染到写出是流式的：渲染在后台线程里按批进行，经有界队列交给写 _font.c / .bin 的一方，
+        两边同时进行（统计耗时时不开后台线程，各阶段耗时才准确）。
         """
         
+        if codepoints is None:
+            codepoints = list(range(UNICODE_START, UNICODE_END + 1))
+        if not codepoints:
+            print("错误：字符集为空")
+            return False
+        codepoints = sorted(codepoints)
+        
         if size not in self.font_configs:
             print(f"错误：不支持字号 {size}，支持: {list(self.font_configs.keys())}")
             return False
         
+        if output_format not in ('array', 'bin'):
+            print(f"错误：不支持输出格式 {output_format}，支持: array, bin")
+            return False
+        if compress and output_format != 'array':
+            print("错误：压缩目前只支持 array 输出格式")
+            return False
+        if tight and (output_format != 'array' or compress):
+            print("错误：紧凑存储（--tight）只支持 array 输出格式，且不能与 --compress 同用")
+            return False
+        if render not in ('pixel', 'span', 'blit'):
+            print(f"错误：不支持绘制方式 {render}，支持: pixel, span, blit")
+            return False
+        
         bytes_per_row, height = self.font_configs[size]
         bytes_per_char = bytes_per_row * height
         
@@ -44,374 +2148,1227 @@ class FontGenerator:
         
         if output_dir is None:
             output_dir = f"lib/{lib_name}"
+        if output is None:
+            output = DirectoryOutput(output_dir)
         
-        src_dir = f"{output_dir}/src"
-        os.makedirs(src_dir, exist_ok=True)
+        # 静态文本：文本表在前（有名字），扫描到的相同文本+排版只留一条
+        static_entries = []
+        try:
+            if static_file:
+                static_entries += load_static_file(static_file, obj_name)
+        except (OSError, ValueError) as e:
+            print(f"错误：{e}")
+            return False
+        if static_scan:
+            static_entries += scan_static_strings(static_scan, obj_name)
+        names = [entry['name'] for entry in static_entries if entry['name']]
+        if len(set(names)) != len(names):
+            print(f"错误：静态文本名字重复: {sorted({n for n in names if names.count(n) > 1})}")
+            return False
+        static_keys = {}
+        for entry in static_entries:
+            # 排版参数与绘制函数里的一致：不换行时没有宽度和行高，行高默认字号+4
+            if entry['mode'] in ('wrap', 'center_wrap'):
+                entry['line'] = entry['line'] if entry['line'] > 0 else size + 4
+            else:
+                entry['width'] = entry['line'] = 0
+            if entry['mode'] in ('wrap', 'center_wrap') and entry['width'] <= 0:
+                print(f"  静态文本跳过（换行宽度为0）: {entry['text']}")
+                continue
+            if not tight and any(ord(c) < 0x80 for c in entry['text']):
+                print(f"  静态文本跳过（含 ASCII，需要 --tight）: {entry['text']}")
+                continue
+            key = (entry['mode'], entry['text'], entry['width'], entry['line'])
+            kept = static_keys.setdefault(key, dict(entry, names=[]))
+            if entry['name']:
+                kept['names'].append(entry['name'])
+        static_entries = list(static_keys.values())
         
         # 检查字体
         if not os.path.exists(ttf_path):
             print(f"错误：找不到字体 {ttf_path}")
             return False
         
+        # 耗时统计从查 cmap 开始，字体读不出来的构建也记一条（ok=false）
+        if self.metrics is not None:
+            self.metrics.begin(lib_name, size, len(codepoints))
+        ok = False
         try:
-            font = ImageFont.truetype(ttf_path, size)
-            print(f"加载字体: {ttf_path}, 字号: {size}")
-        except Exception as e:
-            print(f"加载失败: {e}")
-            return False
-        
-        # 生成字库数据
-        print(f"生成 {lib_name}...")
-        
-        font_c_path = f"{src_dir}/{lib_name}_font.c"
-        with open(font_c_path, 'w', encoding='utf-8') as f:
-            f.write(f'// {lib_name} Font ({size}x{size})\n')
-            f.write(f'// Generated from: {os.path.basename(ttf_path)}\n')
-            f.write('#include <Arduino.h>\n\n')
-            f.write(f'const uint8_t {lib_name.upper()}_FONT[] = {{\n')
+            # 字体没有收录的码位不渲染（只会得到 .notdef 方框）
+            if font_codepoints(ttf_path) is None:
+                # 读不出 cmap 时不知道缺哪些字，不筛选
+                print(f"字体收录: 未知（读不出 cmap 表），{len(codepoints)} 字全部保留")
+            else:
+                covered = self.covered_codepoints(ttf_path, codepoints)
+                missing = len(codepoints) - len(covered)
+                print(f"字体收录: {len(covered)}/{len(codepoints)} 字 ({100 * len(covered) / len(codepoints):.1f}%)"
+                      + (f"，{'跳过' if skip_missing else '保留'} {missing} 个缺字" if missing else ''))
+                if skip_missing:
+                    codepoints = covered
+                    if not codepoints:
+                        print("错误：字体不包含字符集里的任何字")
+                        return False
+            if self.metrics is not None:
+                self.metrics.current['glyphs'] = len(codepoints)
+            self._lap('coverage')
+            unicode_start = codepoints[0]
+            unicode_end = codepoints[-1]
+            # 码位连续时直接用 unicode - START 定位，否则需要码位表
+            sparse = unicode_end - unicode_start + 1 != len(codepoints)
             
-            unicode_start = 0x4E00
-            unicode_end = 0x9FA5
-            generated = 0
+            try:
+                self.load_font(ttf_path, size)
+                print(f"加载字体: {ttf_path}, 字号: {size}")
+            except Exception as e:
+                print(f"加载失败: {e}")
+                return False
+            self._lap('font_load')
             
-            for unicode in range(unicode_start, unicode_end + 1):
-                char = chr(unicode)
-                
-                # 创建图像
-                img = Image.new('1', (size, size), 0)
-                draw = ImageDraw.Draw(img)
-                
-                # 居中绘制
-                bbox = draw.textbbox((0, 0), char, font=font)
-                w = bbox[2] - bbox[0]
-                h = bbox[3] - bbox[1]
-                x = (size - w) // 2
-                y = (size - h) // 2 - 1
-                
-                draw.text((x, y), char, font=font, fill=1)
-                
-                # 写入点阵数据
-                for row in range(height):
-                    row_val = 0
-                    for col in range(size):
-                        if img.getpixel((col, row)):
-                            row_val |= (1 << (size - 1 - col))
-                    
-                    # 按字节写入
-                    for b in range(bytes_per_row):
-                        byte_val = (row_val >> ((bytes_per_row - 1 - b) * 8)) & 0xFF
-                        f.write(f'0x{byte_val:02X},')
-                    
-                    f.write(f' // U+{unicode:04X} {char}\n' if row == 0 else '\n')
-                
-                generated += 1
-                if generated % 1000 == 0:
-                    print(f"  进度: {generated}/20902")
+            if jobs <= 0:
+                jobs = os.cpu_count() or 1
             
-            f.write('};\n\n')
-            f.write(f'#define FONT_{lib_name.upper()}_START 0x{unicode_start:04X}\n')
-            f.write(f'#define FONT_{lib_name.upper()}_END 0x{unicode_end:04X}\n')
-            f.write(f'#define FONT_{lib_name.upper()}_SIZE {size}\n')
-            f.write(f'#define FONT_{lib_name.upper()}_BYTES_PER_CHAR {bytes_per_char}\n')
+            # 生成字库数据
+            print(f"生成 {lib_name}..." + (f" ({jobs} 进程)" if jobs > 1 else ""))
+            
+            if rendered is None:
+                rendered = self.iter_glyph_batches(ttf_path, codepoints, size, engine, jobs, pool,
+                                                   cache=cache)
+                if cache is not None:
+                    self._lap('cache_load')
+            if self.metrics is not None:
+                rendered = self.metrics.timed_batches(rendered)
+            else:
+                rendered = prefetch(rendered)
+            stats = None
+            if output_format == 'bin':
+                font_data = f"data/{lib_name}.bin"
+                with output.open(font_data, 'wb') as f:
+                    self.write_font_bin(f, size, codepoints, rendered, sparse)
+                # 之前 array 模式留下的字库数组不再需要，留着会被编译进固件
+                output.remove(f"src/{lib_name}_font.c")
+                self._lap('emit_bin')
+            elif tight:
+                font_data = f"src/{lib_name}_font.c"
+                ascii_glyphs = self.render_ascii(self.load_font(ttf_path, size), size)
+                with output.open(font_data) as f:
+                    stats = self.write_font_tight(f, lib_name, ttf_path, size, codepoints,
+                                                  rendered, sparse, ascii_glyphs, comments)
+                self._lap('emit_c')
+                print(f"  紧凑存储: {stats['raw']/1024:.1f} KB -> {stats['stored']/1024:.1f} KB（含度量表），"
+                      f"节省 {100 - 100 * stats['stored'] / stats['raw']:.1f}%；"
+                      f"绘制扫描点数减少 {100 - 100 * stats['pixels'] / stats['full_pixels']:.1f}%")
+                stats['dedup'] = False
+            else:
+                font_data = f"src/{lib_name}_font.c"
+                with output.open(font_data) as f:
+                    stats = self.write_font_c(f, lib_name, ttf_path, size, codepoints,
+                                              rendered, sparse, compress, comments, dense, dedup)
+                self._lap('emit_c')
+                if stats['dedup']:
+                    print(f"  去重: {len(codepoints)} 字 -> {stats['unique']} 个不同字模，"
+                          f"节省 {stats['saved'] / 1024:.1f} KB（映射表 {2 * len(codepoints) / 1024:.1f} KB）")
+                elif dedup and stats['unique'] < len(codepoints):
+                    print(f"  去重: {len(codepoints) - stats['unique']} 个重复字模，省下的空间不够映射表开销，未启用")
+                if compress:
+                    raw_size, packed_size = stats['raw'], stats['stored']
+                    print(f"  压缩: {raw_size/1024:.1f} KB -> {packed_size/1024:.1f} KB（含偏移表），"
+                          f"节省 {100 - 100 * packed_size / raw_size:.1f}%")
+                    print(f"  解码: 平均每字读取 {stats['decode_bits'] / len(codepoints):.0f} 位 + "
+                          f"写 {bytes_per_char} 字节栈缓冲区（{bytes_per_row * 2 * height} 次半字节判断以内）")
+            dedup = stats is not None and stats['dedup']
+            
+            static_c = f"src/{lib_name}_static.c"
+            blit_len = f'{size} * {size}'
+            if static_entries:
+                ascii_glyphs = self.render_ascii(self.load_font(ttf_path, size), size) if tight else None
+                bitmaps = self.render_static(ttf_path, size, static_entries, engine, ascii_glyphs,
+                                             cells=render == 'blit')
+                with output.open(static_c) as f:
+                    static_entries, static_bytes = self.write_static_c(f, lib_name, static_entries,
+                                                                       bitmaps, comments, runs=render == 'blit')
+                self._lap('emit_static')
+                print(f"  静态文本: {len(static_entries)} 条，位图 {static_bytes / 1024:.1f} KB")
+                if render == 'blit':
+                    # blit 的缓冲区放得下一个字，也尽量放得下整条静态文本（最多 1024 点）
+                    widest = max(w for _, _, w, _, _, _ in bitmaps)
+                    largest = max(w * h for _, _, w, h, _, _ in bitmaps)
+                    if min(largest, max(widest, 1024)) > size * size:
+                        blit_len = str(min(largest, max(widest, 1024)))
+            else:
+                # 之前生成的静态文本不再需要，留着会被编译进固件
+                output.remove(static_c)
+            
+            # 库的描述，write_header / write_source / write_library_json 按它写出
+            lib = {'name': lib_name, 'obj': obj_name, 'font_name': font_name, 'size': size,
+                   'format': output_format, 'render': render, 'compress': compress, 'tight': tight,
+                   'sparse': sparse, 'dedup': dedup, 'static': static_entries, 'blit_len': blit_len,
+                   'lru_slots': lru_slots}
+            with output.open(f'src/{lib_name}.h') as f:
+                self.write_header(f, lib)
+            self._lap('write_h')
+            
+            with output.open(f'src/{lib_name}.cpp') as f:
+                self.write_source(f, lib)
+            self._lap('write_cpp')
+            
+            with output.open('library.json') as f:
+                self.write_library_json(f, lib)
+            self._lap('write_json')
+            
+            # 统计
+            font_size = output.size(font_data)
+            print(f"\n✅ 生成完成: {lib_name}")
+            print(f"  位置: {output.path('')}")
+            print(f"  字号: {size}x{size}")
+            print(f"  字库: {font_size/1024:.1f} KB")
+            print(f"\n使用方式:")
+            print(f'  #include <{lib_name}.h>')
+            if output_format == 'bin':
+                print(f'  // 把 {output.path(font_data)} 复制到项目 data/ 目录，执行 pio run -t uploadfs')
+                print(f'  LittleFS.begin();')
+                print(f'  {obj_name}.begin(LittleFS, "/{lib_name}.bin");')
+            print(f'  {obj_name}.setTFT(&tft);')
+            print(f'  {obj_name}.drawString(10, 10, "中文", TFT_WHITE);')
+            print(f'\n新增功能:')
+            print(f'  {obj_name}.drawStringWrap(10, 10, "长文本", TFT_WHITE, 100, 20);')
+            print(f'  {obj_name}.drawStringCenter(50, "居中", TFT_WHITE, 120);  // y=50, centerX=120')
+            print(f'  {obj_name}.drawStringCenterWrap(80, "长文本居中", TFT_WHITE, 120, 100, 20);')
+            named = [name for entry in static_entries for name in entry['names']]
+            if named:
+                print(f'  {obj_name}.drawStatic({obj_name}.{named[0]}, 10, 10, TFT_WHITE);  // 预渲染的静态文本')
+            ok = True
+            return True
+        finally:
+            if self.metrics is not None:
+                # 中途失败的构建也要收尾，--metrics 照常写出报告
+                self.metrics.end(ok)
+                if self.metrics.verbose:
+                    self.metrics.report()
+
+    def write_header(self, f, lib):
+        """写 <lib>.h：类声明，成员随输出格式、绘制方式、存储方式和静态文本增减（lib 见 generate）"""
+        lib_name, obj_name, size = lib['name'], lib['obj'], lib['size']
+        output_format, render, lru_slots = lib['format'], lib['render'], lib['lru_slots']
+        compress, tight, static_entries, blit_len = lib['compress'], lib['tight'], lib['static'], lib['blit_len']
+        bytes_per_row, height = self.font_configs[size]
+        bytes_per_char = bytes_per_row * height
         
-        # 生成头文件
-        h_path = f"{src_dir}/{lib_name}.h"
-        with open(h_path, 'w', encoding='utf-8') as f:
-            f.write(f'#ifndef {lib_name.upper()}_H\n')
-            f.write(f'#define {lib_name.upper()}_H\n\n')
-            f.write('#include <Arduino.h>\n\n')
-            f.write(f'class {lib_name} {{\n')
-            f.write('public:\n')
-            f.write('    bool begin() { return true; }\n')
-            f.write('    \n')
-            f.write('    template<typename T>\n')
-            f.write('    void setTFT(T* tft) {\n')
-            f.write('        _tft = (void*)tft;\n')
-            f.write('        _drawPixel = [](void* t, int16_t x, int16_t y, uint16_t c) {\n')
-            f.write('            ((T*)t)->drawPixel(x, y, c);\n')
+        f.write(f'#ifndef {lib_name.upper()}_H\n')
+        f.write(f'#define {lib_name.upper()}_H\n\n')
+        f.write('#include <Arduino.h>\n\n')
+        f.write(f'class {lib_name} {{\n')
+        f.write('public:\n')
+        if output_format == 'bin':
+            f.write('    // 从文件系统打开字库文件（LittleFS/SPIFFS/SD，需先 begin() 挂载）\n')
+            f.write(f'    template<typename FS>\n')
+            f.write(f'    bool begin(FS& fs, const char* path = "/{lib_name}.bin") {{\n')
+            f.write('        typedef decltype(fs.open(path, "r")) FileT;\n')
+            f.write('        end();\n')
+            f.write('        FileT* file = new FileT(fs.open(path, "r"));\n')
+            f.write('        if(!*file) { delete file; return false; }\n')
+            f.write('        _file = (void*)file;\n')
+            f.write('        _readAt = [](void* fp, uint32_t offset, uint8_t* buf, uint16_t len) -> bool {\n')
+            f.write('            FileT* file = (FileT*)fp;\n')
+            f.write('            if(!file->seek(offset)) return false;\n')
+            f.write('            return file->read(buf, len) == len;\n')
             f.write('        };\n')
-            f.write('        _drawChar = [](void* t, int16_t x, int16_t y, unsigned char c, uint16_t color, uint16_t bg, uint8_t size) {\n')
-            f.write('            ((T*)t)->drawChar(x, y, c, color, bg, size);\n')
+            f.write('        _closeFile = [](void* fp) {\n')
+            f.write('            FileT* file = (FileT*)fp;\n')
+            f.write('            file->close();\n')
+            f.write('            delete file;\n')
             f.write('        };\n')
+            f.write('        if(!loadHeader()) { end(); return false; }\n')
+            f.write('        return true;\n')
             f.write('    }\n')
             f.write('    \n')
-            f.write('    // 基础功能\n')
-            f.write('    void drawString(int x, int y, const char* str, uint16_t color);\n')
-            f.write(f'    void drawChinese(int x, int y, const char* ch, uint16_t color);\n')
+            f.write('    // 关闭字库文件\n')
+            f.write('    void end() {\n')
+            f.write('        if(_file && _closeFile) _closeFile(_file);\n')
+            f.write('        _file = nullptr;\n')
+            f.write('    }\n')
             f.write('    \n')
-            f.write('    // 自动换行（从x开始，限制宽度）\n')
-            f.write('    void drawStringWrap(int x, int y, const char* str, uint16_t color, int maxWidth, int lineHeight = 0);\n')
+            f.write('    // 字形缓存命中/未命中次数\n')
+            f.write('    uint32_t getCacheHits() { return _cacheHits; }\n')
+            f.write('    uint32_t getCacheMisses() { return _cacheMisses; }\n')
+        else:
+            f.write('    bool begin() { return true; }\n')
+        f.write('    \n')
+        f.write('    template<typename T>\n')
+        f.write('    void setTFT(T* tft) {\n')
+        f.write('        _tft = (void*)tft;\n')
+        f.write('        _drawPixel = [](void* t, int16_t x, int16_t y, uint16_t c) {\n')
+        f.write('            ((T*)t)->drawPixel(x, y, c);\n')
+        f.write('        };\n')
+        f.write('        _drawChar = [](void* t, int16_t x, int16_t y, unsigned char c, uint16_t color, uint16_t bg, uint8_t size) {\n')
+        f.write('            ((T*)t)->drawChar(x, y, c, color, bg, size);\n')
+        f.write('        };\n')
+        if render == 'span':
+            f.write('        _drawFastHLine = [](void* t, int16_t x, int16_t y, int16_t w, uint16_t c) {\n')
+            f.write('            ((T*)t)->drawFastHLine(x, y, w, c);\n')
+            f.write('        };\n')
+        elif render == 'blit':
+            f.write('        _pushImage = [](void* t, int16_t x, int16_t y, int16_t w, int16_t h, uint16_t* data) {\n')
+            f.write('            ((T*)t)->pushImage(x, y, w, h, data);\n')
+            f.write('        };\n')
+        f.write('    }\n')
+        f.write('    \n')
+        if render == 'blit':
+            f.write('    // 中文字的背景色（blit 模式整块推送，背景不透明）\n')
+            f.write('    void setBackground(uint16_t bg) { _bg = bg; }\n')
             f.write('    \n')
-            f.write('    // 基于centerX水平居中（单行）\n')
-            f.write('    void drawStringCenter(int y, const char* str, uint16_t color, int centerX);\n')
+        f.write('    // 基础功能\n')
+        f.write('    void drawString(int x, int y, const char* str, uint16_t color);\n')
+        f.write(f'    void drawChinese(int x, int y, const char* ch, uint16_t color);\n')
+        f.write('    \n')
+        f.write('    // 自动换行（从x开始，限制宽度）\n')
+        f.write('    void drawStringWrap(int x, int y, const char* str, uint16_t color, int maxWidth, int lineHeight = 0);\n')
+        f.write('    \n')
+        f.write('    // 基于centerX水平居中（单行）\n')
+        f.write('    void drawStringCenter(int y, const char* str, uint16_t color, int centerX);\n')
+        f.write('    \n')
+        f.write('    // 基于centerX居中+自动换行（在maxWidth范围内，每行都居中）\n')
+        f.write('    void drawStringCenterWrap(int y, const char* str, uint16_t color, int centerX, int maxWidth, int lineHeight = 0);\n')
+        f.write('    \n')
+        f.write('    // 辅助函数\n')
+        f.write('    int getStringWidth(const char* str);\n')
+        f.write('    int getCharWidth() { return FONT_SIZE; }\n')
+        f.write('    int getCharHeight() { return FONT_SIZE; }\n')
+        f.write('    \n')
+        if static_entries:
+            f.write('    // 预渲染的静态文本，居中排版的文本 x 为 centerX\n')
+            if any(entry['names'] for entry in static_entries):
+                f.write('    enum StaticText {\n')
+                for i, entry in enumerate(static_entries):
+                    for name in entry['names']:
+                        f.write(f'        {name} = {i},\n')
+                f.write('    };\n')
+            f.write('    void drawStatic(int id, int x, int y, uint16_t color);\n')
             f.write('    \n')
-            f.write('    // 基于centerX居中+自动换行（在maxWidth范围内，每行都居中）\n')
-            f.write('    void drawStringCenterWrap(int y, const char* str, uint16_t color, int centerX, int maxWidth, int lineHeight = 0);\n')
+        f.write('private:\n')
+        f.write('    void* _tft;\n')
+        f.write('    void (*_drawPixel)(void*, int16_t, int16_t, uint16_t);\n')
+        f.write('    void (*_drawChar)(void*, int16_t, int16_t, unsigned char, uint16_t, uint16_t, uint8_t);\n')
+        if render == 'span':
+            f.write('    void (*_drawFastHLine)(void*, int16_t, int16_t, int16_t, uint16_t);\n')
+        elif render == 'blit':
+            f.write('    void (*_pushImage)(void*, int16_t, int16_t, int16_t, int16_t, uint16_t*);\n')
+            f.write('    uint16_t _bg = 0;\n')
+            f.write(f'    uint16_t _blitBuf[{blit_len}];\n')
+        f.write(f'    static const int FONT_SIZE = {size};\n')
+        f.write(f'    static const int BYTES_PER_ROW = {bytes_per_row};\n')
+        if output_format == 'bin' or compress:
+            f.write(f'    static const int BYTES_PER_CHAR = {bytes_per_char};\n')
+        if compress:
+            f.write('    void decodeGlyph(uint32_t index, uint8_t* out);\n')
+        if tight:
             f.write('    \n')
-            f.write('    // 辅助函数\n')
-            f.write('    int getStringWidth(const char* str);\n')
-            f.write('    int getCharWidth() { return FONT_SIZE; }\n')
-            f.write('    int getCharHeight() { return FONT_SIZE; }\n')
+            f.write('    // 紧凑存储：按度量表绘制字形（0..94 为 ASCII），ASCII 用字体自身宽度\n')
+            f.write('    void drawGlyph(int x, int y, uint32_t slot, uint16_t color);\n')
+            f.write('    int asciiWidth(uint8_t c);\n')
+            f.write('    void drawAscii(int x, int y, uint8_t c, uint16_t color);\n')
+        if static_entries:
             f.write('    \n')
-            f.write('private:\n')
-            f.write('    void* _tft;\n')
-            f.write('    void (*_drawPixel)(void*, int16_t, int16_t, uint16_t);\n')
-            f.write('    void (*_drawChar)(void*, int16_t, int16_t, unsigned char, uint16_t, uint16_t, uint8_t);\n')
-            f.write(f'    static const int FONT_SIZE = {size};\n')
-            f.write(f'    static const int BYTES_PER_ROW = {bytes_per_row};\n')
-            f.write('};\n\n')
-            f.write(f'extern {lib_name} {obj_name};\n')
-            f.write(f'\n#endif // {lib_name.upper()}_H\n')
-        
-        # 生成cpp文件
-        cpp_path = f"{src_dir}/{lib_name}.cpp"
-        with open(cpp_path, 'w', encoding='utf-8') as f:
-            f.write(f'#include "{lib_name}.h"\n')
-            f.write(f'#include "{lib_name}_font.c"\n\n')
-            f.write(f'{lib_name} {obj_name};\n\n')
-            
-            # drawChinese
-            f.write(f'void {lib_name}::drawChinese(int x, int y, const char* ch, uint16_t color) {{\n')
-            f.write('    if(!_tft) return;\n')
+            f.write('    // 静态文本的排版方式（与 _STATIC_KEY 表一致）\n')
+            f.write('    enum { STATIC_STRING, STATIC_WRAP, STATIC_CENTER, STATIC_CENTER_WRAP };\n')
+            f.write('    int findStatic(const char* str, uint8_t mode, int maxWidth = 0, int lineHeight = 0);\n')
+        if output_format == 'bin':
+            f.write(f'    static const int CACHE_SLOTS = {lru_slots};\n')
             f.write('    \n')
-            f.write('    uint8_t c0 = ch[0];\n')
-            f.write('    if(c0 < 0x80) return;\n')
+            f.write('    // 字库文件\n')
+            f.write('    void* _file = nullptr;\n')
+            f.write('    bool (*_readAt)(void*, uint32_t, uint8_t*, uint16_t) = nullptr;\n')
+            f.write('    void (*_closeFile)(void*) = nullptr;\n')
+            f.write('    uint32_t _count = 0;\n')
+            f.write('    uint32_t _first = 0;\n')
+            f.write('    uint32_t _last = 0;\n')
+            f.write('    uint32_t _indexOffset = 0;\n')
+            f.write('    uint32_t _glyphOffset = 0;\n')
+            f.write('    bool loadHeader();\n')
+            f.write('    int32_t findGlyph(uint32_t unicode);\n')
+            f.write('    const uint8_t* getGlyph(uint32_t unicode);\n')
             f.write('    \n')
-            f.write('    uint32_t unicode;\n')
-            f.write('    if((c0 & 0xF0) == 0xE0) {\n')
-            f.write('        unicode = ((c0 & 0x0F) << 12) | ((ch[1] & 0x3F) << 6) | (ch[2] & 0x3F);\n')
-            f.write('    } else {\n')
-            f.write('        return;\n')
+            f.write('    // LRU 字形缓存\n')
+            f.write('    uint16_t _cacheCode[CACHE_SLOTS];\n')
+            f.write('    uint32_t _cacheTick[CACHE_SLOTS];\n')
+            f.write('    uint8_t _cacheData[CACHE_SLOTS][BYTES_PER_CHAR];\n')
+            f.write('    uint32_t _tick = 0;\n')
+            f.write('    uint32_t _cacheHits = 0;\n')
+            f.write('    uint32_t _cacheMisses = 0;\n')
+        f.write('};\n\n')
+        f.write(f'extern {lib_name} {obj_name};\n')
+        f.write(f'\n#endif // {lib_name.upper()}_H\n')
+    
+    def write_source(self, f, lib):
+        """写 <lib>.cpp：字模查找和各个绘制函数"""
+        lib_name, obj_name, size = lib['name'], lib['obj'], lib['size']
+        output_format, render, sparse, dedup = lib['format'], lib['render'], lib['sparse'], lib['dedup']
+        compress, tight, static_entries = lib['compress'], lib['tight'], lib['static']
+        bytes_per_row = self.font_configs[size][0]
+        
+        f.write(f'#include "{lib_name}.h"\n')
+        if output_format == 'bin':
+            f.write('\n')
+        else:
+            f.write(f'#include "{lib_name}_font.c"\n')
+            if not static_entries:
+                f.write('\n')
+        if static_entries:
+            f.write(f'#include "{lib_name}_static.c"\n\n')
+        f.write(f'{lib_name} {obj_name};\n\n')
+        
+        if output_format == 'bin':
+            self._write_bin_reader(f, lib_name)
+        if compress:
+            self._write_decoder(f, lib_name)
+        if tight:
+            self._write_tight_glyph(f, lib_name, size, render)
+        if static_entries:
+            self._write_static_draw(f, lib_name, render)
+        
+        # drawChinese
+        f.write(f'void {lib_name}::drawChinese(int x, int y, const char* ch, uint16_t color) {{\n')
+        f.write('    if(!_tft) return;\n')
+        f.write('    \n')
+        f.write('    uint8_t c0 = ch[0];\n')
+        f.write('    if(c0 < 0x80) return;\n')
+        f.write('    \n')
+        f.write('    uint32_t unicode;\n')
+        f.write('    if((c0 & 0xF0) == 0xE0) {\n')
+        f.write('        unicode = ((c0 & 0x0F) << 12) | ((ch[1] & 0x3F) << 6) | (ch[2] & 0x3F);\n')
+        f.write('    } else {\n')
+        f.write('        return;\n')
+        f.write('    }\n')
+        f.write('    \n')
+        if output_format == 'bin':
+            f.write('    const uint8_t* glyph = getGlyph(unicode);\n')
+            f.write('    if(!glyph) return;\n')
+        else:
+            f.write(f'    if(unicode < FONT_{lib_name.upper()}_START || unicode > FONT_{lib_name.upper()}_END) return;\n')
+        if output_format == 'bin':
+            pass
+        elif sparse:
+            f.write('    \n')
+            f.write('    // 在升序码位表中二分查找\n')
+            f.write('    int lo = 0;\n')
+            f.write(f'    int hi = FONT_{lib_name.upper()}_COUNT - 1;\n')
+            f.write('    int index = -1;\n')
+            f.write('    while(lo <= hi) {\n')
+            f.write('        int mid = (lo + hi) >> 1;\n')
+            f.write(f'        uint16_t code = {lib_name.upper()}_INDEX[mid];\n')
+            f.write('        if(code == unicode) { index = mid; break; }\n')
+            f.write('        if(code < unicode) lo = mid + 1; else hi = mid - 1;\n')
             f.write('    }\n')
+            f.write('    if(index < 0) return;\n')
+        else:
+            f.write(f'    uint32_t index = unicode - FONT_{lib_name.upper()}_START;\n')
+        if dedup:
             f.write('    \n')
-            f.write(f'    if(unicode < FONT_{lib_name.upper()}_START || unicode > FONT_{lib_name.upper()}_END) return;\n')
-            f.write(f'    uint32_t offset = (unicode - FONT_{lib_name.upper()}_START) * FONT_{lib_name.upper()}_BYTES_PER_CHAR;\n')
+            f.write('    // 重复的点阵共用一个字模\n')
+            f.write(f'    index = {lib_name.upper()}_GLYPH[index];\n')
+        if tight:
             f.write('    \n')
+            f.write(f'    drawGlyph(x, y, FONT_{lib_name.upper()}_ASCII + index, color);\n')
+        else:
+            if output_format == 'bin':
+                pass
+            elif compress:
+                f.write('    \n')
+                f.write('    // 解压到栈上缓冲区\n')
+                f.write('    uint8_t glyph[BYTES_PER_CHAR];\n')
+                f.write('    decodeGlyph(index, glyph);\n')
+            else:
+                f.write(f'    const uint8_t* glyph = &{lib_name.upper()}_FONT[(uint32_t)index * FONT_{lib_name.upper()}_BYTES_PER_CHAR];\n')
+            f.write('    \n')
+            # 超过4字节的行（36、40号）需要64位，否则左侧几列会丢
+            row_type = 'uint64_t' if bytes_per_row > 4 else 'uint32_t'
+            if render == 'blit':
+                f.write('    uint16_t* p = _blitBuf;\n')
             f.write(f'    for(int row = 0; row < FONT_SIZE; row++) {{\n')
-            f.write(f'        uint32_t rowData = 0;\n')
+            f.write(f'        {row_type} rowData = 0;\n')
             f.write(f'        for(int b = 0; b < {bytes_per_row}; b++) {{\n')
-            f.write(f'            rowData = (rowData << 8) | {lib_name.upper()}_FONT[offset + row * {bytes_per_row} + b];\n')
-            f.write(f'        }}\n')
-            f.write(f'        for(int col = 0; col < FONT_SIZE; col++) {{\n')
-            f.write(f'            if(rowData & (1 << (FONT_SIZE - 1 - col))) {{\n')
-            f.write(f'                _drawPixel(_tft, x + col, y + row, color);\n')
-            f.write(f'            }}\n')
+            f.write(f'            rowData = (rowData << 8) | glyph[row * {bytes_per_row} + b];\n')
             f.write(f'        }}\n')
+            if render == 'span':
+                f.write('        // 同一行连续的点合并成一条水平线\n')
+                f.write('        int col = 0;\n')
+                f.write('        while(col < FONT_SIZE) {\n')
+                f.write(f'            if(!(rowData & (({row_type})1 << (FONT_SIZE - 1 - col)))) {{ col++; continue; }}\n')
+                f.write('            int start = col;\n')
+                f.write(f'            while(col < FONT_SIZE && (rowData & (({row_type})1 << (FONT_SIZE - 1 - col)))) col++;\n')
+                f.write('            _drawFastHLine(_tft, x + start, y + row, col - start, color);\n')
+                f.write('        }\n')
+            elif render == 'blit':
+                f.write(f'        for(int col = 0; col < FONT_SIZE; col++) {{\n')
+                f.write(f'            *p++ = (rowData & (({row_type})1 << (FONT_SIZE - 1 - col))) ? color : _bg;\n')
+                f.write(f'        }}\n')
+            else:
+                f.write(f'        for(int col = 0; col < FONT_SIZE; col++) {{\n')
+                f.write(f'            if(rowData & (({row_type})1 << (FONT_SIZE - 1 - col))) {{\n')
+                f.write(f'                _drawPixel(_tft, x + col, y + row, color);\n')
+                f.write(f'            }}\n')
+                f.write(f'        }}\n')
             f.write(f'    }}\n')
-            f.write(f'}}\n\n')
-            
-            # drawString
-            f.write(f'void {lib_name}::drawString(int x, int y, const char* str, uint16_t color) {{\n')
-            f.write('    if(!_tft) return;\n')
-            f.write('    int curX = x;\n')
-            f.write('    int i = 0;\n')
-            f.write('    while(str[i]) {\n')
-            f.write('        uint8_t c = str[i];\n')
-            f.write('        if(c < 0x80) {\n')
-            f.write('            _drawChar(_tft, curX, y, c, color, 0, 1);\n')
-            f.write('            curX += 6;\n')
-            f.write('            i++;\n')
-            f.write('        } else if((c & 0xF0) == 0xE0) {\n')
-            f.write('            if(str[i+1] && str[i+2]) {\n')
-            f.write('                drawChinese(curX, y, &str[i], color);\n')
-            f.write('                curX += FONT_SIZE;\n')
-            f.write('                i += 3;\n')
-            f.write('            } else { i++; }\n')
-            f.write('        } else { i++; }\n')
-            f.write('    }\n')
-            f.write('}\n\n')
-            
-            # getStringWidth（辅助函数）
-            f.write(f'int {lib_name}::getStringWidth(const char* str) {{\n')
-            f.write('    if(!str) return 0;\n')
-            f.write('    int width = 0;\n')
-            f.write('    int i = 0;\n')
-            f.write('    while(str[i]) {\n')
-            f.write('        uint8_t c = str[i];\n')
-            f.write('        if(c < 0x80) {\n')
-            f.write('            width += 6;\n')
-            f.write('            i++;\n')
-            f.write('        } else if((c & 0xF0) == 0xE0) {\n')
-            f.write('            if(str[i+1] && str[i+2]) {\n')
-            f.write('                width += FONT_SIZE;\n')
-            f.write('                i += 3;\n')
-            f.write('            } else { i++; }\n')
-            f.write('        } else { i++; }\n')
-            f.write('    }\n')
-            f.write('    return width;\n')
-            f.write('}\n\n')
+            if render == 'blit':
+                f.write('    // 整个字一次推送（颜色字节序按 TFT 的 setSwapBytes 设置）\n')
+                f.write('    _pushImage(_tft, x, y, FONT_SIZE, FONT_SIZE, _blitBuf);\n')
+        f.write(f'}}\n\n')
+        
+        # ASCII 的宽度和绘制：默认用 TFT 自带的 6 像素字体，紧凑存储时用字体里的字形
+        ascii_width = 'asciiWidth(c)' if tight else '6'
+        def draw_ascii(x, y):
+            return f'drawAscii({x}, {y}, c, color)' if tight else f'_drawChar(_tft, {x}, {y}, c, color, 0, 1)'
+        
+        # 预渲染过的静态文本直接画位图
+        def find_static(mode, x, key=''):
+            if static_entries:
+                f.write('    // 预渲染过的静态文本直接画位图\n')
+                f.write(f'    int id = findStatic(str, {mode}{key});\n')
+                f.write(f'    if(id >= 0) {{ drawStatic(id, {x}, y, color); return; }}\n')
+                f.write('    \n')
+        
+        # drawString
+        f.write(f'void {lib_name}::drawString(int x, int y, const char* str, uint16_t color) {{\n')
+        f.write('    if(!_tft) return;\n')
+        find_static('STATIC_STRING', 'x')
+        f.write('    int curX = x;\n')
+        f.write('    int i = 0;\n')
+        f.write('    while(str[i]) {\n')
+        f.write('        uint8_t c = str[i];\n')
+        f.write('        if(c < 0x80) {\n')
+        f.write(f'            {draw_ascii("curX", "y")};\n')
+        f.write(f'            curX += {ascii_width};\n')
+        f.write('            i++;\n')
+        f.write('        } else if((c & 0xF0) == 0xE0) {\n')
+        f.write('            if(str[i+1] && str[i+2]) {\n')
+        f.write('                drawChinese(curX, y, &str[i], color);\n')
+        f.write('                curX += FONT_SIZE;\n')
+        f.write('                i += 3;\n')
+        f.write('            } else { i++; }\n')
+        f.write('        } else { i++; }\n')
+        f.write('    }\n')
+        f.write('}\n\n')
+        
+        # getStringWidth（辅助函数）
+        f.write(f'int {lib_name}::getStringWidth(const char* str) {{\n')
+        f.write('    if(!str) return 0;\n')
+        f.write('    int width = 0;\n')
+        f.write('    int i = 0;\n')
+        f.write('    while(str[i]) {\n')
+        f.write('        uint8_t c = str[i];\n')
+        f.write('        if(c < 0x80) {\n')
+        f.write(f'            width += {ascii_width};\n')
+        f.write('            i++;\n')
+        f.write('        } else if((c & 0xF0) == 0xE0) {\n')
+        f.write('            if(str[i+1] && str[i+2]) {\n')
+        f.write('                width += FONT_SIZE;\n')
+        f.write('                i += 3;\n')
+        f.write('            } else { i++; }\n')
+        f.write('        } else { i++; }\n')
+        f.write('    }\n')
+        f.write('    return width;\n')
+        f.write('}\n\n')
+        
+        # drawStringWrap（自动换行，从x开始）
+        f.write(f'void {lib_name}::drawStringWrap(int x, int y, const char* str, uint16_t color, int maxWidth, int lineHeight) {{\n')
+        f.write('    if(!_tft || !str || maxWidth <= 0) return;\n')
+        f.write('    if(lineHeight <= 0) lineHeight = FONT_SIZE + 4;\n')
+        f.write('    \n')
+        find_static('STATIC_WRAP', 'x', ', maxWidth, lineHeight')
+        f.write('    int curX = x;\n')
+        f.write('    int curY = y;\n')
+        f.write('    int lineWidth = 0;\n')
+        f.write('    int i = 0;\n')
+        f.write(f'    const int maxLines = {MAX_LINES};\n')
+        f.write('    int lineCount = 0;\n')
+        f.write('    \n')
+        f.write('    while(str[i] && lineCount < maxLines) {\n')
+        f.write('        uint8_t c = str[i];\n')
+        f.write('        int charWidth = 0;\n')
+        f.write('        int charBytes = 0;\n')
+        f.write('        \n')
+        f.write('        if(c < 0x80) {\n')
+        f.write(f'            charWidth = {ascii_width};\n')
+        f.write('            charBytes = 1;\n')
+        f.write('        } else if((c & 0xF0) == 0xE0) {\n')
+        f.write('            if(str[i+1] && str[i+2]) {\n')
+        f.write('                charWidth = FONT_SIZE;\n')
+        f.write('                charBytes = 3;\n')
+        f.write('            } else { i++; continue; }\n')
+        f.write('        } else { i++; continue; }\n')
+        f.write('        \n')
+        f.write('        // 像素有余数直接舍去，把当前字换到下一行\n')
+        f.write('        if(lineWidth + charWidth > maxWidth && lineWidth > 0) {\n')
+        f.write('            curX = x;\n')
+        f.write('            curY += lineHeight;\n')
+        f.write('            lineWidth = 0;\n')
+        f.write('            lineCount++;\n')
+        f.write('            if(lineCount >= maxLines) break;\n')
+        f.write('        }\n')
+        f.write('        \n')
+        f.write('        if(c < 0x80) {\n')
+        f.write(f'            {draw_ascii("curX", "curY")};\n')
+        f.write('        } else {\n')
+        f.write('            drawChinese(curX, curY, &str[i], color);\n')
+        f.write('        }\n')
+        f.write('        \n')
+        f.write('        curX += charWidth;\n')
+        f.write('        lineWidth += charWidth;\n')
+        f.write('        i += charBytes;\n')
+        f.write('    }\n')
+        f.write('}\n\n')
+        
+        # drawStringCenter（基于centerX居中，单行）
+        f.write(f'void {lib_name}::drawStringCenter(int y, const char* str, uint16_t color, int centerX) {{\n')
+        f.write('    if(!_tft || !str) return;\n')
+        find_static('STATIC_CENTER', 'centerX')
+        f.write('    int strWidth = getStringWidth(str);\n')
+        f.write('    int startX = centerX - strWidth / 2;\n')
+        f.write('    drawString(startX, y, str, color);\n')
+        f.write('}\n\n')
+        
+        # drawStringCenterWrap（基于centerX居中+换行，在maxWidth范围内，每行都居中）
+        f.write(f'void {lib_name}::drawStringCenterWrap(int y, const char* str, uint16_t color, int centerX, int maxWidth, int lineHeight) {{\n')
+        f.write('    if(!_tft || !str || maxWidth <= 0) return;\n')
+        f.write('    if(lineHeight <= 0) lineHeight = FONT_SIZE + 4;\n')
+        f.write('    \n')
+        find_static('STATIC_CENTER_WRAP', 'centerX', ', maxWidth, lineHeight')
+        f.write('    // 第一遍：分行计算，每行在maxWidth范围内\n')
+        f.write(f'    const int maxLines = {MAX_LINES};\n')
+        f.write('    int lineStarts[maxLines];\n')
+        f.write('    int lineWidths[maxLines];\n')
+        f.write('    int lineCount = 0;\n')
+        f.write('    \n')
+        f.write('    int i = 0;\n')
+        f.write('    int lineWidth = 0;\n')
+        f.write('    int lineStart = 0;\n')
+        f.write('    \n')
+        f.write('    while(str[i] && lineCount < maxLines) {\n')
+        f.write('        uint8_t c = str[i];\n')
+        f.write('        int charWidth = 0;\n')
+        f.write('        int charBytes = 0;\n')
+        f.write('        \n')
+        f.write('        if(c < 0x80) {\n')
+        f.write(f'            charWidth = {ascii_width};\n')
+        f.write('            charBytes = 1;\n')
+        f.write('        } else if((c & 0xF0) == 0xE0) {\n')
+        f.write('            if(str[i+1] && str[i+2]) {\n')
+        f.write('                charWidth = FONT_SIZE;\n')
+        f.write('                charBytes = 3;\n')
+        f.write('            } else { i++; continue; }\n')
+        f.write('        } else { i++; continue; }\n')
+        f.write('        \n')
+        f.write('        // 需要换行？像素有余数直接舍去\n')
+        f.write('        if(lineWidth + charWidth > maxWidth && lineWidth > 0) {\n')
+        f.write('            lineStarts[lineCount] = lineStart;\n')
+        f.write('            lineWidths[lineCount] = lineWidth;\n')
+        f.write('            lineCount++;\n')
+        f.write('            lineStart = i;\n')
+        f.write('            lineWidth = charWidth;\n')
+        f.write('        } else {\n')
+        f.write('            lineWidth += charWidth;\n')
+        f.write('        }\n')
+        f.write('        i += charBytes;\n')
+        f.write('    }\n')
+        f.write('    \n')
+        f.write('    // 最后一行\n')
+        f.write('    if(lineCount < maxLines && lineWidth > 0) {\n')
+        f.write('        lineStarts[lineCount] = lineStart;\n')
+        f.write('        lineWidths[lineCount] = lineWidth;\n')
+        f.write('        lineCount++;\n')
+        f.write('    }\n')
+        f.write('    \n')
+        f.write('    // 第二遍：绘制每行，每行基于centerX居中\n')
+        f.write('    for(int line = 0; line < lineCount; line++) {\n')
+        f.write('        int startIdx = lineStarts[line];\n')
+        f.write('        int width = lineWidths[line];\n')
+        f.write('        int drawX = centerX - width / 2;  // 基于centerX居中\n')
+        f.write('        int drawY = y + line * lineHeight;\n')
+        f.write('        \n')
+        f.write('        // 绘制该行\n')
+        f.write('        int idx = startIdx;\n')
+        f.write('        int curX = drawX;\n')
+        f.write('        int drawnWidth = 0;\n')
+        f.write('        while(str[idx] && drawnWidth < width) {\n')
+        f.write('            uint8_t c = str[idx];\n')
+        f.write('            if(c < 0x80) {\n')
+        f.write(f'                {draw_ascii("curX", "drawY")};\n')
+        f.write(f'                curX += {ascii_width};\n')
+        f.write(f'                drawnWidth += {ascii_width};\n')
+        f.write('                idx++;\n')
+        f.write('            } else if((c & 0xF0) == 0xE0) {\n')
+        f.write('                if(str[idx+1] && str[idx+2]) {\n')
+        f.write('                    drawChinese(curX, drawY, &str[idx], color);\n')
+        f.write('                    curX += FONT_SIZE;\n')
+        f.write('                    drawnWidth += FONT_SIZE;\n')
+        f.write('                    idx += 3;\n')
+        f.write('                } else { idx++; }\n')
+        f.write('            } else { idx++; }\n')
+        f.write('        }\n')
+        f.write('    }\n')
+        f.write('}\n')
+    
+    def write_library_json(self, f, lib):
+        """写 PlatformIO 的 library.json"""
+        lib_name, size, font_name = lib['name'], lib['size'], lib['font_name']
+        f.write('{\n')
+        f.write(f'  "name": "{lib_name}",\n')
+        f.write(f'  "version": "1.0.0",\n')
+        f.write(f'  "description": "{size}x{size} GB2312 Chinese Font ({font_name})",\n')
+        f.write('  "frameworks": "arduino",\n')
+        f.write('  "platforms": "espressif32"\n')
+        f.write('}\n')
+
+    def generate_batch(self, build_jobs, engine='auto', jobs=1, cache=None, **options):
+        """
+        批量生成多个 (字体, 字号) 组合
+        
+        build_jobs: [{'ttf': 路径, 'size': 字号, 'name': 字体名,
+                      'output_dir': 可选, 'codepoints': 可选码位表}, ...]
+        所有任务共用一个进程池，渲染块按任务顺序排进同一个 RenderWindow，在途的不超过 2*jobs 块，
+        主进程写前一个库快结束时工作进程已在渲染后面的任务；
+        已解析的字体在主进程和各工作进程里都会复用。
+        cache: GlyphCache 磁盘字形缓存，None 表示不使用缓存
+        options: 传给 generate 的其它参数（output_format 等），对所有任务生效
+        """
+        if jobs <= 0:
+            jobs = os.cpu_count() or 1
+        
+        for job in build_jobs:
+            if job['size'] not in self.font_configs:
+                print(f"错误：不支持字号 {job['size']}，支持: {list(self.font_configs.keys())}")
+                return False
+            if not os.path.exists(job['ttf']):
+                print(f"错误：找不到字体 {job['ttf']}")
+                return False
+        
+        default_codepoints = list(range(UNICODE_START, UNICODE_END + 1))
+        
+        def submitted_codepoints(job):
+            # 与 generate 里的筛选一致，提交的渲染块才能和写出的码位对上
+            codepoints = sorted(job.get('codepoints') or default_codepoints)
+            if options.get('skip_missing', True):
+                codepoints = self.covered_codepoints(job['ttf'], codepoints)
+            return codepoints
+        
+        # 统计里的字数按实际生成的（缺字已跳过）计
+        submitted = [submitted_codepoints(job) for job in build_jobs]
+        pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        results = []
+        try:
+            window = RenderWindow(pool, 2 * jobs) if pool is not None else None
+            pending = [
+                self.iter_glyph_batches(job['ttf'], codepoints, job['size'], engine, jobs,
+                                        cache=cache, window=window)
+                if pool is not None else None
+                for job, codepoints in zip(build_jobs, submitted)
+            ]
+            if window is not None:
+                window.fill()
+            last = time.perf_counter()
+            for job, rendered, generated in zip(build_jobs, pending, submitted):
+                codepoints = job.get('codepoints') or default_codepoints
+                ok = self.generate(job['ttf'], job['size'], job['name'], job.get('output_dir'),
+                                   engine, 1, rendered, cache, codepoints, **options)
+                now = time.perf_counter()
+                results.append((job, ok, now - last, len(generated)))
+                last = now
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        
+        # 统计每个任务的吞吐
+        print("\n" + "=" * 60)
+        print(f"批量生成: {len(build_jobs)} 个任务, {jobs} 进程")
+        # 失败的任务没有生成字，不算吞吐，也不计入合计
+        total = 0.0
+        for job, ok, elapsed, count in results:
+            lib_name = f"GB2312_{job['size']}_{job['name']}"
+            if not ok:
+                print(f"  ❌ {lib_name:<28} {elapsed:7.2f} s  {'-':>9} 字/秒")
+                continue
+            total += elapsed
+            rate = count / elapsed if elapsed > 0 else 0
+            print(f"  ✅ {lib_name:<28} {elapsed:7.2f} s  {rate:9.0f} 字/秒")
+        print(f"  合计 {total:.2f} s")
+        return all(ok for _, ok, _, _ in results)
+
+class GlyphStream:
+    """
+    iter_glyphs 的结果：按码位顺序逐字产出 (码位, 整格点阵) 的惰性字模流
+    
+    迭代时才开始渲染，且只能迭代一次；batches() 按批产出 (码位列表, 拼接的点阵)。
+    size / bytes_per_row / height 描述点阵格式，codepoints 为实际渲染的码位（升序），
+    sparse 表示码位不连续（写出时需要码位表）。
+    """
+    
+    def __init__(self, gen, ttf_path, size, codepoints, engine, jobs, cache):
+        self.gen = gen
+        self.ttf_path = ttf_path
+        self.size = size
+        self.bytes_per_row, self.height = gen.font_configs[size]
+        self.codepoints = codepoints
+        self.sparse = codepoints[-1] - codepoints[0] + 1 != len(codepoints)
+        self._args = (engine, jobs, cache)
+        self._used = False
+    
+    def __len__(self):
+        return len(self.codepoints)
+    
+    def batches(self):
+        if self._used:
+            raise RuntimeError("字模流只能迭代一次，请重新调用 iter_glyphs")
+        self._used = True
+        engine, jobs, cache = self._args
+        return self.gen.iter_glyph_batches(self.ttf_path, self.codepoints, self.size, engine, jobs,
+                                           cache=cache)
+    
+    def __iter__(self):
+        bytes_per_char = self.bytes_per_row * self.height
+        for batch, data in self.batches():
+            for i, unicode in enumerate(batch):
+                yield unicode, data[i * bytes_per_char:(i + 1) * bytes_per_char]
+
+def iter_glyphs(ttf_path, size, charset=None, engine='auto', jobs=1, cache=None, skip_missing=True,
+                gen=None):
+    """
+    渲染字模的流式接口，返回 GlyphStream（迭代时才渲染）
+    
+    charset: 内置字符集名字、码位序列，None 为默认的 CJK 基本区
+    cache: 可选的 GlyphCache；gen: 复用已加载字体的 FontGenerator
+    字号不支持、字体不存在或字符集为空时抛出 ValueError。
+    """
+    gen = gen or FontGenerator()
+    if size not in gen.font_configs:
+        raise ValueError(f"不支持字号 {size}，支持: {list(gen.font_configs)}")
+    if not os.path.exists(ttf_path):
+        raise ValueError(f"找不到字体 {ttf_path}")
+    if charset is None:
+        codepoints = list(range(UNICODE_START, UNICODE_END + 1))
+    elif isinstance(charset, str):
+        codepoints = charset_codepoints(charset)
+    else:
+        codepoints = sorted(set(charset))
+    if skip_missing:
+        codepoints = gen.covered_codepoints(ttf_path, codepoints)
+    if not codepoints:
+        raise ValueError("字符集为空（或字体不包含其中任何字）")
+    return GlyphStream(gen, ttf_path, size, codepoints, engine, jobs, cache)
+
+def write_glyphs(stream, sink, out=None, **options):
+    """
+    把 GlyphStream 边渲染边写出，渲染在后台线程里进行
+    
+    sink: 'c' 字模数组 _font.c（options 同 write_font_c，lib_name 默认 'Font'），
+          'bin' 外部字库文件，'png' 字模总览图（options: columns），
+          'bytes' 外部字库文件的内容，直接返回 bytes（不需要 out）
+    out: 路径或已打开的文件（'c' 为文本文件，其余为二进制文件）
+    'c' 返回 write_font_c 的统计字典，'bin' / 'png' 返回 None。
+    
+    渲染与写出之间最多积压 PIPELINE_QUEUE 批，内存占用与字数无关。'c' 的 dedup 默认为 False：
+    dedup=True 要先收齐整套字模才能决定是否去重，相当于两遍处理，内存随字数增长。
+    """
+    if sink not in ('c', 'bin', 'png', 'bytes'):
+        raise ValueError(f"未知输出: {sink}，可选: c, bin, png, bytes")
+    if out is None and sink != 'bytes':
+        raise ValueError(f"{sink} 输出需要 out（路径或文件）")
+    gen = stream.gen
+    rendered = prefetch(stream.batches())
+    if sink == 'bytes':
+        buffer = io.BytesIO()
+        gen.write_font_bin(buffer, stream.size, stream.codepoints, rendered, stream.sparse)
+        return buffer.getvalue()
+    if sink == 'c':
+        lib_name = options.pop('lib_name', 'Font')
+        options.setdefault('dedup', False)
+        return gen.write_font_c(out, lib_name, stream.ttf_path, stream.size, stream.codepoints,
+                                rendered, stream.sparse, **options)
+    if sink == 'bin':
+        gen.write_font_bin(out, stream.size, stream.codepoints, rendered, stream.sparse)
+        return None
+    gen.write_font_png(out, stream.size, stream.codepoints, rendered, **options)
+    return None
+
+def load_manifest(path):
+    """
+    读取批量任务清单（JSON，Python 3.11+ 也支持 TOML）
+    
+    格式: {"jobs": [{"ttf": "...", "name": "FangSong", "sizes": [12, 16]}, ...]}
+    每项可写 size 或 sizes，也可直接给出任务列表；
+    可选 charset / charset_file / scan 指定该项的字符集（见 resolve_codepoints）。
+    """
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    
+    entries = data['jobs'] if isinstance(data, dict) else data
+    build_jobs = []
+    for entry in entries:
+        sizes = entry.get('sizes', [entry.get('size')])
+        codepoints = None
+        if entry.get('charset') or entry.get('charset_file') or entry.get('scan'):
+            codepoints = resolve_codepoints(entry.get('charset'), entry.get('charset_file'),
+                                            entry.get('scan'))
+        for size in sizes:
+            job = {'ttf': entry['ttf'], 'size': int(size), 'name': entry['name']}
+            if 'output_dir' in entry and len(sizes) == 1:
+                job['output_dir'] = entry['output_dir']
+            if codepoints is not None:
+                job['codepoints'] = codepoints
+            build_jobs.append(job)
+    return build_jobs
+
+def parse_batch_args(fonts, sizes):
+    """解析 --fonts a.ttf:FangSong,b.ttf:KaiTi --sizes 12,16 为任务列表"""
+    build_jobs = []
+    for spec in fonts.split(','):
+        # 按最后一个冒号切分，兼容 C:/Windows/... 这类路径
+        ttf, _, name = spec.rpartition(':')
+        if not ttf or not name:
+            raise ValueError(f"字体参数格式应为 路径:字体名，收到: {spec}")
+        for size in sizes.split(','):
+            build_jobs.append({'ttf': ttf, 'size': int(size), 'name': name})
+    return build_jobs
+
+def write_metrics(metrics, metrics_path=None, cprofile_path=None):
+    """构建结束后写出 --metrics JSON 和 --cprofile 结果"""
+    if metrics is None:
+        return
+    if metrics_path:
+        metrics.write_json(metrics_path)
+        print(f"构建指标: {metrics_path}")
+    if cprofile_path and metrics.profiler is not None:
+        import pstats
+        metrics.profiler.dump_stats(cprofile_path)
+        print(f"\ncProfile（渲染循环，按累计耗时前15项），完整结果: {cprofile_path}")
+        pstats.Stats(metrics.profiler).sort_stats('cumulative').print_stats(15)
+
+class FontWatcher:
+    """
+    常驻构建（--watch）：解析过的字体、渲染过的字形都留在内存里，输入变化时只重新生成受影响的库
+    
+    plan: 返回任务列表的函数（见 plan_builds），输入变化后重新调用，字表、源码和清单的改动由此生效；
+    inputs: (文件列表, 源码目录列表)，连同各任务的字体文件按修改时间轮询，不依赖第三方监视库。
+    每个库记下输入的指纹（字体内容 hash、码位表、静态文本），只有指纹变了的库才重新生成；
+    生成结果先写在内存里（MemoryOutput），内容没变的文件不重写，固件项目不会重新编译它们。
+    cache 一般为 MemoryGlyphCache，options 传给 generate。
+    jobs > 1 时 run 期间所有生成共用一个进程池；每次生成前清掉上一次的构建统计，常驻进程里不越积越多。
+    """
+    
+    def __init__(self, gen, plan, inputs, engine='auto', jobs=1, cache=None, interval=0.2, **options):
+        self.gen = gen
+        self.plan = plan
+        self.files, self.dirs = inputs
+        self.engine = engine
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.cache = cache
+        self.interval = interval
+        self.options = options
+        self.build_jobs = []
+        # 库名 -> 最近一次成功生成时的输入指纹 / 最近一次生成的结果
+        self.fingerprints = {}
+        self.status = {}
+        self._snapshot = None
+        self.pool = None
+        # 轮询和 HTTP 请求可能同时触发生成，同一时间只生成一处
+        self._lock = threading.Lock()
+    
+    def snapshot(self):
+        """各输入文件的 (修改时间, 大小)，不存在的文件为 None"""
+        paths = list(self.files) + [job['ttf'] for job in self.build_jobs]
+        for src_dir in self.dirs:
+            paths += iter_sources(src_dir)
+        state = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+                state[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                state[path] = None
+        return state
+    
+    def fingerprint(self, job):
+        """决定库内容的输入的摘要；读不了静态文本时返回 None（总是重新生成，由 generate 报错）"""
+        obj_name = f"{job['name']}{job['size']}"
+        try:
+            static = []
+            if self.options.get('static_file'):
+                static += load_static_file(self.options['static_file'], obj_name)
+            if self.options.get('static_scan'):
+                static += scan_static_strings(self.options['static_scan'], obj_name)
+            digest = file_hash(job['ttf'])
+        except (OSError, ValueError):
+            return None
+        key = repr((digest, job['size'], job.get('output_dir'), job.get('codepoints'), static))
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+    
+    def check(self, force=()):
+        """
+        输入有变化时重新生成指纹变了的库，返回本次生成的结果列表
+        
+        force: 无论有没有变化都重新生成的库名，'*' 表示全部
+        """
+        with self._lock:
+            snapshot = self.snapshot()
+            if snapshot != self._snapshot:
+                # 文件可能还在写，等它稳定下来
+                while True:
+                    time.sleep(self.interval / 4)
+                    settled = self.snapshot()
+                    if settled == snapshot:
+                        break
+                    snapshot = settled
+                self._snapshot = snapshot
+                fonts = {job['ttf'] for job in self.build_jobs}
+                try:
+                    self.build_jobs = self.plan()
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"错误：{e}")
+                    return []
+                if {job['ttf'] for job in self.build_jobs} != fonts:
+                    # 清单换了字体，监视的文件跟着变
+                    self._snapshot = self.snapshot()
+            elif not force:
+                return []
             
-            # drawStringWrap（自动换行，从x开始）
-            f.write(f'void {lib_name}::drawStringWrap(int x, int y, const char* str, uint16_t color, int maxWidth, int lineHeight) {{\n')
-            f.write('    if(!_tft || !str || maxWidth <= 0) return;\n')
-            f.write('    if(lineHeight <= 0) lineHeight = FONT_SIZE + 4;\n')
-            f.write('    \n')
-            f.write('    int curX = x;\n')
-            f.write('    int curY = y;\n')
-            f.write('    int lineWidth = 0;\n')
-            f.write('    int i = 0;\n')
-            f.write('    const int maxLines = 50;\n')
-            f.write('    int lineCount = 0;\n')
-            f.write('    \n')
-            f.write('    while(str[i] && lineCount < maxLines) {\n')
-            f.write('        uint8_t c = str[i];\n')
-            f.write('        int charWidth = 0;\n')
-            f.write('        int charBytes = 0;\n')
-            f.write('        \n')
-            f.write('        if(c < 0x80) {\n')
-            f.write('            charWidth = 6;\n')
-            f.write('            charBytes = 1;\n')
-            f.write('        } else if((c & 0xF0) == 0xE0) {\n')
-            f.write('            if(str[i+1] && str[i+2]) {\n')
-            f.write('                charWidth = FONT_SIZE;\n')
-            f.write('                charBytes = 3;\n')
-            f.write('            } else { i++; continue; }\n')
-            f.write('        } else { i++; continue; }\n')
-            f.write('        \n')
-            f.write('        // 像素有余数直接舍去，把当前字换到下一行\n')
-            f.write('        if(lineWidth + charWidth > maxWidth && lineWidth > 0) {\n')
-            f.write('            curX = x;\n')
-            f.write('            curY += lineHeight;\n')
-            f.write('            lineWidth = 0;\n')
-            f.write('            lineCount++;\n')
-            f.write('            if(lineCount >= maxLines) break;\n')
-            f.write('        }\n')
-            f.write('        \n')
-            f.write('        if(c < 0x80) {\n')
-            f.write('            _drawChar(_tft, curX, curY, c, color, 0, 1);\n')
-            f.write('        } else {\n')
-            f.write('            drawChinese(curX, curY, &str[i], color);\n')
-            f.write('        }\n')
-            f.write('        \n')
-            f.write('        curX += charWidth;\n')
-            f.write('        lineWidth += charWidth;\n')
-            f.write('        i += charBytes;\n')
-            f.write('    }\n')
-            f.write('}\n\n')
-            
-            # drawStringCenter（基于centerX居中，单行）
-            f.write(f'void {lib_name}::drawStringCenter(int y, const char* str, uint16_t color, int centerX) {{\n')
-            f.write('    if(!_tft || !str) return;\n')
-            f.write('    int strWidth = getStringWidth(str);\n')
-            f.write('    int startX = centerX - strWidth / 2;\n')
-            f.write('    drawString(startX, y, str, color);\n')
-            f.write('}\n\n')
-            
-            # drawStringCenterWrap（基于centerX居中+换行，在maxWidth范围内，每行都居中）
-            f.write(f'void {lib_name}::drawStringCenterWrap(int y, const char* str, uint16_t color, int centerX, int maxWidth, int lineHeight) {{\n')
-            f.write('    if(!_tft || !str || maxWidth <= 0) return;\n')
-            f.write('    if(lineHeight <= 0) lineHeight = FONT_SIZE + 4;\n')
-            f.write('    \n')
-            f.write('    // 第一遍：分行计算，每行在maxWidth范围内\n')
-            f.write('    const int maxLines = 50;\n')
-            f.write('    int lineStarts[maxLines];\n')
-            f.write('    int lineWidths[maxLines];\n')
-            f.write('    int lineCount = 0;\n')
-            f.write('    \n')
-            f.write('    int i = 0;\n')
-            f.write('    int lineWidth = 0;\n')
-            f.write('    int lineStart = 0;\n')
-            f.write('    \n')
-            f.write('    while(str[i] && lineCount < maxLines) {\n')
-            f.write('        uint8_t c = str[i];\n')
-            f.write('        int charWidth = 0;\n')
-            f.write('        int charBytes = 0;\n')
-            f.write('        \n')
-            f.write('        if(c < 0x80) {\n')
-            f.write('            charWidth = 6;\n')
-            f.write('            charBytes = 1;\n')
-            f.write('        } else if((c & 0xF0) == 0xE0) {\n')
-            f.write('            if(str[i+1] && str[i+2]) {\n')
-            f.write('                charWidth = FONT_SIZE;\n')
-            f.write('                charBytes = 3;\n')
-            f.write('            } else { i++; continue; }\n')
-            f.write('        } else { i++; continue; }\n')
-            f.write('        \n')
-            f.write('        // 需要换行？像素有余数直接舍去\n')
-            f.write('        if(lineWidth + charWidth > maxWidth && lineWidth > 0) {\n')
-            f.write('            lineStarts[lineCount] = lineStart;\n')
-            f.write('            lineWidths[lineCount] = lineWidth;\n')
-            f.write('            lineCount++;\n')
-            f.write('            lineStart = i;\n')
-            f.write('            lineWidth = charWidth;\n')
-            f.write('        } else {\n')
-            f.write('            lineWidth += charWidth;\n')
-            f.write('        }\n')
-            f.write('        i += charBytes;\n')
-            f.write('    }\n')
-            f.write('    \n')
-            f.write('    // 最后一行\n')
-            f.write('    if(lineCount < maxLines && lineWidth > 0) {\n')
-            f.write('        lineStarts[lineCount] = lineStart;\n')
-            f.write('        lineWidths[lineCount] = lineWidth;\n')
-            f.write('        lineCount++;\n')
-            f.write('    }\n')
-            f.write('    \n')
-            f.write('    // 第二遍：绘制每行，每行基于centerX居中\n')
-            f.write('    for(int line = 0; line < lineCount; line++) {\n')
-            f.write('        int startIdx = lineStarts[line];\n')
-            f.write('        int width = lineWidths[line];\n')
-            f.write('        int drawX = centerX - width / 2;  // 基于centerX居中\n')
-            f.write('        int drawY = y + line * lineHeight;\n')
-            f.write('        \n')
-            f.write('        // 绘制该行\n')
-            f.write('        int idx = startIdx;\n')
-            f.write('        int curX = drawX;\n')
-            f.write('        int drawnWidth = 0;\n')
-            f.write('        while(str[idx] && drawnWidth < width) {\n')
-            f.write('            uint8_t c = str[idx];\n')
-            f.write('            if(c < 0x80) {\n')
-            f.write('                _drawChar(_tft, curX, drawY, c, color, 0, 1);\n')
-            f.write('                curX += 6;\n')
-            f.write('                drawnWidth += 6;\n')
-            f.write('                idx++;\n')
-            f.write('            } else if((c & 0xF0) == 0xE0) {\n')
-            f.write('                if(str[idx+1] && str[idx+2]) {\n')
-            f.write('                    drawChinese(curX, drawY, &str[idx], color);\n')
-            f.write('                    curX += FONT_SIZE;\n')
-            f.write('                    drawnWidth += FONT_SIZE;\n')
-            f.write('                    idx += 3;\n')
-            f.write('                } else { idx++; }\n')
-            f.write('            } else { idx++; }\n')
-            f.write('        }\n')
-            f.write('    }\n')
-            f.write('}\n')
-        
-        # 生成library.json
-        json_path = f"{output_dir}/library.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            f.write('{\n')
-            f.write(f'  "name": "{lib_name}",\n')
-            f.write(f'  "version": "1.0.0",\n')
-            f.write(f'  "description": "{size}x{size} GB2312 Chinese Font ({font_name})",\n')
-            f.write('  "frameworks": "arduino",\n')
-            f.write('  "platforms": "espressif32"\n')
-            f.write('}\n')
-        
-        # 统计
-        font_size = os.path.getsize(font_c_path)
-        print(f"\n✅ 生成完成: {lib_name}")
-        print(f"  位置: {output_dir}")
-        print(f"  字号: {size}x{size}")
-        print(f"  字库: {font_size/1024:.1f} KB")
-        print(f"\n使用方式:")
-        print(f'  #include <{lib_name}.h>')
-        print(f'  {obj_name}.setTFT(&tft);')
-        print(f'  {obj_name}.drawString(10, 10, "中文", TFT_WHITE);')
-        print(f'\n新增功能:')
-        print(f'  {obj_name}.drawStringWrap(10, 10, "长文本", TFT_WHITE, 100, 20);')
-        print(f'  {obj_name}.drawStringCenter(50, "居中", TFT_WHITE, 120);  // y=50, centerX=120')
-        print(f'  {obj_name}.drawStringCenterWrap(80, "长文本居中", TFT_WHITE, 120, 100, 20);')
+            results = []
+            for job in self.build_jobs:
+                lib_name = f"GB2312_{job['size']}_{job['name']}"
+                key = self.fingerprint(job)
+                if key is not None and self.fingerprints.get(lib_name) == key \
+                        and lib_name not in force and '*' not in force:
+                    continue
+                results.append(self.build(job, lib_name, key))
+            return results
+    
+    def build(self, job, lib_name, key):
+        output_dir = job.get('output_dir') or f"lib/{lib_name}"
+        output = MemoryOutput(output_dir)
+        if self.gen.metrics is not None:
+            self.gen.metrics.builds.clear()
+        start = time.perf_counter()
+        try:
+            ok = self.gen.generate(job['ttf'], job['size'], job['name'], output_dir, self.engine,
+                                   self.jobs, cache=self.cache, codepoints=job.get('codepoints'),
+                                   output=output, pool=self.pool, **self.options)
+            changed = output.save(output_dir) if ok else []
+        except Exception as e:  # 常驻进程不因一次生成失败退出，等下一次修改
+            print(f"错误：生成 {lib_name} 失败: {e}")
+            ok, changed = False, []
+        seconds = time.perf_counter() - start
+        if ok and key is not None:
+            self.fingerprints[lib_name] = key
+        else:
+            self.fingerprints.pop(lib_name, None)
+        result = {'lib': lib_name, 'ok': bool(ok), 'seconds': round(seconds, 3), 'changed': changed,
+                  'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+        self.status[lib_name] = result
+        print(f"{'🔁' if ok else '❌'} {lib_name} {seconds:.2f} s，"
+              + (f"更新: {', '.join(changed)}" if changed else '文件内容无变化'))
+        return result
+    
+    def serve(self, port):
+        """在 127.0.0.1:port 开 HTTP 接口（后台线程），返回 server"""
+        import http.server
+        import urllib.parse
+        watcher = self
+        
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def reply(self, code, body):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_GET(self):
+                if urllib.parse.urlparse(self.path).path != '/status':
+                    self.reply(404, {'error': '可用接口: GET /status, POST /build'})
+                    return
+                libs = [f"GB2312_{job['size']}_{job['name']}" for job in watcher.build_jobs]
+                self.reply(200, {'libs': {lib: watcher.status.get(lib) for lib in libs}})
+            
+            def do_POST(self):
+                url = urllib.parse.urlparse(self.path)
+                if url.path != '/build':
+                    self.reply(404, {'error': '可用接口: GET /status, POST /build'})
+                    return
+                query = urllib.parse.parse_qs(url.query)
+                force = set(query.get('lib', []))
+                if query.get('all', ['0'])[0] not in ('', '0'):
+                    force.add('*')
+                built = watcher.check(force)
+                self.reply(200 if all(r['ok'] for r in built) else 500, {'built': built})
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=server.serve_forever, name='font-http', daemon=True).start()
+        return server
+    
+    def run(self, port=None):
+        """先生成全部库，之后每 interval 秒检查一次，Ctrl+C 退出"""
+        if self.jobs > 1:
+            # 进程池在主线程里建好并启动工作进程，不在 HTTP 或预取的后台线程里 fork
+            self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+            self.pool.submit(os.getpid).result()
+        server = self.serve(port) if port is not None else None
+        try:
+            self.check()
+            print(f"\n监视中：{len(self.build_jobs)} 个库，每 {self.interval} 秒检查一次"
+                  + (f"，HTTP 接口 http://127.0.0.1:{port}/status" if server else '') + "，Ctrl+C 退出")
+            while True:
+                time.sleep(self.interval)
+                self.check()
+        except KeyboardInterrupt:
+            print("\n已停止监视")
+        finally:
+            if server is not None:
+                server.shutdown()
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+                self.pool = None
+
+def plan_builds(args):
+    """
+    按命令行参数列出要生成的库，返回任务列表（格式见 generate_batch，单个字库时只有一项）
+    
+    指定了字符集来源时各任务没写码位表的用命令行的字符集，否则为默认范围。
+    --watch 时每次输入变化都重新调用，字表、源码和清单的改动由此生效。
+    """
+    build_jobs = None
+    if args.manifest or args.fonts:
+        build_jobs = load_manifest(args.manifest) if args.manifest else []
+        if args.fonts:
+            build_jobs += parse_batch_args(args.fonts, args.sizes)
+    
+    # --static-scan 覆盖了 --scan 的目录时，只在静态文本里出现的字会预渲染，不必再收进字库
+    static_objects = ()
+    if args.scan and args.static_scan:
+        scan_dir, static_dir = os.path.abspath(args.scan), os.path.abspath(args.static_scan)
+        if os.path.commonpath([scan_dir, static_dir]) == static_dir:
+            if build_jobs is not None:
+                static_objects = [f"{job['name']}{job['size']}" for job in build_jobs]
+            else:
+                static_objects = [f"{args.name}{args.size}"]
+    codepoints = None
+    if args.charset or args.charset_file or args.scan:
+        codepoints = resolve_codepoints(args.charset, args.charset_file, args.scan, static_objects,
+                                        args.tight)
+        if not codepoints and static_objects:
+            # 用到的字全在静态文本里；字库不能为空，照常收录扫描到的字
+            codepoints = resolve_codepoints(args.charset, args.charset_file, args.scan)
+        print(f"字符集: {len(codepoints)} 字")
+    
+    if build_jobs is None:
+        build_jobs = [{'ttf': args.ttf, 'size': args.size, 'name': args.name}] if args.name else []
+    if codepoints is not None:
+        for job in build_jobs:
+            job.setdefault('codepoints', codepoints)
+    return build_jobs
+
+def watched_inputs(args):
+    """--watch 时监视的输入：(文件列表, 源码目录列表)；字体文件由 FontWatcher 按任务另外加入"""
+    files = [path for path in (args.manifest, args.charset_file, args.static_file) if path]
+    dirs = [path for path in (args.scan, args.static_scan) if path]
+    return files, dirs
 
 def main():
     gen = FontGenerator()
     
-    # 命令行参数: python generate_font.py <ttf文件> <字号> <字体名>
-    if len(sys.argv) >= 4:
-        ttf = sys.argv[1]
-        size = int(sys.argv[2])
-        name = sys.argv[3]
-        gen.generate(ttf, size, name)
+    # 命令行参数: python generate_font.py <ttf文件> <字号> <字体名> [选项]
+    parser = argparse.ArgumentParser(description="GB2312 中文点阵字库生成器")
+    parser.add_argument('ttf', nargs='?', help='ttf/ttc 字体文件')
+    parser.add_argument('size', nargs='?', type=int, help='字号')
+    parser.add_argument('name', nargs='?', help='字体名称拼音')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='并行渲染进程数，0=CPU核数（默认1）')
+    parser.add_argument('--engine', choices=['auto', 'numpy', 'reference'], default='auto',
+                        help='点阵渲染引擎（默认auto）')
+    parser.add_argument('--cache-dir', default='.font_cache', help='字形缓存目录（默认 .font_cache）')
+    parser.add_argument('--cache-max-mb', type=int, default=512, help='字形缓存大小上限 MB（默认512）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用字形缓存，全部重新渲染')
+    parser.add_argument('--charset', choices=list(CHARSETS),
+                        help='内置字符集：' + '；'.join(f'{k}={v}' for k, v in CHARSETS.items()))
+    parser.add_argument('--charset-file', help='自定义字表文件（UTF-8，收录其中出现的所有汉字）')
+    parser.add_argument('--scan', metavar='DIR', help='扫描项目源码目录，只收录实际用到的汉字')
+    parser.add_argument('--format', dest='output_format', choices=['array', 'bin'], default='array',
+                        help='array=字库编译进固件（默认）；bin=生成外部字库文件放到 LittleFS/SPIFFS')
+    parser.add_argument('--lru-slots', type=int, default=32, help='bin 模式内存字形缓存的字数（默认32）')
+    parser.add_argument('--compress', action='store_true', help='压缩字模（array 模式），字库更小')
+    parser.add_argument('--render', choices=['pixel', 'span', 'blit'], default='span',
+                        help='绘制方式：pixel=逐点，span=水平线合并（默认），blit=整字pushImage')
+    parser.add_argument('--no-comments', dest='comments', action='store_false',
+                        help='_font.c 不写每个字的 U+XXXX 注释')
+    parser.add_argument('--dense', action='store_true', help='_font.c 每个字只占一行')
+    parser.add_argument('--keep-missing', dest='skip_missing', action='store_false',
+                        help='不按字体 cmap 跳过缺字（缺字画成方框）')
+    parser.add_argument('--no-dedup', dest='dedup', action='store_false', help='不合并重复的字模')
+    parser.add_argument('--tight', action='store_true',
+                        help='紧凑存储：只存墨迹框内点阵+度量表，ASCII 用字体自身宽度（array 模式）')
+    parser.add_argument('--static', dest='static_file', metavar='FILE',
+                        help='静态文本表，每条按最终排版预渲染成位图，drawStatic 一次绘制')
+    parser.add_argument('--static-scan', metavar='DIR',
+                        help='扫描源码里文本和排版参数都是字面量的 drawString* 调用，预渲染成位图')
+    parser.add_argument('--profile', action='store_true', help='打印各阶段耗时、吞吐和峰值内存')
+    parser.add_argument('--metrics', metavar='FILE', help='把各阶段耗时等构建指标写成 JSON 文件')
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help='用 cProfile 分析渲染循环，结果存到 FILE（多进程时只含主进程）')
+    parser.add_argument('--manifest', help='批量任务清单 (.json / .toml)')
+    parser.add_argument('--fonts', help='批量模式字体列表，如 a.ttf:FangSong,b.ttf:KaiTi')
+    parser.add_argument('--sizes', help='批量模式字号列表，如 12,16,24')
+    parser.add_argument('--watch', action='store_true',
+                        help='常驻运行：字体、静态文本表、字表、清单或扫描的源码变化时，只重新生成受影响的库')
+    parser.add_argument('--watch-interval', type=float, default=0.2, help='--watch 检查文件变化的间隔秒数（默认0.2）')
+    parser.add_argument('--port', type=int,
+                        help='--watch 时在 127.0.0.1:PORT 提供 HTTP 接口（GET /status，POST /build）')
+    args = parser.parse_args()
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+    if args.profile or args.metrics or profiler is not None:
+        gen.metrics = BuildMetrics(verbose=args.profile, profiler=profiler)
+    cache = None if args.no_cache else GlyphCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    if args.fonts and not args.sizes:
+        parser.error('--fonts 需要同时指定 --sizes')
+    if args.watch:
+        if not (args.manifest or args.fonts or args.name):
+            parser.error('--watch 需要指定要生成的字库（<ttf> <字号> <字体名>、--fonts 或 --manifest）')
+        options = dict(output_format=args.output_format, lru_slots=args.lru_slots,
+                       compress=args.compress, render=args.render, comments=args.comments,
+                       dense=args.dense, skip_missing=args.skip_missing, dedup=args.dedup,
+                       tight=args.tight, static_file=args.static_file, static_scan=args.static_scan)
+        watcher = FontWatcher(gen, lambda: plan_builds(args), watched_inputs(args), engine=args.engine,
+                              jobs=args.jobs, cache=MemoryGlyphCache(cache), interval=args.watch_interval,
+                              **options)
+        watcher.run(args.port)
+        return
+    build_jobs = plan_builds(args)
+    
+    if args.manifest or args.fonts:
+        ok = gen.generate_batch(build_jobs, engine=args.engine, jobs=args.jobs, cache=cache,
+                                output_format=args.output_format, lru_slots=args.lru_slots,
+                                compress=args.compress, render=args.render,
+                                comments=args.comments, dense=args.dense,
+                                skip_missing=args.skip_missing, dedup=args.dedup, tight=args.tight,
+                                static_file=args.static_file, static_scan=args.static_scan)
+        write_metrics(gen.metrics, args.metrics, args.cprofile)
+        sys.exit(0 if ok else 1)
+    elif args.name:
+        ok = gen.generate(args.ttf, args.size, args.name, engine=args.engine, jobs=args.jobs,
+                          cache=cache, codepoints=build_jobs[0].get('codepoints'),
+                          output_format=args.output_format, lru_slots=args.lru_slots,
+                          compress=args.compress, render=args.render, comments=args.comments,
+                          dense=args.dense, skip_missing=args.skip_missing, dedup=args.dedup,
+                          tight=args.tight, static_file=args.static_file,
+                          static_scan=args.static_scan)
+        write_metrics(gen.metrics, args.metrics, args.cprofile)
+        sys.exit(0 if ok else 1)
     else:
         print("=" * 60)
         print("GB2312 中文点阵字库生成器")
@@ -423,6 +3380,27 @@ def main():
         print('  python generate_font.py "C:/Windows/Fonts/simfang.ttf" 16 FangSong')
         print('  python generate_font.py "C:/Windows/Fonts/simkai.ttf" 24 KaiTi')
         print('  python generate_font.py "C:/Windows/Fonts/simhei.ttf" 32 HeiTi')
+        print("\n选项:")
+        print('  -j N, --jobs N    多进程并行渲染，0=使用全部CPU核')
+        print('  --no-cache        不使用 .font_cache 字形缓存，全部重新渲染')
+        print('  --charset NAME    字符集: ' + ', '.join(CHARSETS))
+        print('  --charset-file F  自定义字表文件')
+        print('  --scan src/       只收录项目源码里用到的汉字')
+        print('  --format bin      生成外部字库文件（放 LittleFS/SPIFFS），运行时按需读取+LRU缓存')
+        print('  --compress        压缩字模，大字号字库可小三到四成以上')
+        print('  --render MODE     绘制方式: span(默认，水平线合并) / blit(整字pushImage) / pixel(逐点)')
+        print('  --no-comments / --dense  _font.c 不写注释 / 每字一行，文件更小、编译更快')
+        print('  --tight           紧凑存储：只存每个字的墨迹框+度量，ASCII 按字体宽度排版')
+        print('  --static FILE     静态文本表（名字 = 文本），每条预渲染成位图，drawStatic 一次画完')
+        print('  --static-scan src/  源码里文本是字面量的 drawString* 调用也预渲染，和 --scan 同用时这些字不进字库')
+        print('  --keep-missing    保留字体缺的字（默认按 cmap 跳过）；--no-dedup 不合并重复字模')
+        print('  --profile         打印各阶段耗时（加载/bbox/绘制/打包/写文件）、吞吐和峰值内存')
+        print('  --metrics F.json  构建指标写成 JSON，--cprofile F.prof 用 cProfile 分析渲染循环')
+        print("\n批量生成（所有任务共用一个进程池）:")
+        print('  python generate_font.py --fonts "C:/Windows/Fonts/simfang.ttf:FangSong,C:/Windows/Fonts/simkai.ttf:KaiTi" --sizes 12,16,24 -j 0')
+        print('  python generate_font.py --manifest fonts.json -j 0')
+        print("\n常驻模式（改字体、静态文本或源码后自动重新生成受影响的库）:")
+        print('  python generate_font.py --manifest fonts.json --scan src/ --watch --port 8765')
 
 if __name__ == "__main__":
     main()
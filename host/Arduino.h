@@ -0,0 +1,9 @@
+// 主机端测试用的最小 Arduino.h 替身
+#ifndef HOST_ARDUINO_H
+#define HOST_ARDUINO_H
+
+#include <stdint.h>
+#include <stddef.h>
+#include <string.h>
+
+#endif // HOST_ARDUINO_H
@@ -0,0 +1,85 @@
+// 主机端模拟文件系统：接口与 Arduino fs::FS / fs::File 中字库读取用到的部分一致
+#ifndef HOST_MOCK_FS_H
+#define HOST_MOCK_FS_H
+
+#include <stdint.h>
+#include <stdio.h>
+#include <string.h>
+#include <map>
+#include <memory>
+#include <string>
+#include <vector>
+
+struct MockFileStats {
+    uint32_t opens = 0;
+    uint32_t reads = 0;
+    uint32_t bytes = 0;
+};
+
+class MockFile {
+public:
+    MockFile() {}
+    MockFile(std::shared_ptr<std::vector<uint8_t>> data, MockFileStats* stats)
+        : _data(data), _stats(stats) {}
+
+    explicit operator bool() const { return (bool)_data; }
+
+    bool seek(uint32_t pos) {
+        if(!_data || pos > _data->size()) return false;
+        _pos = pos;
+        return true;
+    }
+
+    size_t read(uint8_t* buf, size_t len) {
+        if(!_data) return 0;
+        size_t n = _data->size() - _pos < len ? _data->size() - _pos : len;
+        memcpy(buf, _data->data() + _pos, n);
+        _pos += n;
+        _stats->reads++;
+        _stats->bytes += n;
+        return n;
+    }
+
+    void close() { _data.reset(); }
+
+private:
+    std::shared_ptr<std::vector<uint8_t>> _data;
+    MockFileStats* _stats = nullptr;
+    size_t _pos = 0;
+};
+
+class MockFS {
+public:
+    MockFileStats stats;
+
+    // 把主机上的文件挂到模拟文件系统的 path 下
+    bool addFile(const char* path, const char* hostPath) {
+        FILE* fp = fopen(hostPath, "rb");
+        if(!fp) return false;
+        auto data = std::make_shared<std::vector<uint8_t>>();
+        uint8_t buf[4096];
+        size_t n;
+        while((n = fread(buf, 1, sizeof(buf), fp)) > 0) data->insert(data->end(), buf, buf + n);
+        fclose(fp);
+        _files[path] = data;
+        return true;
+    }
+
+    void addData(const char* path, const std::vector<uint8_t>& bytes) {
+        _files[path] = std::make_shared<std::vector<uint8_t>>(bytes);
+    }
+
+    MockFile open(const char* path, const char* mode) {
+        (void)mode;
+        auto it = _files.find(path);
+        if(it == _files.end()) return MockFile();
+        stats.opens++;
+        // 每次打开得到独立的读指针，数据共享
+        return MockFile(it->second, &stats);
+    }
+
+private:
+    std::map<std::string, std::shared_ptr<std::vector<uint8_t>>> _files;
+};
+
+#endif // HOST_MOCK_FS_H
@@ -0,0 +1,82 @@
+// 主机端模拟 TFT：记录每个像素，统计各绘制接口的调用次数和估算的 SPI 传输字节
+#ifndef HOST_MOCK_TFT_H
+#define HOST_MOCK_TFT_H
+
+#include <stdint.h>
+#include <string.h>
+
+class MockTFT {
+public:
+    static const int WIDTH = 240;
+    static const int HEIGHT = 240;
+
+    // ST7789 每次设地址窗口：CASET+4字节、RASET+4字节、RAMWR，共11字节；每个点再加2字节
+    static const uint32_t WINDOW_BYTES = 11;
+
+    uint16_t fb[HEIGHT][WIDTH];
+    uint32_t pixelCalls = 0;
+    uint32_t charCalls = 0;
+    uint32_t hlineCalls = 0;
+    uint32_t pushCalls = 0;
+    uint32_t busBytes = 0;
+
+    MockTFT() { clear(); }
+
+    void clear() {
+        memset(fb, 0, sizeof(fb));
+        pixelCalls = 0;
+        charCalls = 0;
+        hlineCalls = 0;
+        pushCalls = 0;
+        busBytes = 0;
+    }
+
+    void drawPixel(int16_t x, int16_t y, uint16_t color) {
+        pixelCalls++;
+        busBytes += WINDOW_BYTES + 2;
+        set(x, y, color);
+    }
+
+    void drawFastHLine(int16_t x, int16_t y, int16_t w, uint16_t color) {
+        hlineCalls++;
+        busBytes += WINDOW_BYTES + 2 * w;
+        for(int i = 0; i < w; i++) set(x + i, y, color);
+    }
+
+    void pushImage(int16_t x, int16_t y, int16_t w, int16_t h, uint16_t* data) {
+        pushCalls++;
+        busBytes += WINDOW_BYTES + 2 * w * h;
+        for(int j = 0; j < h; j++)
+            for(int i = 0; i < w; i++) set(x + i, y + j, data[j * w + i]);
+    }
+
+    void drawChar(int16_t x, int16_t y, unsigned char c, uint16_t color, uint16_t bg, uint8_t size) {
+        (void)x; (void)y; (void)c; (void)color; (void)bg; (void)size;
+        charCalls++;
+    }
+
+    uint32_t drawCalls() const { return pixelCalls + hlineCalls + pushCalls; }
+
+    bool sameAs(const MockTFT& other) const {
+        return memcmp(fb, other.fb, sizeof(fb)) == 0;
+    }
+
+    uint32_t countColor(uint16_t color) const {
+        uint32_t n = 0;
+        for(int y = 0; y < HEIGHT; y++)
+            for(int x = 0; x < WIDTH; x++)
+                if(fb[y][x] == color) n++;
+        return n;
+    }
+
+    uint32_t litPixels() const {
+        return WIDTH * HEIGHT - countColor(0);
+    }
+
+private:
+    void set(int x, int y, uint16_t color) {
+        if(x >= 0 && x < WIDTH && y >= 0 && y < HEIGHT) fb[y][x] = color;
+    }
+};
+
+#endif // HOST_MOCK_TFT_H
@@ -0,0 +1,287 @@
+"""
+主机端 C++ 测试：生成字库后用 g++ 编译 host/ 下的测试程序并运行
+
+用法: python host/run_host_tests.py [字体文件]   （默认用仓库自带的 FangSong.ttf）
+"""
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(HOST_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from generate_font import (PIPELINE_QUEUE, RENDER_BATCH, BuildMetrics, FontGenerator, GlyphCache,
+                           font_codepoints, iter_glyphs, scan_project, scan_static_strings, write_glyphs)
+
+# 连续码位（直接定位）和不连续码位（码位表二分查找）各测一遍，以及该字符集的生成参数
+# 自带的仿宋只收录 GB2312 汉字，连续码位要保留缺字、不去重，才会走直接定位
+CHARSETS = {
+    'range': (list(range(0x4E00, 0x4F00)), {'skip_missing': False, 'dedup': False}),
+    # 隔两个取一个，再补上测试字符串用到的字；缺字按 cmap 跳过
+    'sparse': (sorted(set(range(0x4E00, 0x4F00, 3))
+                      | {ord(c) for c in '一丁七万丈三上下不与丐丑专且世丘丙业丛东丝丞丢两严丧个中丰串临丸丹为主丽举乃久么义之乌乍乎乏乐'}),
+               {}),
+}
+
+# 测试程序 -> 参与编译的库（字体名）；每个库都与逐点绘制的原始数组版 Ref 对比
+TESTS = {
+    'test_binfont': ['Ref', 'Bin'],
+    'test_compressed': ['Ref', 'Zip'],
+    'test_render': ['Ref', 'Span', 'Blit', 'Big'],
+    'test_dedup': ['Ref', 'Dup'],
+    'test_tight': ['Ref', 'Blit', 'Big', 'Tight', 'TightBlit', 'TightBig'],
+    'test_static': ['Ref', 'Span', 'Tight', 'TightBlit', 'Static', 'StaticBlit'],
+}
+
+# 静态文本表；test_static.cpp 里的字面量调用由 --static-scan 扫描 host/ 得到
+STATIC_FILE = os.path.join(HOST_DIR, 'static_strings.txt')
+
+# 各库的字号和生成参数
+LIBS = {
+    'Ref': (16, {'render': 'pixel'}),
+    'Bin': (16, {'output_format': 'bin', 'lru_slots': 16, 'render': 'pixel'}),
+    'Zip': (16, {'compress': True, 'render': 'pixel'}),
+    'Span': (16, {'render': 'span'}),
+    'Blit': (16, {'render': 'blit'}),
+    'Big': (40, {'render': 'span'}),
+    'Dup': (16, {'skip_missing': False, 'dedup': True, 'render': 'pixel'}),
+    'Tight': (16, {'tight': True, 'render': 'pixel'}),
+    'TightBlit': (16, {'tight': True, 'render': 'blit'}),
+    'TightBig': (40, {'tight': True, 'render': 'span'}),
+    'Static': (16, {'render': 'span', 'static_file': STATIC_FILE, 'static_scan': HOST_DIR}),
+    'StaticBlit': (16, {'tight': True, 'render': 'blit', 'static_file': STATIC_FILE}),
+}
+
+# 预览对照：preview_font.py 与编译后的 C++（LIBS 里全部的库，drawChar 按 5x7 点阵画出）画同样的场景，逐像素比较；
+# 字形缓存文件也按 Ref 的场景比一遍
+PREVIEW_TEST = 'test_preview'
+PREVIEW_TEXT = '一丁七万丈三上下不与丐丑专且世'
+PREVIEW_MIXED = 'A1 一丁 xyz!丈三'
+# 四字节、两字节 UTF-8 和控制字符：固件逐字节跳过或按 ASCII 处理
+PREVIEW_ODD = '一\U0001F600丁\u00e9三\x01七'
+
+# 场景里的调用 -> 文本在参数里的位置（与生成的 C++ 参数顺序一致）
+TEXT_ARG = {'drawString': 2, 'drawStringWrap': 2, 'drawStringCenter': 1, 'drawStringCenterWrap': 1}
+
+# numpy 引擎与逐像素参考实现逐字节对照的字号：含每行不是整字节的 10/12/14/20 号
+ENGINE_SIZES = (8, 10, 12, 14, 16, 20, 24, 40)
+ENGINE_TEXT = '一丁七万丈三上下不与丐丑专且世乐'
+
+def lib_dir(workdir, lib):
+    size = LIBS[lib][0]
+    return os.path.join(workdir, f'GB2312_{size}_{lib}')
+
+def compile_and_run(test, libs, workdir, args):
+    exe = os.path.join(workdir, test)
+    cmd = ['g++', '-std=c++11', '-Wall', '-O1', '-I', HOST_DIR, '-I', workdir]
+    for lib in libs:
+        cmd += ['-I', os.path.join(lib_dir(workdir, lib), 'src')]
+    cmd.append(os.path.join(HOST_DIR, f'{test}.cpp'))
+    for lib in libs:
+        src = os.path.join(lib_dir(workdir, lib), 'src')
+        cmd.append(os.path.join(src, os.path.basename(lib_dir(workdir, lib)) + '.cpp'))
+    cmd += ['-o', exe]
+    subprocess.run(cmd, check=True)
+    return subprocess.run([exe] + args).returncode
+
+def preview_scenes():
+    """(库, 屏幕底色, blit背景色, 调用, 整数参数, 文本)；底色不为 0 时 blit 背景格和 drawChar 底色格才看得出来"""
+    scenes = []
+    for lib in LIBS:
+        scenes += [
+            (lib, 0, 0, 'drawString', [4, 4, 0xFFFF], PREVIEW_TEXT),
+            (lib, 0x18E3, 0xF800, 'drawString', [2, 30, 0x07E0], PREVIEW_MIXED),
+            (lib, 0x18E3, 0xF800, 'drawString', [2, 60, 0], PREVIEW_MIXED),
+            (lib, 0, 0, 'drawString', [-7, -5, 0xFFFF], PREVIEW_TEXT),
+            (lib, 0, 0, 'drawString', [200, 228, 0xFFFF], PREVIEW_MIXED),
+            (lib, 0x18E3, 0x001F, 'drawString', [0, 100, 0xFFE0], PREVIEW_ODD),
+            (lib, 0, 0, 'drawStringWrap', [3, 20, 0xFFFF, 70, 0], PREVIEW_MIXED + PREVIEW_TEXT),
+            # 每行一个字，超过 50 行的部分不画
+            (lib, 0x18E3, 0x001F, 'drawStringWrap', [10, 0, 0xFFFF, 1, 4], PREVIEW_TEXT * 4),
+            (lib, 0, 0, 'drawStringCenter', [60, 0xFFFF, 120], PREVIEW_MIXED),
+            (lib, 0, 0, 'drawStringCenter', [60, 0xFFFF, 3], PREVIEW_TEXT),
+            (lib, 0x18E3, 0xF800, 'drawStringCenterWrap', [40, 0xFFFF, 120, 50, 18], PREVIEW_MIXED + PREVIEW_TEXT),
+            (lib, 0, 0, 'drawStringCenterWrap', [10, 0xFFFF, 120, 0, 0], PREVIEW_TEXT),
+        ]
+    # 静态文本：drawString* 命中预渲染位图，以及按序号 drawStatic
+    for lib in ('Static', 'StaticBlit'):
+        scenes += [
+            (lib, 0, 0, 'drawString', [10, 20, 0xFFFF], '一丁七万'),
+            (lib, 0x18E3, 0xF800, 'drawStringCenterWrap', [40, 0xFFFF, 120, 40, 20], '丈三上下不与丐丑专且世'),
+            (lib, 0x18E3, 0xF800, 'drawStringWrap', [0, 0, 0xFFFF, 100, 0], 'Hello 世丘'),
+            (lib, 0, 0, 'drawString', [0, 0, 0xFFFF], '一，丁'),
+        ]
+        scenes += [(lib, 0x18E3, 0xF800, 'drawStatic', [i, 5, 50, 0xFFFF], '') for i in range(4)]
+    return scenes
+
+def check_preview(ttf, name, bin_path, cache, workdir):
+    """编译 test_preview.cpp 画出全部场景，再用 preview_font.py 画一遍逐像素比较"""
+    try:
+        import numpy as np
+        from preview_font import GLCD_FONT, FontPreview, new_screen, run_scene
+    except ImportError:
+        print(f"[{name}] {PREVIEW_TEST} 未安装 numpy，跳过")
+        return True
+    
+    with open(os.path.join(workdir, 'glcdfont.h'), 'w', encoding='utf-8') as f:
+        f.write('static const uint8_t GLCD_FONT[] = {\n')
+        for i in range(0, len(GLCD_FONT), 5):
+            f.write(''.join(f'0x{b:02X},' for b in GLCD_FONT[i:i + 5]) + '\n')
+        f.write('};\n')
+    scenes = preview_scenes()
+    scenes_path = os.path.join(workdir, 'scenes.txt')
+    with open(scenes_path, 'w', encoding='utf-8', newline='\n') as f:
+        for lib, fill, bg, call, args, text in scenes:
+            f.write(f"{lib}\t{fill}\t{bg}\t{call}\t{' '.join(map(str, args))}\t{text}\n")
+    out_path = os.path.join(workdir, 'preview.raw')
+    code = compile_and_run(PREVIEW_TEST, list(LIBS), workdir, [bin_path, scenes_path, out_path])
+    if code != 0:
+        print(f"[{name}] {PREVIEW_TEST} 退出码 {code}")
+        return False
+    expected = np.fromfile(out_path, dtype='<u2').reshape(len(scenes), 240, 240)
+    
+    fonts = {lib: FontPreview.load(lib_dir(workdir, lib)) for lib in LIBS}
+    cache_font = FontPreview.load(cache.path_for(ttf, 16))
+    checks = [(fonts[s[0]], s, frame) for s, frame in zip(scenes, expected)]
+    checks += [(cache_font, s, frame) for s, frame in zip(scenes, expected) if s[0] == 'Ref']
+    failures = 0
+    for font, (lib, fill, bg, call, args, text), frame in checks:
+        if call in TEXT_ARG:
+            args = args[:TEXT_ARG[call]] + [text] + args[TEXT_ARG[call]:]
+        font.set_background(bg)
+        fb = run_scene(new_screen(240, 240, fill), font, [[call] + args])
+        if not np.array_equal(fb, frame):
+            print(f"FAIL {font.name} {call}{tuple(args)}: {int((fb != frame).sum())} 个点不一致")
+            failures += 1
+    print(f"[{name}] {PREVIEW_TEST} {len(checks)} 个场景，{failures} 个不一致")
+    return failures == 0
+
+def check_engines(gen, ttf):
+    """render_glyphs_numpy 与 render_glyph_reference 的输出必须逐字节相同（含空格、ASCII 和字体缺的字）"""
+    try:
+        import numpy
+    except ImportError:
+        print("[engine] 未安装 numpy，跳过")
+        return True
+    covered = font_codepoints(ttf) or set()
+    missing = next((u for u in range(0x4E00, 0x9FA6) if u not in covered), None)
+    codepoints = [ord(c) for c in ENGINE_TEXT] + [0x20, ord('A'), ord('g')]
+    if missing is not None:
+        codepoints.append(missing)
+    failures = 0
+    for size in ENGINE_SIZES:
+        font = gen.load_font(ttf, size)
+        fast = gen.render_glyphs(font, codepoints, size, 'numpy')
+        slow = gen.render_glyphs(font, codepoints, size, 'reference')
+        bytes_per_char = len(slow) // len(codepoints)
+        for i, unicode in enumerate(codepoints):
+            if fast[i * bytes_per_char:(i + 1) * bytes_per_char] != slow[i * bytes_per_char:(i + 1) * bytes_per_char]:
+                print(f"FAIL {size}号 U+{unicode:04X}: numpy 与参考实现点阵不同")
+                failures += 1
+    print(f"[engine] {len(ENGINE_SIZES)} 个字号 x {len(codepoints)} 字"
+          f"{f'（含缺字 U+{missing:04X}）' if missing is not None else ''}，{failures} 个不一致")
+    return failures == 0
+
+def check_streaming(gen, ttf):
+    """write_glyphs 写 _font.c 时渲染最多领先写出 PIPELINE_QUEUE 批（加上两边各自手里的一批），不攒整套字模"""
+    stream = iter_glyphs(ttf, 8, range(0x4E00, 0x9FA6), skip_missing=False, gen=gen)
+    bytes_per_char = stream.bytes_per_row * stream.height
+    counts = {'rendered': 0, 'written': 0, 'ahead': 0}
+    
+    def counted(batches):
+        for batch, data in batches:
+            counts['rendered'] += len(batch)
+            counts['ahead'] = max(counts['ahead'], counts['rendered'] - counts['written'])
+            yield batch, data
+    
+    class Sink:
+        def write(self, text):
+            counts['written'] += text.count('0x') // bytes_per_char
+    
+    batches = stream.batches
+    stream.batches = lambda: counted(batches())
+    write_glyphs(stream, 'c', Sink(), comments=False)
+    limit = (PIPELINE_QUEUE + 2) * RENDER_BATCH
+    print(f"[stream] {len(stream)} 字，渲染最多领先写出 {counts['ahead']} 字（上限 {limit}）")
+    return counts['ahead'] <= limit and counts['written'] == len(stream)
+
+def check_metrics(ttf, workdir):
+    """--metrics 下失败的构建（字体文件损坏）也要收尾：单个和批量生成都照常写出报告，失败的记 ok=false"""
+    junk = os.path.join(workdir, 'junk.ttf')
+    with open(junk, 'wb') as f:
+        f.write(b'not a font' * 100)
+    gen = FontGenerator()
+    gen.metrics = BuildMetrics()
+    codepoints = [ord(c) for c in ENGINE_TEXT]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        single = gen.generate(junk, 16, 'Junk', os.path.join(workdir, 'Junk'), codepoints=codepoints)
+        batch = gen.generate_batch([{'ttf': ttf, 'size': 12, 'name': 'Good', 'codepoints': codepoints,
+                                     'output_dir': os.path.join(workdir, 'Good')},
+                                    {'ttf': junk, 'size': 12, 'name': 'Junk',
+                                     'output_dir': os.path.join(workdir, 'Junk12')}])
+    path = os.path.join(workdir, 'metrics.json')
+    gen.metrics.write_json(path)
+    with open(path, encoding='utf-8') as f:
+        builds = json.load(f)['builds']
+    ok = (single is False and batch is False and [b['ok'] for b in builds] == [False, True, False]
+          and all(b['seconds'] is not None for b in builds))
+    print(f"[metrics] 失败的构建 {sum(not b['ok'] for b in builds)} 个，报告{'正常' if ok else '不对'}")
+    return ok
+
+# --scan 用的草图：注释（含注释掉的调用）里的字不收录，字符串里的 // 和 /* 不是注释
+SCAN_SKETCH = """// 标题：丈三
+#include "GB2312_16_FangSong.h"
+/* 上下
+   FangSong16.drawString(0, 0, "不与", TFT_WHITE); */
+void setup() {
+    FangSong16.drawString(0, 0, "一//丁", TFT_WHITE);  // 丐
+    // FangSong16.drawString(0, 20, "丑专", TFT_WHITE);
+    FangSong16.drawString(0, 40, "七/*万*/", TFT_WHITE);
+}
+"""
+
+def check_scan(workdir):
+    """--scan / --static-scan 跳过 C/C++ 注释"""
+    with open(os.path.join(workdir, 'sketch.ino'), 'w', encoding='utf-8') as f:
+        f.write(SCAN_SKETCH)
+    found = ''.join(sorted(chr(u) for u in scan_project(workdir)))
+    static = [entry['text'] for entry in scan_static_strings(workdir, 'FangSong16')]
+    ok = found == ''.join(sorted('一丁七万')) and static == ['一//丁', '七/*万*/']
+    print(f"[scan] 收录 {found}，静态文本 {static}{'' if ok else '，不对'}")
+    return ok
+
+def build_and_run(gen, ttf, name, codepoints, charset_options, workdir):
+    # 字形缓存只渲染一次，缓存文件还用来测预览
+    cache = GlyphCache(os.path.join(workdir, 'cache'))
+    for lib, (size, options) in LIBS.items():
+        gen.generate(ttf, size, lib, lib_dir(workdir, lib), codepoints=codepoints, cache=cache,
+                     **dict(charset_options, **options))
+    
+    bin_path = os.path.join(workdir, 'GB2312_16_Bin', 'data', 'GB2312_16_Bin.bin')
+    ok = True
+    for test, libs in TESTS.items():
+        code = compile_and_run(test, libs, workdir, [bin_path])
+        print(f"[{name}] {test} 退出码 {code}")
+        ok = ok and code == 0
+    return check_preview(ttf, name, bin_path, cache, workdir) and ok
+
+def main():
+    ttf = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT_DIR, 'FangSong.ttf')
+    gen = FontGenerator()
+    ok = check_engines(gen, ttf)
+    ok = check_streaming(gen, ttf) and ok
+    with tempfile.TemporaryDirectory() as workdir:
+        ok = check_metrics(ttf, workdir) and ok
+    with tempfile.TemporaryDirectory() as workdir:
+        ok = check_scan(workdir) and ok
+    for name, (codepoints, options) in CHARSETS.items():
+        with tempfile.TemporaryDirectory() as workdir:
+            ok = build_and_run(gen, ttf, name, codepoints, options, workdir) and ok
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
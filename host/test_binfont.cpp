@@ -0,0 +1,73 @@
+// 外部二进制字库（--format bin）主机端测试
+// 由 run_host_tests.py 生成 GB2312_16_Ref（数组）和 GB2312_16_Bin（文件）两个库后编译运行
+#include <stdio.h>
+#include "mock_fs.h"
+#include "mock_tft.h"
+#include "GB2312_16_Ref.h"
+#include "GB2312_16_Bin.h"
+
+static int failures = 0;
+
+#define CHECK(cond) do { \
+    if(!(cond)) { printf("FAIL %s:%d: %s\n", __FILE__, __LINE__, #cond); failures++; } \
+} while(0)
+
+static const char* TEXT = "一丁七万丈三上下不与A丐丑专且世";
+static const char* LONG_TEXT =
+    "一丁七万丈三上下不与丐丑专且世丘丙业丛东丝丞丢两严丧个中丰串临丸丹为主丽举乃久么义之乌乍乎乏乐";
+
+int main(int argc, char** argv) {
+    if(argc < 2) {
+        printf("usage: %s <GB2312_16_Bin.bin>\n", argv[0]);
+        return 2;
+    }
+
+    MockFS fs;
+    CHECK(fs.addFile("/GB2312_16_Bin.bin", argv[1]));
+    MockTFT ref, tft;
+
+    // 打不开的文件、错误的文件头
+    CHECK(!Bin16.begin(fs, "/missing.bin"));
+    fs.addData("/bad.bin", std::vector<uint8_t>(64, 0));
+    CHECK(!Bin16.begin(fs, "/bad.bin"));
+
+    CHECK(Bin16.begin(fs));
+    Ref16.setTFT(&ref);
+    Bin16.setTFT(&tft);
+
+    // 与编译进固件的数组版逐像素一致
+    Ref16.drawString(0, 0, TEXT, 0xFFFF);
+    Bin16.drawString(0, 0, TEXT, 0xFFFF);
+    CHECK(ref.litPixels() > 0);
+    CHECK(tft.sameAs(ref));
+    CHECK(tft.pixelCalls == ref.pixelCalls);
+
+    // 第二次绘制全部命中缓存，不再读文件
+    uint32_t reads = fs.stats.reads;
+    uint32_t misses = Bin16.getCacheMisses();
+    Bin16.drawString(0, 20, TEXT, 0xFFFF);
+    CHECK(fs.stats.reads == reads);
+    CHECK(Bin16.getCacheMisses() == misses);
+
+    // 字库里没有的字不画、不崩溃
+    tft.clear();
+    Bin16.drawString(0, 0, "龥", 0xFFFF);
+    CHECK(tft.pixelCalls == 0);
+
+    // 超过缓存容量时淘汰旧字，结果仍然正确
+    ref.clear();
+    tft.clear();
+    Ref16.drawStringWrap(0, 0, LONG_TEXT, 0xFFFF, 240);
+    Bin16.drawStringWrap(0, 0, LONG_TEXT, 0xFFFF, 240);
+    Bin16.drawStringWrap(0, 0, LONG_TEXT, 0xFFFF, 240);
+    CHECK(tft.sameAs(ref));
+
+    Bin16.end();
+    tft.clear();
+    Bin16.drawString(0, 0, TEXT, 0xFFFF);
+    CHECK(tft.pixelCalls == 0);
+
+    printf("%s: %d failure(s), %u file reads, %u bytes\n",
+           failures ? "FAILED" : "OK", failures, fs.stats.reads, fs.stats.bytes);
+    return failures ? 1 : 0;
+}
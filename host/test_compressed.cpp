@@ -0,0 +1,36 @@
+// 压缩字模（--compress）主机端测试
+// 由 run_host_tests.py 生成 GB2312_16_Ref（原始数组）和 GB2312_16_Zip（压缩数组）两个库后编译运行
+#include <stdio.h>
+#include "mock_tft.h"
+#include "GB2312_16_Ref.h"
+#include "GB2312_16_Zip.h"
+
+static int failures = 0;
+
+#define CHECK(cond) do { \
+    if(!(cond)) { printf("FAIL %s:%d: %s\n", __FILE__, __LINE__, #cond); failures++; } \
+} while(0)
+
+static const char* TEXT =
+    "一丁七万丈三上下不与丐丑专且世丘丙业丛东丝丞丢两严丧个中丰串临丸丹为主丽举乃久么义之乌乍乎乏乐";
+
+int main() {
+    MockTFT ref, tft;
+    Ref16.setTFT(&ref);
+    Zip16.setTFT(&tft);
+
+    // 解压后与原始数组逐像素一致
+    Ref16.drawStringWrap(0, 0, TEXT, 0xFFFF, 240);
+    Zip16.drawStringWrap(0, 0, TEXT, 0xFFFF, 240);
+    CHECK(ref.litPixels() > 0);
+    CHECK(tft.sameAs(ref));
+    CHECK(tft.pixelCalls == ref.pixelCalls);
+
+    // 字库外的字不画
+    tft.clear();
+    Zip16.drawString(0, 0, "龥", 0xFFFF);
+    CHECK(tft.pixelCalls == 0);
+
+    printf("%s: %d failure(s)\n", failures ? "FAILED" : "OK", failures);
+    return failures ? 1 : 0;
+}
@@ -0,0 +1,68 @@
+// 缺字跳过与字模去重主机端测试
+// 由 run_host_tests.py 生成 GB2312_16_Ref 和 GB2312_16_Dup（保留缺字、去重）两个库后编译运行
+#include <stdio.h>
+#include "mock_tft.h"
+#include "GB2312_16_Ref.h"
+#include "GB2312_16_Dup.h"
+#include "GB2312_16_Dup_font.c"
+
+static int failures = 0;
+
+#define CHECK(cond) do { \
+    if(!(cond)) { printf("FAIL %s:%d: %s\n", __FILE__, __LINE__, #cond); failures++; } \
+} while(0)
+
+static const char* TEXT = "一丁七万丈三上下不与丐丑专且世";
+
+// 码位 -> 码位序号（不经过生成的绘制代码）
+static int codeIndex(uint32_t unicode) {
+#ifdef FONT_GB2312_16_DUP_COUNT
+    for(int i = 0; i < FONT_GB2312_16_DUP_COUNT; i++)
+        if(GB2312_16_DUP_INDEX[i] == unicode) return i;
+    return -1;
+#else
+    return unicode - FONT_GB2312_16_DUP_START;
+#endif
+}
+
+int main() {
+    MockTFT ref, dup;
+    Ref16.setTFT(&ref);
+    Dup16.setTFT(&dup);
+
+    // 缺字都是同一个 .notdef 方框，去重后字模数少于码位数
+#ifdef FONT_GB2312_16_DUP_COUNT
+    const int count = FONT_GB2312_16_DUP_COUNT;
+#else
+    const int count = FONT_GB2312_16_DUP_END - FONT_GB2312_16_DUP_START + 1;
+#endif
+#ifdef FONT_GB2312_16_DUP_GLYPHS
+    CHECK(FONT_GB2312_16_DUP_GLYPHS < count);
+    CHECK(sizeof(GB2312_16_DUP_GLYPH) / sizeof(GB2312_16_DUP_GLYPH[0]) == (size_t)count);
+    CHECK(sizeof(GB2312_16_DUP_FONT) == (size_t)FONT_GB2312_16_DUP_GLYPHS * FONT_GB2312_16_DUP_BYTES_PER_CHAR);
+#else
+    CHECK(!"没有生成去重映射表");
+#endif
+
+    // 经映射表查到的字模与不去重的库逐像素一致
+    Ref16.drawString(0, 0, TEXT, 0xFFFF);
+    Dup16.drawString(0, 0, TEXT, 0xFFFF);
+    CHECK(ref.litPixels() > 0);
+    CHECK(dup.sameAs(ref));
+
+    // 保留的缺字（U+4E06 丆、U+4E0F 丏，仿宋里没有）都是 .notdef，共用一个字模，画出来也一样
+#ifdef FONT_GB2312_16_DUP_GLYPHS
+    CHECK(codeIndex(0x4E06) >= 0 && codeIndex(0x4E0F) >= 0);
+    CHECK(GB2312_16_DUP_GLYPH[codeIndex(0x4E06)] == GB2312_16_DUP_GLYPH[codeIndex(0x4E0F)]);
+    CHECK(GB2312_16_DUP_GLYPH[codeIndex(0x4E00)] != GB2312_16_DUP_GLYPH[codeIndex(0x4E06)]);
+#endif
+    dup.clear();
+    Dup16.drawString(0, 0, "丆", 0xFFFF);
+    MockTFT other;
+    Dup16.setTFT(&other);
+    Dup16.drawString(0, 0, "丏", 0xFFFF);
+    CHECK(dup.sameAs(other));
+
+    printf("%s: %d failure(s)\n", failures ? "FAILED" : "OK", failures);
+    return failures ? 1 : 0;
+}
@@ -0,0 +1,124 @@
+// 主机端预览（preview_font.py）对照程序
+// 由 run_host_tests.py 生成各个库后编译运行：按场景文件逐行调用生成的 C++，每个场景的帧缓冲原样写进输出文件，
+// 再由 run_host_tests.py 用 preview_font.py 画同样的场景逐像素比较
+// 场景文件每行用制表符分隔：库名  屏幕底色  blit背景色  调用  整数参数(空格分隔，不含文本)  文本
+#include <stdio.h>
+#include <stdlib.h>
+#include <sstream>
+#include <string>
+#include <vector>
+#include "mock_fs.h"
+#include "mock_tft.h"
+#include "glcdfont.h"
+#include "GB2312_16_Ref.h"
+#include "GB2312_16_Bin.h"
+#include "GB2312_16_Zip.h"
+#include "GB2312_16_Span.h"
+#include "GB2312_16_Blit.h"
+#include "GB2312_40_Big.h"
+#include "GB2312_16_Dup.h"
+#include "GB2312_16_Tight.h"
+#include "GB2312_16_TightBlit.h"
+#include "GB2312_40_TightBig.h"
+#include "GB2312_16_Static.h"
+#include "GB2312_16_StaticBlit.h"
+
+// drawChar 按 TFT 库的经典 5x7 字体真正画出来（GLCD_FONT 由 run_host_tests.py 从 preview_font.py 写出）
+class PreviewTFT : public MockTFT {
+public:
+    void drawChar(int16_t x, int16_t y, unsigned char c, uint16_t color, uint16_t bg, uint8_t size) {
+        (void)size;
+        for(int i = 0; i < 5; i++) {
+            uint8_t line = (c >= 0x20 && c <= 0x7E) ? GLCD_FONT[(c - 0x20) * 5 + i] : 0;
+            for(int j = 0; j < 8; j++, line >>= 1) {
+                if(line & 1) drawPixel(x + i, y + j, color);
+                else if(bg != color) drawPixel(x + i, y + j, bg);
+            }
+        }
+        if(bg != color) {
+            for(int j = 0; j < 8; j++) drawPixel(x + 5, y + j, bg);
+        }
+    }
+};
+
+template<typename F>
+static void run(F& font, const std::string& call, const std::vector<int>& a, const char* text) {
+    if(call == "drawString") font.drawString(a[0], a[1], text, a[2]);
+    else if(call == "drawStringWrap") font.drawStringWrap(a[0], a[1], text, a[2], a[3], a[4]);
+    else if(call == "drawStringCenter") font.drawStringCenter(a[0], text, a[1], a[2]);
+    else if(call == "drawStringCenterWrap") font.drawStringCenterWrap(a[0], text, a[1], a[2], a[3], a[4]);
+}
+
+#define PLAIN(NAME, OBJ) if(lib == NAME) { OBJ.setTFT(&tft); run(OBJ, call, a, text.c_str()); continue; }
+#define BLIT(NAME, OBJ) if(lib == NAME) { OBJ.setTFT(&tft); OBJ.setBackground(bg); run(OBJ, call, a, text.c_str()); continue; }
+#define STATIC(NAME, OBJ, EXTRA) if(lib == NAME) { \
+    OBJ.setTFT(&tft); EXTRA; \
+    if(call == "drawStatic") OBJ.drawStatic(a[0], a[1], a[2], a[3]); else run(OBJ, call, a, text.c_str()); \
+    continue; }
+
+int main(int argc, char** argv) {
+    if(argc < 4) {
+        printf("usage: %s <GB2312_16_Bin.bin> <scenes.txt> <out.raw>\n", argv[0]);
+        return 2;
+    }
+    MockFS fs;
+    if(!fs.addFile("/GB2312_16_Bin.bin", argv[1]) || !Bin16.begin(fs)) {
+        printf("FAIL: cannot open %s\n", argv[1]);
+        return 1;
+    }
+    FILE* in = fopen(argv[2], "r");
+    FILE* out = fopen(argv[3], "wb");
+    if(!in || !out) {
+        printf("FAIL: cannot open %s / %s\n", argv[2], argv[3]);
+        return 1;
+    }
+
+    PreviewTFT tft;
+    char buf[4096];
+    int scenes = 0;
+    while(fgets(buf, sizeof(buf), in)) {
+        std::string line(buf);
+        if(!line.empty() && line[line.size() - 1] == '\n') line.erase(line.size() - 1);
+        std::vector<std::string> fields;
+        std::stringstream ss(line);
+        std::string field;
+        while(std::getline(ss, field, '\t')) fields.push_back(field);
+        if(fields.size() < 5) continue;
+        // 帧缓冲先填底色，blit 背景格和 drawChar 底色格才看得出来
+        std::string lib = fields[0];
+        uint16_t fill = (uint16_t)strtol(fields[1].c_str(), NULL, 0);
+        uint16_t bg = (uint16_t)strtol(fields[2].c_str(), NULL, 0);
+        std::string call = fields[3];
+        std::vector<int> a;
+        std::stringstream args(fields[4]);
+        int v;
+        while(args >> v) a.push_back(v);
+        std::string text = fields.size() > 5 ? fields[5] : "";
+        for(int y = 0; y < MockTFT::HEIGHT; y++)
+            for(int x = 0; x < MockTFT::WIDTH; x++) tft.fb[y][x] = fill;
+        scenes++;
+
+        // 各宏里的 continue 跳出 do-while(0)，接着写出帧缓冲
+        do {
+            PLAIN("Ref", Ref16);
+            PLAIN("Bin", Bin16);
+            PLAIN("Zip", Zip16);
+            PLAIN("Span", Span16);
+            BLIT("Blit", Blit16);
+            PLAIN("Big", Big40);
+            PLAIN("Dup", Dup16);
+            PLAIN("Tight", Tight16);
+            BLIT("TightBlit", TightBlit16);
+            PLAIN("TightBig", TightBig40);
+            STATIC("Static", Static16, (void)bg);
+            STATIC("StaticBlit", StaticBlit16, StaticBlit16.setBackground(bg));
+            printf("FAIL: unknown library %s\n", lib.c_str());
+            return 1;
+        } while(0);
+        fwrite(tft.fb, sizeof(tft.fb), 1, out);
+    }
+    fclose(in);
+    fclose(out);
+    printf("OK: %d scene(s)\n", scenes);
+    return 0;
+}
@@ -0,0 +1,89 @@
+// 绘制方式（--render pixel/span/blit）主机端测试，并打印各方式的调用次数和估算传输量
+// 由 run_host_tests.py 生成 GB2312_16_Ref（pixel）、GB2312_16_Span、GB2312_16_Blit、GB2312_40_Big（span）
+#include <stdio.h>
+#include "mock_tft.h"
+#include "GB2312_16_Ref.h"
+#include "GB2312_16_Span.h"
+#include "GB2312_16_Blit.h"
+#include "GB2312_40_Big.h"
+#include "GB2312_40_Big_font.c"
+
+static int failures = 0;
+
+#define CHECK(cond) do { \
+    if(!(cond)) { printf("FAIL %s:%d: %s\n", __FILE__, __LINE__, #cond); failures++; } \
+} while(0)
+
+static const char* TEXT = "一丁七万丈三上下不与丐丑专且世";
+
+static void report(const char* name, const MockTFT& t) {
+    printf("  %-6s drawPixel %5u  drawFastHLine %4u  pushImage %3u  估算传输 %6u 字节\n",
+           name, t.pixelCalls, t.hlineCalls, t.pushCalls, t.busBytes);
+}
+
+// 不经过生成的绘制代码，按字节逐位取点，作为40号字的参照
+static bool bigPixel(uint32_t unicode, int row, int col) {
+    uint32_t index = unicode - FONT_GB2312_40_BIG_START;
+#ifdef FONT_GB2312_40_BIG_COUNT
+    for(index = 0; index < FONT_GB2312_40_BIG_COUNT; index++)
+        if(GB2312_40_BIG_INDEX[index] == unicode) break;
+#endif
+#ifdef FONT_GB2312_40_BIG_GLYPHS
+    index = GB2312_40_BIG_GLYPH[index];
+#endif
+    const int bpr = FONT_GB2312_40_BIG_BYTES_PER_CHAR / 40;
+    int bit = col + bpr * 8 - 40;
+    return GB2312_40_BIG_FONT[index * FONT_GB2312_40_BIG_BYTES_PER_CHAR + row * bpr + bit / 8] & (0x80 >> (bit % 8));
+}
+
+int main() {
+    MockTFT ref, span, blit, big;
+    Ref16.setTFT(&ref);
+    Span16.setTFT(&span);
+    Blit16.setTFT(&blit);
+    Big40.setTFT(&big);
+
+    Ref16.drawString(0, 0, TEXT, 0xFFFF);
+    Span16.drawString(0, 0, TEXT, 0xFFFF);
+    Blit16.drawString(0, 0, TEXT, 0xFFFF);
+
+    // 水平线合并：结果一致，调用次数和传输量都更少
+    CHECK(ref.litPixels() > 0);
+    CHECK(span.sameAs(ref));
+    CHECK(span.pixelCalls == 0);
+    CHECK(span.hlineCalls < ref.pixelCalls);
+    CHECK(span.busBytes < ref.busBytes);
+
+    // 整字推送：背景为0时与逐点一致，每个字一次 pushImage（事务最少，但背景点也要传）
+    CHECK(blit.sameAs(ref));
+    CHECK(blit.pushCalls == 15);
+    CHECK(blit.drawCalls() < span.drawCalls());
+
+    printf("绘制 \"%s\"（16号）:\n", TEXT);
+    report("pixel", ref);
+    report("span", span);
+    report("blit", blit);
+
+    // 不透明背景：字框内非前景的点都是背景色
+    blit.clear();
+    Blit16.setBackground(0x1234);
+    Blit16.drawString(0, 0, TEXT, 0xFFFF);
+    CHECK(blit.countColor(0x1234) + blit.countColor(0xFFFF) == 15 * 16 * 16);
+    CHECK(blit.countColor(0xFFFF) == ref.countColor(0xFFFF));
+
+    // 40号每行5字节，最左几列也要画出来
+    const char* chars[] = {"一", "丁", "七", "上", "世"};
+    for(int i = 0; i < 5; i++) {
+        big.clear();
+        Big40.drawChinese(0, 0, chars[i], 0xFFFF);
+        uint32_t unicode = ((chars[i][0] & 0x0F) << 12) | ((chars[i][1] & 0x3F) << 6) | (chars[i][2] & 0x3F);
+        int mismatches = 0;
+        for(int row = 0; row < 40; row++)
+            for(int col = 0; col < 40; col++)
+                if((big.fb[row][col] != 0) != bigPixel(unicode, row, col)) mismatches++;
+        CHECK(mismatches == 0);
+    }
+
+    printf("%s: %d failure(s)\n", failures ? "FAILED" : "OK", failures);
+    return failures ? 1 : 0;
+}
@@ -0,0 +1,128 @@
+// 静态文本预渲染（--static / --static-scan）主机端测试
+// 由 run_host_tests.py 生成 Ref、Span、Tight、TightBlit 和带静态文本的 Static（span）、StaticBlit（tight+blit）后编译运行
+#include <stdio.h>
+#include "mock_tft.h"
+#include "GB2312_16_Ref.h"
+#include "GB2312_16_Span.h"
+#include "GB2312_16_Tight.h"
+#include "GB2312_16_TightBlit.h"
+#include "GB2312_16_Static.h"
+#include "GB2312_16_StaticBlit.h"
+#include "GB2312_16_Static_static.c"
+
+static int failures = 0;
+
+#define CHECK(cond) do { \
+    if(!(cond)) { printf("FAIL %s:%d: %s\n", __FILE__, __LINE__, #cond); failures++; } \
+} while(0)
+
+int main() {
+    MockTFT ref, span, tft;
+    Ref16.setTFT(&ref);
+    Span16.setTFT(&span);
+    Static16.setTFT(&tft);
+    int maxWidth = 64;
+    int lineHeight = 20;
+
+    // 文本表里的条目：drawStatic 与逐字绘制逐像素一致
+    Ref16.drawString(10, 20, "一丁七万", 0xFFFF);
+    Static16.drawStatic(Static16.TITLE, 10, 20, 0xFFFF);
+    CHECK(ref.litPixels() > 0);
+    CHECK(tft.sameAs(ref));
+
+    // 同样的文本和排版经 drawString* 调用时自动走位图
+    tft.clear();
+    Static16.drawString(10, 20, "一丁七万", 0xFFFF);
+    CHECK(tft.sameAs(ref));
+
+    // 居中+换行：每行按 centerX 居中
+    ref.clear();
+    tft.clear();
+    Ref16.drawStringCenterWrap(40, "丈三上下不与丐丑专且世", 0xFFFF, 120, 40, 20);
+    Static16.drawStatic(Static16.HINT, 120, 40, 0xFFFF);
+    CHECK(ref.litPixels() > 0);
+    CHECK(tft.sameAs(ref));
+    tft.clear();
+    Static16.drawStringCenterWrap(40, "丈三上下不与丐丑专且世", 0xFFFF, 120, 40, 20);
+    CHECK(tft.sameAs(ref));
+
+    // 超过 50 行的换行文本：与逐字绘制一样只画前 50 行
+    ref.clear();
+    tft.clear();
+    Ref16.drawStringWrap(0, 0, "一丁七万丈三上下不与一丁七万丈三上下不与一丁七万丈三上下不与一丁七万丈三上下不与一丁七万丈三上下不与一丁七万丈三上下不与", 0xFFFF, 16, 4);
+    Static16.drawStatic(Static16.LONG, 0, 0, 0xFFFF);
+    CHECK(ref.litPixels() > 0);
+    CHECK(tft.sameAs(ref));
+
+    // 排版参数不同时不是同一条静态文本，照常逐字绘制
+    ref.clear();
+    tft.clear();
+    Ref16.drawStringCenterWrap(40, "丈三上下不与丐丑专且世", 0xFFFF, 120, 60, lineHeight);
+    Static16.drawStringCenterWrap(40, "丈三上下不与丐丑专且世", 0xFFFF, 120, 60, lineHeight);
+    CHECK(tft.sameAs(ref));
+
+    // 预渲染时字库外的全角逗号也会画出来
+    ref.clear();
+    tft.clear();
+    Ref16.drawString(0, 0, "一，丁", 0xFFFF);
+    Static16.drawString(0, 0, "一，丁", 0xFFFF);
+    CHECK(tft.litPixels() > ref.litPixels());
+
+    // 源码里的字面量调用（--static-scan 扫描本文件）；排版参数是变量的调用不预渲染
+    ref.clear();
+    span.clear();
+    tft.clear();
+    Ref16.drawStringCenterWrap(100, "丈三上下不与", 0xFFFF, 120, 48, 18);
+    Span16.drawStringCenterWrap(100, "丈三上下不与", 0xFFFF, 120, 48, 18);
+    Static16.drawStringCenterWrap(100, "丈三上下不与", 0xFFFF, 120, 48, 18);
+    CHECK(tft.sameAs(ref));
+    CHECK(tft.hlineCalls <= span.hlineCalls);
+    Static16.drawStringWrap(0, 200, "三上下", 0xFFFF, maxWidth);
+    // TITLE、HINT、COMMA、LONG 加上扫描到的一条；与 TITLE 相同的 drawString 不重复，其它小节的条目不收录
+    CHECK(GB2312_16_STATIC_STATIC_COUNT == 5);
+
+    // tight+blit：含 ASCII 的文本，一行字格连成一段，按缓冲区大小分条推送
+    // （80x16 的字格段超过 1024 点的缓冲区，分两条，仍少于逐字推送的 8 次）
+    MockTFT tight, blit;
+    Tight16.setTFT(&tight);
+    StaticBlit16.setTFT(&blit);
+    Tight16.drawStringWrap(0, 0, "Hello 世丘", 0xFFFF, 100);
+    StaticBlit16.drawStatic(StaticBlit16.LABEL, 0, 0, 0xFFFF);
+    CHECK(tight.litPixels() > 0);
+    CHECK(blit.sameAs(tight));
+    CHECK(blit.pushCalls == 2);
+    blit.clear();
+    StaticBlit16.drawStringWrap(0, 0, "Hello 世丘", 0xFFFF, 100);
+    CHECK(blit.sameAs(tight));
+    CHECK(blit.pushCalls == 2);
+
+    // blit 的背景与逐字 blit 一致：每个字格（步进宽 x 字号高）都填背景色，不只是墨迹框
+    MockTFT cells;
+    uint16_t bg = 0x18E3;
+    TightBlit16.setTFT(&cells);
+    TightBlit16.setBackground(bg);
+    StaticBlit16.setBackground(bg);
+    blit.clear();
+    TightBlit16.drawStringWrap(0, 0, "Hello 世丘", 0xFFFF, 100);
+    StaticBlit16.drawStatic(StaticBlit16.LABEL, 0, 0, 0xFFFF);
+    CHECK(cells.countColor(bg) > 0);
+    CHECK(blit.countColor(bg) == cells.countColor(bg));
+    CHECK(blit.sameAs(cells));
+    // 居中换行的多行文本：每行一段字格
+    cells.clear();
+    blit.clear();
+    TightBlit16.drawStringCenterWrap(40, "丈三上下不与丐丑专且世", 0xFFFF, 120, 40, 20);
+    StaticBlit16.drawStatic(StaticBlit16.HINT, 120, 40, 0xFFFF);
+    CHECK(cells.countColor(bg) > 0);
+    CHECK(blit.countColor(bg) == cells.countColor(bg));
+    CHECK(blit.sameAs(cells));
+    // 超过 50 行的部分不画
+    cells.clear();
+    blit.clear();
+    TightBlit16.drawStringWrap(0, 0, "一丁七万丈三上下不与一丁七万丈三上下不与一丁七万丈三上下不与一丁七万丈三上下不与一丁七万丈三上下不与一丁七万丈三上下不与", 0xFFFF, 16, 4);
+    StaticBlit16.drawStatic(StaticBlit16.LONG, 0, 0, 0xFFFF);
+    CHECK(blit.sameAs(cells));
+
+    printf("%s: %d failure(s)\n", failures ? "FAILED" : "OK", failures);
+    return failures ? 1 : 0;
+}
@@ -0,0 +1,79 @@
+// 紧凑存储（--tight）主机端测试
+// 由 run_host_tests.py 生成整格存储的 Ref/Blit/Big 和紧凑存储的 Tight/TightBlit/TightBig 后编译运行
+#include <stdio.h>
+#include "mock_tft.h"
+#include "GB2312_16_Ref.h"
+#include "GB2312_16_Blit.h"
+#include "GB2312_40_Big.h"
+#include "GB2312_16_Tight.h"
+#include "GB2312_16_TightBlit.h"
+#include "GB2312_40_TightBig.h"
+#include "GB2312_16_Tight_font.c"
+
+static int failures = 0;
+
+#define CHECK(cond) do { \
+    if(!(cond)) { printf("FAIL %s:%d: %s\n", __FILE__, __LINE__, #cond); failures++; } \
+} while(0)
+
+static const char* TEXT = "一丁七万丈三上下不与丐丑专且世";
+static const char* LONG_TEXT =
+    "一丁七万丈三上下不与丐丑专且世丘丙业丛东丝丞丢两严丧个中丰串临丸丹为主丽举乃久么义之乌乍乎乏乐";
+
+int main() {
+    MockTFT ref, tight;
+    Ref16.setTFT(&ref);
+    Tight16.setTFT(&tight);
+
+    // 汉字按墨迹框+偏移绘制，与整格存储逐像素一致，且扫描的点更少也不多画
+    Ref16.drawString(0, 0, TEXT, 0xFFFF);
+    Tight16.drawString(0, 0, TEXT, 0xFFFF);
+    CHECK(ref.litPixels() > 0);
+    CHECK(tight.sameAs(ref));
+    CHECK(tight.pixelCalls == ref.pixelCalls);
+
+    ref.clear();
+    tight.clear();
+    Ref16.drawStringWrap(0, 0, LONG_TEXT, 0xFFFF, 100);
+    Tight16.drawStringWrap(0, 0, LONG_TEXT, 0xFFFF, 100);
+    CHECK(tight.sameAs(ref));
+
+    // 汉字步进仍是字号；ASCII 用字体自身的步进宽度，由字形绘制而不是 TFT 的 6 像素字体
+    CHECK(Tight16.getStringWidth("一丁") == 32);
+    CHECK(Tight16.getStringWidth("ab") == GB2312_16_TIGHT_ADVANCE['a' - 0x20] + GB2312_16_TIGHT_ADVANCE['b' - 0x20]);
+    tight.clear();
+    Tight16.drawString(0, 0, "Hello, ESP32", 0xFFFF);
+    CHECK(tight.litPixels() > 0);
+    CHECK(tight.charCalls == 0);
+
+    // 裁剪后的点阵比整格小
+#ifdef FONT_GB2312_16_TIGHT_COUNT
+    const unsigned count = FONT_GB2312_16_TIGHT_COUNT;
+#else
+    const unsigned count = FONT_GB2312_16_TIGHT_END - FONT_GB2312_16_TIGHT_START + 1;
+#endif
+    CHECK(sizeof(GB2312_16_TIGHT_FONT) < count * FONT_GB2312_16_TIGHT_BYTES_PER_CHAR);
+
+    // blit：整个字格填背景色，与整格存储一致
+    MockTFT blit, tightBlit;
+    Blit16.setTFT(&blit);
+    TightBlit16.setTFT(&tightBlit);
+    Blit16.setBackground(0x1234);
+    TightBlit16.setBackground(0x1234);
+    Blit16.drawString(0, 0, TEXT, 0xFFFF);
+    TightBlit16.drawString(0, 0, TEXT, 0xFFFF);
+    CHECK(tightBlit.sameAs(blit));
+    CHECK(tightBlit.pushCalls == blit.pushCalls);
+
+    // 40号（span）
+    MockTFT big, tightBig;
+    Big40.setTFT(&big);
+    TightBig40.setTFT(&tightBig);
+    Big40.drawStringWrap(0, 0, LONG_TEXT, 0xFFFF, 240);
+    TightBig40.drawStringWrap(0, 0, LONG_TEXT, 0xFFFF, 240);
+    CHECK(big.litPixels() > 0);
+    CHECK(tightBig.sameAs(big));
+
+    printf("%s: %d failure(s)\n", failures ? "FAILED" : "OK", failures);
+    return failures ? 1 : 0;
+}
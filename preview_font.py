@@ -0,0 +1,743 @@
+"""
+主机端预览：不烧录固件，直接在电脑上把生成的字库按固件的排版画成 PNG
+
+读取生成的库目录（src/*_font.c 数组、data/*.bin 外部字库）或字形缓存文件（.font_cache/*.bin），
+字模按原样的字节布局放进 NumPy 数组（.bin 用 np.memmap 映射，不整个读入），按需解包成点阵图集。
+drawString / drawStringWrap / drawStringCenter / drawStringCenterWrap 逐字节照搬生成的 C++：
+UTF-8 只认三字节汉字、ASCII 宽度（整格库 6，--tight 库查步进表）、换行规则、最多 50 行、
+居中的整数除法、blit 模式的背景格、--static 预渲染文本的查找，都与固件一致，输出与主机端模拟 TFT 逐像素相同。
+
+同一段文本、同一组排版参数只排版一次，记下相对坐标和每个点的类型（前景/背景格），
+之后每次绘制只是一次向量化的坐标平移和赋值，一张界面草图通常在 0.1 毫秒量级。
+
+整格库的 ASCII 在固件里由 TFT 库的 drawChar 绘制（经典 5x7 点阵，6x8 的格子底色为 0），
+这里用同一套 5x7 点阵模拟；0x20 以下的控制字符只画底色格。
+
+用法:
+  python preview_font.py lib/GB2312_16_FangSong "你好，世界" -o out.png
+  python preview_font.py lib/GB2312_16_FangSong "很长的一段文本" --wrap 200 --center 120 -o out.png
+  python preview_font.py lib/GB2312_16_FangSong --scene screen.json -o out.png --scale 2
+  python preview_font.py .font_cache/xxxx_16_v1.bin --sheet atlas.png
+  python preview_font.py lib/GB2312_16_FangSong "你好" --bench 5000
+
+场景文件（--scene）是 JSON，draws 里每一项照抄固件里的调用，可以混用多个字库:
+  {"width": 240, "height": 240, "fill": 0,
+   "draws": [["drawStringCenterWrap", 40, "文本", 65535, 120, 200, 20],
+             {"font": "lib/GB2312_24_FangSong", "call": ["drawString", 0, 0, "标题", 63488]},
+             ["setBackground", 31], ["drawStatic", "TITLE", 10, 20, 65535]]}
+"""
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from generate_font import (ASCII_FIRST, ASCII_LAST, BIN_FLAG_INDEX, BIN_HEADER, BIN_MAGIC, CACHE_HEADER,
+                           CACHE_MAGIC, COMPRESS_BLOCK, STATIC_MODES, FontGenerator, decompress_glyph)
+
+# 经典 5x7 点阵（Adafruit GFX / TFT_eSPI 的 glcdfont），0x20..0x7E，每字 5 列，列内低位在上
+GLCD_FONT = bytes.fromhex(
+    '0000000000 00005F0000 0007000700 147F147F14 242A7F2A12 2313086462 3649562050 0008070300'
+    '001C224100 0041221C00 2A1C7F1C2A 08083E0808 0080703000 0808080808 0000606000 2010080402'
+    '3E5149453E 00427F4000 7249494946 2141494D33 1814127F10 2745454539 3C4A494931 4121110907'
+    '3649494936 464949291E 0000140000 0040340000 0008142241 1414141414 0041221408 0201590906'
+    '3E415D594E 7C1211127C 7F49494936 3E41414122 7F4141413E 7F49494941 7F09090901 3E41415173'
+    '7F0808087F 00417F4100 2040413F01 7F08142241 7F40404040 7F021C027F 7F0408107F 3E4141413E'
+    '7F09090906 3E4151215E 7F09192946 2649494932 03017F0103 3F4040403F 1F2040201F 3F4038403F'
+    '6314081463 0304780403 6159494D43 007F414141 0204081020 004141417F 0402010204 4040404040'
+    '0003070800 2054547840 7F28444438 3844444428 384444287F 3854545418 00087E0902 18A4A49C78'
+    '7F08040478 00447D4000 2040403D00 7F10284400 00417F4000 7C04780478 7C08040478 3844444438'
+    'FC18242418 18242418FC 7C08040408 4854545424 04043F4424 3C4040207C 1C2040201C 3C4030403C'
+    '4428102844 4C9090907C 4464544C44 0008364100 0000770000 0041360800 0201020402'
+)
+
+# 排版结果里每个点的类型：前景色、blit 背景色（setBackground）、drawChar 底色（固定为 0）
+INK = 1
+BLIT_BG = 2
+CHAR_BG = 3
+
+# 固件 drawStringWrap / drawStringCenterWrap 的最多行数
+MAX_LINES = 50
+
+_ARRAY_RE = re.compile(r'const\s+(?:\w+\s+)*(\w+)\[\]\s*=\s*\{(.*?)\};', re.S)
+_DEFINE_RE = re.compile(r'^#define\s+(\w+)\s+(\S+)', re.M)
+
+def _strip_comments(text):
+    return re.sub(r'//[^\n]*', '', text)
+
+def _parse_arrays(text):
+    """C 源码里的 const 数组 -> {名字: 元素文本}（先去掉行尾注释）"""
+    return {name: body for name, body in _ARRAY_RE.findall(_strip_comments(text))}
+
+def _hex_bytes(body):
+    """'0xAB,0xCD,...' -> bytes，整段一次转换"""
+    return bytes.fromhex(re.sub(r'[^0-9A-Fa-f]', '', body.replace('0x', '')))
+
+def _int_array(body, dtype):
+    return np.array([int(v, 0) for v in body.split(',') if v.strip()], dtype=dtype)
+
+def _c_strings(text, name):
+    """读出 const char* 数组里的字符串字面量（c_string 的逆过程），返回 UTF-8 字节串列表"""
+    start = text.find(f'{name}[] = {{')
+    if start < 0:
+        return []
+    end = text.find('};', start)
+    out = []
+    for literal in re.findall(r'"((?:[^"\\\n]|\\.)*)"', text[start:end]):
+        raw = literal.encode('utf-8')
+        raw = re.sub(rb'\\([0-7]{3})', lambda m: bytes([int(m.group(1), 8)]), raw)
+        out.append(re.sub(rb'\\(.)', rb'\1', raw))
+    return out
+
+class FontPreview:
+    """
+    一个生成好的字库，在主机上按固件的排版绘制到 RGB565 帧缓冲（uint16 的二维 NumPy 数组）
+
+    用 FontPreview.load(路径) 打开：库目录、src/*_font.c、data/*.bin 外部字库或字形缓存文件。
+    绘制接口与生成的 C++ 同名同参数（多一个帧缓冲参数），颜色是 RGB565。
+    """
+
+    def __init__(self, size, name=''):
+        self.size = size
+        self.name = name
+        self.bytes_per_row = FontGenerator().font_configs[size][0]
+        self.storage = 'cell'       # 'cell' 整格 / 'zip' 压缩 / 'tight' 紧凑
+        self.font = None            # 字模字节（np.uint8，可能是 memmap）
+        self.start = 0
+        self.end = -1
+        self.index = None           # 升序码位表；None 表示码位连续，直接定位
+        self.glyph_map = None       # 去重后码位序号 -> 字模序号
+        self.offsets = None         # 压缩/紧凑存储时每个字形的起始位置
+        self.metrics = None         # 紧凑存储的 x, y, w, h
+        self.advance = None         # 紧凑存储的 ASCII 步进宽度
+        self.ascii_count = 0        # 紧凑存储里排在汉字前面的 ASCII 字形数
+        self.blit = False
+        self.background = 0
+        self.statics = {}           # (排版方式, 文本, maxWidth, lineHeight) -> 静态文本序号
+        self.static_names = {}      # enum StaticText 名字 -> 序号
+        self.static_boxes = None
+        self.static_offsets = None
+        self.static_data = None
+        self.static_runs = None       # blit 模式每条静态文本的字格段 (x, y, w, h)，相对位图框
+        self.static_run_start = None
+        self._glyphs = {}
+        self._layouts = {}
+
+    # ---------------- 读取 ----------------
+
+    @classmethod
+    def load(cls, path):
+        """按路径类型打开字库：库目录、_font.c、外部字库 .bin 或字形缓存 .bin"""
+        if os.path.isdir(path):
+            lib = os.path.basename(os.path.normpath(path))
+            font_c = os.path.join(path, 'src', f'{lib}_font.c')
+            if os.path.exists(font_c):
+                return cls._from_library(font_c)
+            bin_path = os.path.join(path, 'data', f'{lib}.bin')
+            if os.path.exists(bin_path):
+                return cls._from_bin(bin_path, os.path.join(path, 'src', f'{lib}.cpp'))
+            raise ValueError(f"{path} 里没有 src/{lib}_font.c 或 data/{lib}.bin")
+        if path.endswith('_font.c'):
+            return cls._from_library(path)
+        with open(path, 'rb') as f:
+            magic = f.read(4)
+        if magic == BIN_MAGIC:
+            lib = os.path.splitext(os.path.basename(path))[0]
+            cpp = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(path))), 'src', f'{lib}.cpp')
+            return cls._from_bin(path, cpp)
+        if magic == CACHE_MAGIC:
+            return cls._from_cache(path)
+        raise ValueError(f"无法识别的字库文件: {path}")
+
+    @classmethod
+    def _from_library(cls, font_c):
+        """解析 _font.c（以及同目录的 .cpp、.h、_static.c）"""
+        src = os.path.dirname(os.path.abspath(font_c))
+        lib = os.path.basename(font_c)[:-len('_font.c')]
+        upper = lib.upper()
+        with open(font_c, encoding='utf-8') as f:
+            text = f.read()
+        arrays = _parse_arrays(text)
+        defines = {k: int(v, 0) for k, v in _DEFINE_RE.findall(text)}
+
+        font = cls(defines[f'FONT_{upper}_SIZE'], lib)
+        font.font = np.frombuffer(_hex_bytes(arrays[f'{upper}_FONT']), dtype=np.uint8)
+        font.start = defines[f'FONT_{upper}_START']
+        font.end = defines[f'FONT_{upper}_END']
+        if f'{upper}_INDEX' in arrays:
+            font.index = _int_array(arrays[f'{upper}_INDEX'], np.uint32)
+        if f'{upper}_GLYPH' in arrays:
+            font.glyph_map = _int_array(arrays[f'{upper}_GLYPH'], np.uint32)
+
+        if f'{upper}_METRICS' in arrays:
+            font.storage = 'tight'
+            font.metrics = _int_array(arrays[f'{upper}_METRICS'], np.int8).reshape(-1, 4).astype(np.int32)
+            font.advance = _int_array(arrays[f'{upper}_ADVANCE'], np.int32)
+            font.ascii_count = defines[f'FONT_{upper}_ASCII']
+            # 与 drawGlyph 一样：块起始位置 + 块内前面各字的字节数
+            sizes = (font.metrics[:, 2] * font.metrics[:, 3] + 7) >> 3
+            font.offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+        elif f'{upper}_OFFSETS' in arrays:
+            font.storage = 'zip'
+            blocks = _int_array(arrays[f'{upper}_BLOCKS'], np.int64)
+            rel = _int_array(arrays[f'{upper}_OFFSETS'], np.int64)
+            font.offsets = blocks[np.arange(len(rel)) // COMPRESS_BLOCK] + rel
+        else:
+            font.font = font.font.reshape(-1, font.bytes_per_row * font.size)
+
+        cpp = os.path.join(src, f'{lib}.cpp')
+        font.blit = os.path.exists(cpp) and '_pushImage(' in open(cpp, encoding='utf-8').read()
+        static_c = os.path.join(src, f'{lib}_static.c')
+        if os.path.exists(static_c):
+            font._load_static(static_c, os.path.join(src, f'{lib}.h'), upper)
+        return font
+
+    @classmethod
+    def _from_bin(cls, path, cpp=None):
+        """外部二进制字库（--format bin）：文件头 + 码位表 + 字模，字模部分直接映射"""
+        mm = np.memmap(path, dtype=np.uint8, mode='r')
+        (magic, version, header_size, size, bytes_per_row, height, flags, count,
+         first, last, index_offset, glyph_offset) = BIN_HEADER.unpack_from(mm[:BIN_HEADER.size].tobytes())
+        font = cls(size, os.path.splitext(os.path.basename(path))[0])
+        bytes_per_char = bytes_per_row * height
+        font.font = mm[glyph_offset:glyph_offset + count * bytes_per_char].reshape(count, bytes_per_char)
+        font.start, font.end = first, last
+        if flags & BIN_FLAG_INDEX:
+            font.index = mm[index_offset:index_offset + 2 * count].view('<u2').astype(np.uint32)
+        font.blit = bool(cpp) and os.path.exists(cpp) and '_pushImage(' in open(cpp, encoding='utf-8').read()
+        return font
+
+    @classmethod
+    def _from_cache(cls, path):
+        """字形缓存文件：文件头 + 升序码位表(uint32) + 整格字模，整个文件映射"""
+        mm = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, fmt, size, bytes_per_char, count = CACHE_HEADER.unpack_from(mm[:CACHE_HEADER.size].tobytes())
+        font = cls(size, os.path.basename(path))
+        codes_end = CACHE_HEADER.size + 4 * count
+        font.index = mm[CACHE_HEADER.size:codes_end].view('<u4')
+        font.font = mm[codes_end:codes_end + count * bytes_per_char].reshape(count, bytes_per_char)
+        if count:
+            font.start, font.end = int(font.index[0]), int(font.index[-1])
+        return font
+
+    def _load_static(self, static_c, header, upper):
+        with open(static_c, encoding='utf-8') as f:
+            text = f.read()
+        arrays = _parse_arrays(text)
+        self.static_data = np.frombuffer(_hex_bytes(arrays[f'{upper}_STATIC']), dtype=np.uint8)
+        self.static_offsets = _int_array(arrays[f'{upper}_STATIC_OFFSET'], np.int64)
+        self.static_boxes = _int_array(arrays[f'{upper}_STATIC_BOX'], np.int32).reshape(-1, 4)
+        if f'{upper}_STATIC_RUNS' in arrays:
+            self.static_runs = _int_array(arrays[f'{upper}_STATIC_RUNS'], np.int32).reshape(-1, 4)
+            self.static_run_start = _int_array(arrays[f'{upper}_STATIC_RUN_START'], np.int64)
+        keys = _int_array(arrays[f'{upper}_STATIC_KEY'], np.int32).reshape(-1, 3)
+        for i, text_bytes in enumerate(_c_strings(text, f'{upper}_STATIC_TEXT')):
+            mode, width, line = (int(v) for v in keys[i])
+            self.statics.setdefault((mode, text_bytes, width, line), i)
+        if os.path.exists(header):
+            with open(header, encoding='utf-8') as f:
+                enum = re.search(r'enum StaticText \{(.*?)\};', f.read(), re.S)
+            if enum:
+                self.static_names = {k: int(v) for k, v in re.findall(r'(\w+) = (\d+)', enum.group(1))}
+
+    # ---------------- 字形 ----------------
+
+    @property
+    def glyph_count(self):
+        if self.storage == 'cell':
+            return len(self.font)
+        return len(self.offsets)
+
+    def _slot(self, unicode):
+        """码位 -> 字形序号，字库里没有返回 -1（与生成的 drawChinese 的查找一致）"""
+        if unicode < self.start or unicode > self.end:
+            return -1
+        if self.index is not None:
+            pos = int(np.searchsorted(self.index, unicode))
+            if pos >= len(self.index) or self.index[pos] != unicode:
+                return -1
+        else:
+            pos = unicode - self.start
+        if self.glyph_map is not None:
+            pos = int(self.glyph_map[pos])
+        return self.ascii_count + pos
+
+    def glyph(self, slot):
+        """字形序号 -> (x, y, 点阵)，点阵是 h x w 的 bool 数组；整格字模 x=y=0、w=h=字号"""
+        cached = self._glyphs.get(slot)
+        if cached is not None:
+            return cached
+        size, bpr = self.size, self.bytes_per_row
+        if self.storage == 'tight':
+            x, y, w, h = (int(v) for v in self.metrics[slot])
+            start = int(self.offsets[slot])
+            bits = np.unpackbits(self.font[start:start + (w * h + 7) // 8])[:w * h]
+            cached = (x, y, bits.reshape(h, w).astype(bool))
+        else:
+            if self.storage == 'zip':
+                # 压缩后不会比 3 倍整格更长，截一段交给 decompress_glyph
+                start = int(self.offsets[slot])
+                raw = decompress_glyph(self.font[start:start + 3 * bpr * size + 8].tobytes(), bpr, size)
+                data = np.frombuffer(raw, dtype=np.uint8)
+            else:
+                data = self.font[slot]
+            rows = np.unpackbits(data.reshape(size, bpr), axis=1)[:, bpr * 8 - size:]
+            cached = (0, 0, rows.astype(bool))
+        self._glyphs[slot] = cached
+        return cached
+
+    def atlas(self):
+        """全部字形解包成 (字形数, 字号, 字号) 的 bool 图集；紧凑存储按度量放回整格位置"""
+        size = self.size
+        if self.storage == 'cell':
+            bits = np.unpackbits(np.asarray(self.font).reshape(-1, size, self.bytes_per_row), axis=2)
+            return bits[:, :, self.bytes_per_row * 8 - size:].astype(bool)
+        out = np.zeros((self.glyph_count, size, size), dtype=bool)
+        for slot in range(self.glyph_count):
+            x, y, bits = self.glyph(slot)
+            _paste(out[slot], x, y, bits, bits)
+        return out
+
+    def save_sheet(self, path, columns=64):
+        """图集导出成一张 PNG（白字黑底，按字形序号逐行排列）"""
+        atlas = self.atlas()
+        count, size = len(atlas), self.size
+        rows = max(1, (count + columns - 1) // columns)
+        sheet = np.zeros((rows * size, columns * size), dtype=np.uint8)
+        for slot in range(count):
+            r, c = divmod(slot, columns)
+            sheet[r * size:(r + 1) * size, c * size:(c + 1) * size] = atlas[slot] * 255
+        Image.fromarray(sheet, 'L').save(path)
+        return count
+
+    # ---------------- 排版（逐字节照搬生成的 C++） ----------------
+
+    def _ascii_width(self, c):
+        if self.storage != 'tight':
+            return 6
+        if c < ASCII_FIRST or c > ASCII_LAST:
+            return 0
+        return int(self.advance[c - ASCII_FIRST])
+
+    def _char_at(self, s, i):
+        """与固件的 UTF-8 处理一致：返回 (宽度, 字节数)，跳过的字节宽度为 None"""
+        c = s[i]
+        if c < 0x80:
+            return self._ascii_width(c), 1
+        if (c & 0xF0) == 0xE0:
+            if i + 2 < len(s):
+                return self.size, 3
+        return None, 1
+
+    def _put_char(self, ops, x, y, s, i):
+        c = s[i]
+        if c < 0x80:
+            ops.append(('ascii', x, y, c))
+        else:
+            unicode = ((c & 0x0F) << 12) | ((s[i + 1] & 0x3F) << 6) | (s[i + 2] & 0x3F)
+            slot = self._slot(unicode)
+            if slot >= 0:
+                ops.append(('glyph', x, y, slot))
+
+    def _find_static(self, s, mode, max_width=0, line_height=0):
+        return self.statics.get((mode, s, max_width, line_height), -1)
+
+    def _layout_string(self, s, x=0, y=0, ops=None):
+        ops = [] if ops is None else ops
+        i = 0
+        while i < len(s):
+            width, n = self._char_at(s, i)
+            if width is not None:
+                self._put_char(ops, x, y, s, i)
+                x += width
+            i += n
+        return ops
+
+    def get_string_width(self, text):
+        s = _c_bytes(text)
+        width = 0
+        i = 0
+        while i < len(s):
+            w, n = self._char_at(s, i)
+            width += w or 0
+            i += n
+        return width
+
+    def _layout(self, kind, s, a=0, b=0):
+        """排版一次，结果按 (方式, 文本, 参数) 缓存；坐标相对于调用时的 x（或 centerX）和 y"""
+        key = (kind, s, a, b)
+        layout = self._layouts.get(key)
+        if layout is not None:
+            return layout
+        ops = []
+        if kind == 'static':
+            ops.append(('static', 0, 0, a))
+        elif kind == 'string':
+            sid = self._find_static(s, STATIC_MODES.index('string'))
+            if sid >= 0:
+                ops.append(('static', 0, 0, sid))
+            else:
+                self._layout_string(s, 0, 0, ops)
+        elif kind == 'center':
+            sid = self._find_static(s, STATIC_MODES.index('center'))
+            if sid >= 0:
+                ops.append(('static', 0, 0, sid))
+            else:
+                self._layout_string(s, -(self.get_string_width(s) // 2), 0, ops)
+        elif kind == 'wrap':
+            sid = self._find_static(s, STATIC_MODES.index('wrap'), a, b)
+            if sid >= 0:
+                ops.append(('static', 0, 0, sid))
+            else:
+                self._layout_wrap(s, a, b, ops)
+        else:
+            sid = self._find_static(s, STATIC_MODES.index('center_wrap'), a, b)
+            if sid >= 0:
+                ops.append(('static', 0, 0, sid))
+            else:
+                self._layout_center_wrap(s, a, b, ops)
+        layout = self._compose(ops)
+        self._layouts[key] = layout
+        return layout
+
+    def _layout_wrap(self, s, max_width, line_height, ops):
+        cur_x = cur_y = 0
+        line_width = 0
+        line_count = 0
+        i = 0
+        while i < len(s) and line_count < MAX_LINES:
+            width, n = self._char_at(s, i)
+            if width is None:
+                i += 1
+                continue
+            # 像素有余数直接舍去，把当前字换到下一行
+            if line_width + width > max_width and line_width > 0:
+                cur_x = 0
+                cur_y += line_height
+                line_width = 0
+                line_count += 1
+                if line_count >= MAX_LINES:
+                    break
+            self._put_char(ops, cur_x, cur_y, s, i)
+            cur_x += width
+            line_width += width
+            i += n
+
+    def _layout_center_wrap(self, s, max_width, line_height, ops):
+        # 第一遍：分行
+        lines = []
+        line_width = 0
+        line_start = 0
+        i = 0
+        while i < len(s) and len(lines) < MAX_LINES:
+            width, n = self._char_at(s, i)
+            if width is None:
+                i += 1
+                continue
+            if line_width + width > max_width and line_width > 0:
+                lines.append((line_start, line_width))
+                line_start = i
+                line_width = width
+            else:
+                line_width += width
+            i += n
+        if len(lines) < MAX_LINES and line_width > 0:
+            lines.append((line_start, line_width))
+
+        # 第二遍：每行按 centerX 居中，画满该行宽度为止
+        for line, (idx, width) in enumerate(lines):
+            cur_x = -(width // 2)
+            y = line * line_height
+            drawn = 0
+            while idx < len(s) and drawn < width:
+                w, n = self._char_at(s, idx)
+                if w is not None:
+                    self._put_char(ops, cur_x, y, s, idx)
+                    cur_x += w
+                    drawn += w
+                idx += n
+
+    def _compose(self, ops):
+        """
+        按绘制顺序把各个字叠到一块局部画布上，得到 (行, 列, 类型, 外框)
+
+        后画的字覆盖先画的（blit 的背景格、drawChar 的底色格会盖掉前一个字伸进来的墨迹），
+        与 TFT 上逐次绘制的结果一致。
+        """
+        pieces = []
+        size = self.size
+        for op, x, y, arg in ops:
+            if op == 'ascii' and self.storage != 'tight':
+                cell = np.full((8, 6), CHAR_BG, dtype=np.uint8)
+                if ASCII_FIRST <= arg <= ASCII_LAST:
+                    cols = np.frombuffer(GLCD_FONT, dtype=np.uint8)[(arg - ASCII_FIRST) * 5:(arg - ASCII_FIRST + 1) * 5]
+                    bits = np.unpackbits(cols[:, None], axis=1, bitorder='little').T.astype(bool)
+                    cell[:, :5][bits] = INK
+                pieces.append((x, y, cell))
+                continue
+            if op == 'ascii':
+                if arg < ASCII_FIRST or arg > ASCII_LAST:
+                    continue
+                op, arg = 'glyph', arg - ASCII_FIRST
+            if op == 'static':
+                dx, dy, w, h = (int(v) for v in self.static_boxes[arg])
+                if w <= 0:
+                    continue
+                start = int(self.static_offsets[arg])
+                bits = np.unpackbits(self.static_data[start:start + (w * h + 7) // 8])[:w * h]
+                bits = bits.reshape(h, w).astype(bool)
+                x, y = x + dx, y + dy
+                if self.blit and self.static_runs is not None:
+                    # 与 drawStatic 一样逐个字格段推送，背景只画在字格里
+                    for rx, ry, rw, rh in self.static_runs[self.static_run_start[arg]:self.static_run_start[arg + 1]]:
+                        run = bits[ry:ry + rh, rx:rx + rw]
+                        pieces.append((x + int(rx), y + int(ry), np.where(run, INK, BLIT_BG).astype(np.uint8)))
+                    continue
+            elif self.storage == 'tight':
+                gx, gy, bits = self.glyph(arg)
+                if self.blit:
+                    # 整个字格（步进宽 x 字号高）填背景色，字格外的墨迹不画
+                    cell_w = int(self.advance[arg]) if arg < self.ascii_count else size
+                    cell_w = min(cell_w, size)
+                    if cell_w <= 0:
+                        continue
+                    cell = np.full((size, cell_w), BLIT_BG, dtype=np.uint8)
+                    _paste(cell, gx, gy, bits, INK)
+                    pieces.append((x, y, cell))
+                    continue
+                x, y = x + gx, y + gy
+            else:
+                bits = self.glyph(arg)[2]
+            if self.blit:
+                pieces.append((x, y, np.where(bits, INK, BLIT_BG).astype(np.uint8)))
+            else:
+                pieces.append((x, y, bits.astype(np.uint8) * INK))
+
+        pieces = [p for p in pieces if p[2].size]
+        if not pieces:
+            return None
+        left = min(x for x, _, _ in pieces)
+        top = min(y for _, y, _ in pieces)
+        right = max(x + p.shape[1] for x, _, p in pieces)
+        bottom = max(y + p.shape[0] for _, y, p in pieces)
+        canvas = np.zeros((bottom - top, right - left), dtype=np.uint8)
+        for x, y, piece in pieces:
+            region = canvas[y - top:y - top + piece.shape[0], x - left:x - left + piece.shape[1]]
+            mask = piece != 0
+            region[mask] = piece[mask]
+        rows, cols = np.nonzero(canvas)
+        kinds = canvas[rows, cols]
+        return (rows.astype(np.int32) + top, cols.astype(np.int32) + left, kinds,
+                (top, left, bottom, right), bool((kinds == CHAR_BG).any()))
+
+    def _paint(self, fb, layout, x, y, color):
+        if layout is None:
+            return
+        rows, cols, kinds, (top, left, bottom, right), has_char_bg = layout
+        height, width = fb.shape
+        # color 为 0 时 drawChar 的底色与前景相同，不画底色（TFT 库的透明模式）
+        skip_bg = has_char_bg and color == 0
+        lut = np.array([0, color, self.background, 0], dtype=np.uint16)
+        if (not skip_bg and y + top >= 0 and x + left >= 0
+                and y + bottom <= height and x + right <= width):
+            fb[rows + y, cols + x] = lut[kinds]
+            return
+        r = rows + y
+        c = cols + x
+        keep = (r >= 0) & (r < height) & (c >= 0) & (c < width)
+        if skip_bg:
+            keep &= kinds != CHAR_BG
+        fb[r[keep], c[keep]] = lut[kinds[keep]]
+
+    # ---------------- 与生成的 C++ 同名的绘制接口 ----------------
+
+    def set_background(self, bg):
+        """blit 模式字格的背景色"""
+        self.background = bg
+
+    def draw_string(self, fb, x, y, text, color):
+        self._paint(fb, self._layout('string', _c_bytes(text)), x, y, color)
+
+    def draw_string_wrap(self, fb, x, y, text, color, max_width, line_height=0):
+        if max_width <= 0:
+            return
+        if line_height <= 0:
+            line_height = self.size + 4
+        self._paint(fb, self._layout('wrap', _c_bytes(text), max_width, line_height), x, y, color)
+
+    def draw_string_center(self, fb, y, text, color, center_x):
+        self._paint(fb, self._layout('center', _c_bytes(text)), center_x, y, color)
+
+    def draw_string_center_wrap(self, fb, y, text, color, center_x, max_width, line_height=0):
+        if max_width <= 0:
+            return
+        if line_height <= 0:
+            line_height = self.size + 4
+        self._paint(fb, self._layout('center_wrap', _c_bytes(text), max_width, line_height), center_x, y, color)
+
+    def draw_static(self, fb, static_id, x, y, color):
+        """静态文本：序号或 enum StaticText 里的名字"""
+        if isinstance(static_id, str):
+            static_id = self.static_names.get(static_id, -1)
+        if self.static_boxes is None or static_id < 0 or static_id >= len(self.static_boxes):
+            return
+        self._paint(fb, self._layout('static', b'', static_id), x, y, color)
+
+def _c_bytes(text):
+    """Python 文本 -> 固件里的 C 字符串（UTF-8，到第一个 NUL 为止）"""
+    data = text.encode('utf-8') if isinstance(text, str) else bytes(text)
+    return data.split(b'\0', 1)[0]
+
+def _paste(dest, x, y, bits, value):
+    """点阵 bits 放到 dest 的 (x, y) 处，超出 dest 的部分裁掉"""
+    h, w = bits.shape
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, dest.shape[1]), min(y + h, dest.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+    src = bits[y0 - y:y1 - y, x0 - x:x1 - x]
+    dest[y0:y1, x0:x1][src] = value
+
+# ---------------- 帧缓冲 ----------------
+
+def new_screen(width=240, height=240, fill=0):
+    """RGB565 帧缓冲"""
+    return np.full((height, width), fill, dtype=np.uint16)
+
+def rgb565_to_rgb(fb):
+    """RGB565 -> (h, w, 3) 的 RGB888，低位用高位补齐（0xFFFF -> 白色）"""
+    fb = fb.astype(np.uint32)
+    r = (fb >> 11) & 0x1F
+    g = (fb >> 5) & 0x3F
+    b = fb & 0x1F
+    return np.stack(((r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)), axis=-1).astype(np.uint8)
+
+def to_image(fb, scale=1):
+    image = Image.fromarray(rgb565_to_rgb(fb), 'RGB')
+    if scale > 1:
+        image = image.resize((fb.shape[1] * scale, fb.shape[0] * scale), Image.NEAREST)
+    return image
+
+def save_png(fb, path, scale=1):
+    to_image(fb, scale).save(path, compress_level=1)
+
+# ---------------- 场景 ----------------
+
+# 场景文件里的 C++ 接口名 -> FontPreview 方法
+CALLS = {
+    'drawString': 'draw_string',
+    'drawStringWrap': 'draw_string_wrap',
+    'drawStringCenter': 'draw_string_center',
+    'drawStringCenterWrap': 'draw_string_center_wrap',
+    'drawStatic': 'draw_static',
+    'setBackground': 'set_background',
+}
+
+def run_scene(fb, font, draws, fonts=None):
+    """按顺序执行场景里的调用；{"font": 路径, "call": [...]} 换用别的字库（打开过的字库放在 fonts 里复用）"""
+    fonts = {} if fonts is None else fonts
+    for item in draws:
+        target = font
+        if isinstance(item, dict):
+            path = item['font']
+            if path not in fonts:
+                fonts[path] = FontPreview.load(path)
+            target = fonts[path]
+            item = item['call']
+        name, args = item[0], item[1:]
+        if name not in CALLS:
+            raise ValueError(f"未知的绘制调用: {name}")
+        if name == 'setBackground':
+            target.set_background(*args)
+        else:
+            getattr(target, CALLS[name])(fb, *args)
+    return fb
+
+def main():
+    parser = argparse.ArgumentParser(description='在电脑上按固件排版预览生成的字库')
+    parser.add_argument('font', help='库目录（lib/GB2312_16_FangSong）、_font.c、外部字库 .bin 或字形缓存 .bin')
+    parser.add_argument('text', nargs='?', help='要绘制的文本')
+    parser.add_argument('-o', '--output', default='preview.png', help='输出 PNG（默认 preview.png）')
+    parser.add_argument('--x', type=int, default=0, help='起点 x（居中时不用）')
+    parser.add_argument('--y', type=int, default=0, help='起点 y')
+    parser.add_argument('--wrap', type=int, metavar='W', help='按 maxWidth 换行（drawStringWrap）')
+    parser.add_argument('--center', type=int, metavar='CX', help='以 centerX 居中（drawStringCenter，加 --wrap 为 drawStringCenterWrap）')
+    parser.add_argument('--line', type=int, default=0, help='换行时的行高，默认字号+4')
+    parser.add_argument('--color', default='FFFF', help='前景色 RGB565 十六进制（默认 FFFF）')
+    parser.add_argument('--bg', default='0000', help='blit 模式字格背景色（setBackground）')
+    parser.add_argument('--fill', default='0000', help='屏幕底色')
+    parser.add_argument('--screen', default='240x240', help='屏幕尺寸，默认 240x240')
+    parser.add_argument('--scene', help='场景 JSON 文件（见文件开头说明）')
+    parser.add_argument('--scale', type=int, default=1, help='PNG 放大倍数')
+    parser.add_argument('--sheet', metavar='PNG', help='导出字形图集')
+    parser.add_argument('--bench', type=int, metavar='N', help='重复绘制 N 次，统计每秒能出多少张草图')
+    args = parser.parse_args()
+
+    try:
+        font = FontPreview.load(args.font)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"错误：无法打开字库 {args.font}: {e}")
+        sys.exit(1)
+
+    if args.sheet:
+        count = font.save_sheet(args.sheet)
+        print(f"✅ 图集: {args.sheet}（{count} 个字形）")
+        if not args.text and not args.scene:
+            return
+
+    width, height = (int(v) for v in args.screen.lower().split('x'))
+    fill = int(args.fill, 16)
+    font.set_background(int(args.bg, 16))
+    if args.scene:
+        with open(args.scene, encoding='utf-8') as f:
+            scene = json.load(f)
+        if isinstance(scene, dict):
+            width = scene.get('width', width)
+            height = scene.get('height', height)
+            fill = scene.get('fill', fill)
+            draws = scene['draws']
+        else:
+            draws = scene
+    elif args.text is not None:
+        color = int(args.color, 16)
+        if args.center is not None and args.wrap:
+            call = ['drawStringCenterWrap', args.y, args.text, color, args.center, args.wrap, args.line]
+        elif args.center is not None:
+            call = ['drawStringCenter', args.y, args.text, color, args.center]
+        elif args.wrap:
+            call = ['drawStringWrap', args.x, args.y, args.text, color, args.wrap, args.line]
+        else:
+            call = ['drawString', args.x, args.y, args.text, color]
+        draws = [call]
+    else:
+        parser.error('需要文本、--scene 或 --sheet')
+
+    fonts = {}
+    try:
+        fb = run_scene(new_screen(width, height, fill), font, draws, fonts)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"错误：场景绘制失败: {e}")
+        sys.exit(1)
+    save_png(fb, args.output, args.scale)
+    print(f"✅ 预览: {args.output}（{width}x{height}，{len(draws)} 次绘制）")
+
+    if args.bench:
+        # 排版已缓存，这里测的是稳定状态下每张草图的开销：清屏 + 全部绘制，以及再加 PNG 编码
+        start = time.perf_counter()
+        for _ in range(args.bench):
+            run_scene(new_screen(width, height, fill), font, draws, fonts)
+        draw_rate = args.bench / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(args.bench):
+            fb = run_scene(new_screen(width, height, fill), font, draws, fonts)
+            to_image(fb, args.scale).save(io.BytesIO(), 'PNG', compress_level=1)
+        png_rate = args.bench / (time.perf_counter() - start)
+        print(f"  绘制 {draw_rate:,.0f} 张/秒，含 PNG 编码 {png_rate:,.0f} 张/秒")
+
+if __name__ == "__main__":
+    main()